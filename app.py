@@ -46,8 +46,10 @@ def get_worksheet(sheet_name, worksheet_name):
 
 # ---- OpenAI Setup ----
 openai_key = st.secrets.get("openai_api_key", None)
+# Optional: OpenAI-kompatibler Endpunkt, z.B. mock_llm_server.py für Offline-Tests
+openai_base_url = st.secrets.get("openai_base_url", None)
 if openai_key:
-    client = OpenAI(api_key=openai_key)
+    client = OpenAI(api_key=openai_key, base_url=openai_base_url)
 else:
     client = None
 
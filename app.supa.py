@@ -2,11 +2,38 @@ import streamlit as st
 import datetime
 import requests
 import pandas as pd
-import re
 from openai import OpenAI
 import io
+import itertools
 import json
+import os
+import time
+from collections import deque
+from urllib.parse import quote
+import streamlit.components.v1 as components
 from supabase import create_client, Client
+from exercise_catalog import canonical_exercise_name, canonicalize_exercises, suggest_exercise_name
+from data_revisions import DataRevisions
+from plan_cache import PlanCache
+from plan_inputs import (
+    DEFAULT_AI_CONFIG, build_comprehensive_profile, load_prompt_config,
+    render_plan_request, summarize_workout_history
+)
+from plan_diff import diff_plan, describe_changes
+from plan_jobs import PlanJobQueue, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_KIND_VARIANT
+from plan_parser import (
+    PlanStreamParser, parse_plan_text, parse_plan_response, summarize_rows, PARSE_STATS
+)
+from plan_repair import repair_plan
+from offline_sync import resolve_offline_ops
+from rate_limiter import RateScheduler, DEFAULT_RPM, DEFAULT_TPM, DEFAULT_MAX_CONCURRENT
+from set_grid import apply_grid_edits, check_conflicts, describe_conflict, diff_grid, grid_frame, normalize_field
+from workout_index import build_workout_index
+from last_performance import TABLE_LAST_PERFORMANCE, last_performance_lookup, last_performance_rows
+from training_metrics import (
+    compute_training_load, format_load_context, acwr_zone,
+    exercise_stats, CHART_MAX_POINTS
+)
 
 # ---- Configuration ----
 SUPABASE_URL = st.secrets["supabase_url"]
@@ -14,6 +41,7 @@ SUPABASE_KEY = st.secrets["supabase_service_role_key"]
 TABLE_WORKOUT = "workouts"
 TABLE_ARCHIVE = "workout_history"
 TABLE_QUESTIONNAIRE = "questionaire"
+MAX_PLAN_VARIANTS = 4  # max. gleichzeitig generierte Varianten pro Vergleich
 
 HEADERS = {
     "apikey": SUPABASE_KEY,
@@ -24,6 +52,9 @@ HEADERS = {
 # Supabase Client für Auth
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Dauer des kompletten Skriptlaufs, Anzeige unten in der Sidebar (nur im Debug-Modus)
+rerun_started = time.perf_counter()
+
 st.set_page_config(
     page_title="Workout Tracker",
     page_icon="💪",
@@ -171,53 +202,46 @@ inject_mobile_styles()
 # ---- OpenAI Setup ----
 try:
     openai_key = st.secrets.get("openai_api_key", None)
-    client = OpenAI(api_key=openai_key) if openai_key else None
+    # Optional: OpenAI-kompatibler Endpunkt, z.B. mock_llm_server.py für Offline-Tests
+    openai_base_url = st.secrets.get("openai_base_url", None)
+    # Wiederholungen bei 429 übernimmt der RateScheduler, nicht zusätzlich das SDK
+    client = OpenAI(api_key=openai_key, base_url=openai_base_url, max_retries=0) if openai_key else None
 except Exception as e:
     st.error(f"Fehler beim Initialisieren des OpenAI-Clients: {e}")
     client = None
 
+@st.cache_resource
+def get_plan_cache():
+    """Prozessweiter Cache für generierte Pläne."""
+    return PlanCache()
+
+@st.cache_resource
+def get_rate_scheduler():
+    """Prozessweites RPM-/TPM-Budget für alle OpenAI-Anfragen (Limits aus den Secrets)."""
+    return RateScheduler(
+        rpm=int(st.secrets.get("openai_rpm", DEFAULT_RPM)),
+        tpm=int(st.secrets.get("openai_tpm", DEFAULT_TPM)),
+        max_concurrent=int(st.secrets.get("openai_max_concurrent", DEFAULT_MAX_CONCURRENT))
+    )
+
+@st.cache_resource
+def get_data_revisions():
+    """Prozessweite Schreibzähler pro (Tabelle, Nutzer) für die Cache-Schlüssel aller Sessions."""
+    return DataRevisions()
+
+@st.cache_resource
+def get_plan_job_queue():
+    """Prozessweiter Worker-Pool für Plan-Generierungen aller Sessions."""
+    return PlanJobQueue(client, plan_cache=get_plan_cache(), scheduler=get_rate_scheduler())
+
 # ---- KI-Prompt Template ----
 def get_ai_prompt_template():
     """Lädt das KI-Prompt Template und Konfiguration aus einer externen Datei."""
-    config = {
-        'temperature': 0.7,
-        'model': 'gpt-4o-mini',
-        'max_tokens': 4000,
-        'top_p': 1.0,
-        'prompt': ''
-    }
-    
     try:
-        with open('ai_prompt.txt', 'r', encoding='utf-8') as file:
-            content = file.read()
-            
-        # Parse Konfiguration wenn vorhanden
-        if '### KONFIGURATION ###' in content and '### ENDE KONFIGURATION ###' in content:
-            config_section = content.split('### KONFIGURATION ###')[1].split('### ENDE KONFIGURATION ###')[0]
-            prompt_section = content.split('### ENDE KONFIGURATION ###')[1]
-            
-            # Parse config values
-            for line in config_section.strip().split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    if key == 'temperature':
-                        config['temperature'] = float(value)
-                    elif key == 'model':
-                        config['model'] = value
-                    elif key == 'max_tokens':
-                        config['max_tokens'] = int(value)
-                    elif key == 'top_p':
-                        config['top_p'] = float(value)
-            
-            config['prompt'] = prompt_section.strip()
-        else:
-            # Keine Konfiguration gefunden, ganzer Inhalt ist Prompt
-            config['prompt'] = content
-            
+        config = load_prompt_config()
     except FileNotFoundError:
         st.error("ai_prompt.txt nicht gefunden! Verwende eingebautes Template.")
+        config = dict(DEFAULT_AI_CONFIG)
         config['prompt'] = """
 Du bist Sportwissenschafter, Headcoach in einem Fitnessstudio und Experte für alles in Sachen Training von Rehab bis Profi-Sportler. 
 
@@ -277,18 +301,162 @@ def get_supabase_data(table, filters=None):
         st.error(f"Fehler beim Abrufen der Daten aus {table}: {response.text}")
         return []
 
+def workout_revision(user_uuid):
+    """Schreibzähler pro Nutzer; Teil des Cache-Schlüssels von get_workout_index."""
+    return get_data_revisions().get(TABLE_WORKOUT, user_uuid)
+
+def clear_workout_cache(table):
+    """Nach Schreibzugriffen auf workouts den Render-Index des eigenen Nutzers verwerfen.
+
+    get_workout_index.clear() würde die Einträge aller Nutzer leeren; stattdessen
+    wird nur der prozessweite Zähler des Nutzers erhöht, sodass alle seine Geräte
+    beim nächsten Rerun neu laden.
+    """
+    user_uuid = st.session_state.get("userid")
+    if table == TABLE_WORKOUT and user_uuid:
+        get_data_revisions().bump(TABLE_WORKOUT, user_uuid)
+
 def insert_supabase_data(table, data):
     response = requests.post(f"{SUPABASE_URL}/rest/v1/{table}", headers=HEADERS, json=data)
+    clear_workout_cache(table)
     return response.status_code == 201
 
 def update_supabase_data(table, updates, row_id):
     response = requests.patch(f"{SUPABASE_URL}/rest/v1/{table}?id=eq.{row_id}", headers=HEADERS, json=updates)
+    clear_workout_cache(table)
     if response.status_code != 204:
         st.error(f"Update-Fehler: {response.text}")
     return response.status_code == 204
 
+def update_workout_row(row, updates):
+    """Bedingtes Update eines Satzes über seine Zeilenversion (migrations/001_workouts_version.sql).
+
+    Liefert (ok, Konfliktmeldung). Ohne version-Spalte wird wie bisher direkt aktualisiert."""
+    version = row.get('version')
+    if version is None or pd.isna(version):
+        return update_supabase_data(TABLE_WORKOUT, updates, row['id']), None
+    response = requests.patch(
+        f"{SUPABASE_URL}/rest/v1/{TABLE_WORKOUT}?id=eq.{row['id']}&version=eq.{int(version)}",
+        headers={**HEADERS, "Prefer": "return=representation"},
+        json=updates
+    )
+    clear_workout_cache(TABLE_WORKOUT)
+    if response.status_code != 200:
+        st.error(f"Update-Fehler: {response.text}")
+        return False, None
+    if response.json():
+        return True, None
+    # Keine Zeile getroffen: ein anderes Gerät war schneller (oder hat gelöscht)
+    current = get_supabase_data(TABLE_WORKOUT, f"id=eq.{row['id']}")
+    return False, describe_conflict(row, current[0] if current else None)
+
+def update_workout_rows(changes):
+    """Mehrere (Satz, Änderungen) bedingt schreiben; liefert (Anzahl Fehler, Konflikte)."""
+    failed, conflicts = 0, []
+    for row, updates in changes:
+        ok, conflict = update_workout_row(row, updates)
+        if conflict:
+            conflicts.append(conflict)
+        elif not ok:
+            failed += 1
+    return failed, conflicts
+
+def bulk_update_if_unchanged(rows):
+    """Vollständige Zeilen (mit geladener version) in einer Anfrage bedingt schreiben.
+
+    Nutzt die Funktion update_workouts_if_unchanged aus der Migration; liefert
+    (ok, ids mit Konflikt). Ohne version-Spalte: Upsert wie bisher."""
+    if not rows:
+        return True, []
+    if any(row.get('version') is None for row in rows):
+        return bulk_upsert_supabase_data(TABLE_WORKOUT, rows), []
+    ok, updated = rpc_update_if_unchanged([(row, row) for row in rows])
+    return ok, [row['id'] for row in rows if ok and row['id'] not in updated]
+
+def rpc_update_if_unchanged(changes):
+    """(Satz mit version, Änderungen) in einer Anfrage bedingt schreiben; liefert (ok, {id: neue Zeile})."""
+    response = requests.post(
+        f"{SUPABASE_URL}/rest/v1/rpc/update_workouts_if_unchanged",
+        headers=HEADERS,
+        json={"changes": [{"id": row['id'], "version": int(row['version']), "updates": updates}
+                          for row, updates in changes]}
+    )
+    clear_workout_cache(TABLE_WORKOUT)
+    if response.status_code != 200:
+        st.error(f"Update-Fehler: {response.text}")
+        return False, {}
+    return True, {row['id']: row for row in response.json()}
+
+def update_sets_batch(changes):
+    """Gepufferte Satz-Änderungen gebündelt und bedingt schreiben.
+
+    Liefert (nicht geschriebene Änderungen, {id: Konfliktmeldung}). Geschriebene Werte und
+    neue Versionen werden in die geladenen Satz-Dicts übernommen, damit die
+    nächste Änderung derselben Zeile nicht mit sich selbst kollidiert."""
+    if any(row.get('version') is None or pd.isna(row.get('version')) for row, _ in changes):
+        failed, conflicts = [], {}
+        for row, updates in changes:
+            ok, conflict = update_workout_row(row, updates)
+            if conflict:
+                conflicts[row['id']] = conflict
+            elif ok:
+                row.update(updates)
+            else:
+                failed.append((row, updates))
+        return failed, conflicts
+    ok, updated = rpc_update_if_unchanged(changes)
+    if not ok:
+        return changes, {}
+    conflicted = []
+    for row, updates in changes:
+        if row['id'] in updated:
+            row.update(updates, version=updated[row['id']]['version'])
+        else:
+            conflicted.append(row)
+    if not conflicted:
+        return [], {}
+    current = {row['id']: row for row in get_supabase_data(
+        TABLE_WORKOUT, f"id=in.({','.join(str(row['id']) for row in conflicted)})")}
+    return [], {row['id']: describe_conflict(row, current.get(row['id'])) for row in conflicted}
+
 def delete_supabase_data(table, row_id):
     response = requests.delete(f"{SUPABASE_URL}/rest/v1/{table}?id=eq.{row_id}", headers=HEADERS)
+    clear_workout_cache(table)
+    return response.status_code == 204
+
+def bulk_insert_supabase_data(table, rows):
+    """Mehrere Zeilen in einer Anfrage anlegen."""
+    if not rows:
+        return True
+    response = requests.post(f"{SUPABASE_URL}/rest/v1/{table}", headers=HEADERS, json=rows)
+    clear_workout_cache(table)
+    if response.status_code != 201:
+        st.error(f"Insert-Fehler: {response.text}")
+    return response.status_code == 201
+
+def bulk_upsert_supabase_data(table, rows):
+    """Mehrere vollständige Zeilen (mit id) in einer Anfrage aktualisieren."""
+    if not rows:
+        return True
+    response = requests.post(
+        f"{SUPABASE_URL}/rest/v1/{table}",
+        headers={**HEADERS, "Prefer": "resolution=merge-duplicates"},
+        json=rows
+    )
+    clear_workout_cache(table)
+    if response.status_code not in (200, 201):
+        st.error(f"Update-Fehler: {response.text}")
+    return response.status_code in (200, 201)
+
+def bulk_delete_supabase_data(table, row_ids):
+    """Mehrere Zeilen über id=in.(...) in einer Anfrage löschen."""
+    if not row_ids:
+        return True
+    ids = ",".join(str(row_id) for row_id in row_ids)
+    response = requests.delete(f"{SUPABASE_URL}/rest/v1/{table}?id=in.({ids})", headers=HEADERS)
+    clear_workout_cache(table)
+    if response.status_code != 204:
+        st.error(f"Lösch-Fehler: {response.text}")
     return response.status_code == 204
 
 def get_user_profile(user_uuid):
@@ -297,70 +465,18 @@ def get_user_profile(user_uuid):
 
 def get_comprehensive_user_profile(user_uuid):
     """Holt alle relevanten Gesundheits- und Trainingsdaten aus dem Fragebogen"""
-    profile = get_user_profile(user_uuid)
-    
-    if not profile:
-        return {}
-    
-    # Extrahiere alle relevanten Felder für die KI
-    comprehensive_profile = {
-        # Persönliche Daten
-        "name": f"{profile.get('forename', '')} {profile.get('surename', '')}".strip(),
-        "alter": calculate_age(profile.get('birthday')) if profile.get('birthday') else None,
-        "geschlecht": profile.get('gender', 'nicht angegeben'),
-        "größe": profile.get('height', 'nicht angegeben'),
-        "gewicht": profile.get('weight', 'nicht angegeben'),
-        "körperfett": profile.get('bodyfat', 'nicht angegeben'),
-        
-        # Trainingserfahrung und Ziele
-        "erfahrung": profile.get('experience', 'nicht angegeben'),
-        "ziele": profile.get('goals', 'nicht angegeben'),
-        "ziel_details": profile.get('goalDetail', ''),
-        "trainingsfrequenz": profile.get('trainFrequency', 'nicht angegeben'),
-        "motivation": profile.get('motivation', 'nicht angegeben'),
-        
-        # Gesundheitszustand
-        "gesundheitszustand": profile.get('healthCondition', 'gut'),
-        "einschränkungen": profile.get('restrictions', 'keine'),
-        "schmerzen": profile.get('pains', 'keine'),
-        
-        # Spezifische Gesundheitsprobleme
-        "operationen": profile.get('surgery', 'nein'),
-        "operations_details": profile.get('surgeryDetails', '') if profile.get('surgery') == 'ja' else '',
-        "ausstrahlende_schmerzen": profile.get('radiatingPain', 'nein'),
-        "schmerz_details": profile.get('painDetails', '') if profile.get('radiatingPain') == 'ja' else '',
-        "bandscheibenvorfall": profile.get('discHerniated', 'nein'),
-        "bandscheiben_details": profile.get('discDetails', '') if profile.get('discHerniated') == 'ja' else '',
-        "osteoporose": profile.get('osteoporose', 'nein'),
-        "bluthochdruck": profile.get('hypertension', 'nein'),
-        "hernie": profile.get('hernia', 'nein'),
-        "herzprobleme": profile.get('cardic', 'nein'),
-        "schlaganfall": profile.get('stroke', 'nein'),
-        "andere_gesundheitsprobleme": profile.get('healthOther', ''),
-        
-        # Lifestyle
-        "stresslevel": profile.get('stresslevel', 'mittel'),
-        "schlafdauer": profile.get('sleepDuration', 'nicht angegeben'),
-        "ernährung": profile.get('diet', 'nicht angegeben'),
-    }
-    
-    # Entferne leere Werte für kompaktere Darstellung
-    return {k: v for k, v in comprehensive_profile.items() if v and v != 'nicht angegeben' and v != 'nein' and v != ''}
-
-def calculate_age(birthday_str):
-    """Berechnet das Alter aus dem Geburtstag"""
-    if not birthday_str:
-        return None
-    try:
-        birthday = datetime.datetime.strptime(str(birthday_str), "%Y-%m-%d").date()
-        today = datetime.date.today()
-        age = today.year - birthday.year - ((today.month, today.day) < (birthday.month, birthday.day))
-        return age
-    except:
-        return None
+    return build_comprehensive_profile(get_user_profile(user_uuid))
 
 def load_user_workouts(user_uuid):
-    data = get_supabase_data(TABLE_WORKOUT, f"uuid=eq.{user_uuid}")
+    return workouts_to_frame(get_supabase_data(TABLE_WORKOUT, f"uuid=eq.{user_uuid}"))
+
+def load_exercise(user_uuid, workout_name, exercise_name):
+    """Nur die Sätze einer Übung als Eintrag des Render-Index (None, wenn die Übung nicht mehr existiert)."""
+    filters = f"uuid=eq.{user_uuid}&workout=eq.{quote(workout_name)}&exercise=eq.{quote(exercise_name)}"
+    index = build_workout_index(workouts_to_frame(get_supabase_data(TABLE_WORKOUT, filters)), get_last_performance(user_uuid, history_revision(user_uuid)))
+    return index['workouts'][0]['exercises'][0] if index['workouts'] else None
+
+def workouts_to_frame(data):
     df = pd.DataFrame(data) if data else pd.DataFrame()
     if "weight" in df.columns:
         df["weight"] = pd.to_numeric(df["weight"], errors="coerce").fillna(0)
@@ -377,207 +493,199 @@ def load_user_workouts(user_uuid):
 
 def analyze_workout_history(user_uuid):
     """Analysiert die Trainingshistorie und bereitet detaillierte Informationen für die KI auf."""
+    return summarize_workout_history(get_supabase_data(TABLE_ARCHIVE, f"uuid=eq.{user_uuid}"))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_archive_data(user_uuid, archive_revision):
+    """Rohdaten aus workout_history (Übungsnamen vereinheitlicht), gecacht bis zur nächsten Archivierung."""
     data = get_supabase_data(TABLE_ARCHIVE, f"uuid=eq.{user_uuid}")
-    if not data:
-        return "Keine Trainingshistorie vorhanden.", pd.DataFrame()
-    
-    df = pd.DataFrame(data)
-    if "weight" in df.columns:
-        df["weight"] = pd.to_numeric(df["weight"], errors="coerce").fillna(0)
-    if "reps" in df.columns:
-        df["reps"] = pd.to_numeric(df["reps"], errors="coerce").fillna(0)
-    if "rirDone" in df.columns:
-        df["rirDone"] = pd.to_numeric(df["rirDone"], errors="coerce").fillna(0)
-    
-    # Konvertiere date zu datetime für bessere Analyse
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Erstelle detaillierte Zusammenfassung
-    analysis_parts = []
-    
-    # 1. Allgemeine Statistiken
-    total_workouts = df['date'].nunique()
-    if total_workouts > 0:
-        first_workout = df['date'].min()
-        last_workout = df['date'].max()
-        days_training = (last_workout - first_workout).days + 1
-        frequency = total_workouts / max(days_training / 7, 1)  # Trainings pro Woche
-        
-        analysis_parts.append(f"TRAININGSÜBERSICHT:")
-        analysis_parts.append(f"- Trainingseinheiten gesamt: {total_workouts}")
-        analysis_parts.append(f"- Zeitraum: {first_workout.strftime('%d.%m.%Y')} bis {last_workout.strftime('%d.%m.%Y')}")
-        analysis_parts.append(f"- Durchschnittliche Frequenz: {frequency:.1f} Trainings/Woche")
-        analysis_parts.append("")
-    
-    # 2. Übungsanalyse mit Progression
-    analysis_parts.append("ÜBUNGSFORTSCHRITTE:")
-    exercises = df['exercise'].unique()
-    
-    for exercise in sorted(exercises):
-        ex_data = df[df['exercise'] == exercise].sort_values('date')
-        
-        # Berechne Fortschritt
-        first_weight = ex_data.iloc[0]['weight'] if len(ex_data) > 0 else 0
-        last_weight = ex_data.iloc[-1]['weight'] if len(ex_data) > 0 else 0
-        weight_progress = last_weight - first_weight
-        
-        # Durchschnittswerte
-        avg_weight = ex_data['weight'].mean()
-        avg_reps = ex_data['reps'].mean()
-        avg_rir = ex_data['rirDone'].mean()
-        max_weight = ex_data['weight'].max()
-        
-        # Trainingsanzahl
-        training_count = len(ex_data.groupby('date'))
-        
-        analysis_parts.append(f"\n{exercise}:")
-        analysis_parts.append(f"  - Trainiert: {training_count}x")
-        analysis_parts.append(f"  - Aktuelles Gewicht: {last_weight:.1f} kg (Max: {max_weight:.1f} kg)")
-        analysis_parts.append(f"  - Fortschritt: {weight_progress:+.1f} kg seit Beginn")
-        analysis_parts.append(f"  - Durchschnitt: {avg_weight:.1f} kg × {avg_reps:.0f} Wdh")
-        if avg_rir > 0:
-            analysis_parts.append(f"  - Durchschnittliche RIR: {avg_rir:.1f}")
-        
-        # Coach-Nachrichten für diese Übung
-        messages = ex_data[ex_data['messageToCoach'].notna() & (ex_data['messageToCoach'] != '')]
-        if not messages.empty:
-            analysis_parts.append(f"  - Feedback vom Athleten:")
-            for _, msg_row in messages.iterrows():
-                date_str = msg_row['date'].strftime('%d.%m.')
-                analysis_parts.append(f"    • {date_str}: \"{msg_row['messageToCoach']}\"")
-    
-    # 3. Workout-Split Analyse
-    analysis_parts.append("\nWORKOUT-VERTEILUNG:")
-    workout_counts = df.groupby('workout')['date'].nunique()
-    for workout, count in workout_counts.items():
-        analysis_parts.append(f"- {workout}: {count}x trainiert")
-    
-    # 4. Intensitätsanalyse basierend auf RIR
-    if 'rirDone' in df.columns and df['rirDone'].sum() > 0:
-        analysis_parts.append("\nINTENSITÄTSANALYSE:")
-        avg_rir_total = df[df['rirDone'] > 0]['rirDone'].mean()
-        analysis_parts.append(f"- Durchschnittliche RIR gesamt: {avg_rir_total:.1f}")
-        
-        # RIR nach Übung
-        rir_by_exercise = df[df['rirDone'] > 0].groupby('exercise')['rirDone'].mean().sort_values()
-        if len(rir_by_exercise) > 0:
-            analysis_parts.append("- Höchste Intensität (niedrigste RIR):")
-            for ex, rir in rir_by_exercise.head(3).items():
-                analysis_parts.append(f"  • {ex}: RIR {rir:.1f}")
-    
-    # 5. Allgemeine Coach-Nachrichten (nicht übungsspezifisch)
-    all_messages = df[df['messageToCoach'].notna() & (df['messageToCoach'] != '')]['messageToCoach'].unique()
-    if len(all_messages) > 0:
-        analysis_parts.append("\nALLGEMEINES FEEDBACK:")
-        for i, msg in enumerate(all_messages[:5]):  # Maximal 5 neueste Nachrichten
-            analysis_parts.append(f"- \"{msg}\"")
-    
-    summary = "\n".join(analysis_parts)
-    
-    return summary, df
+    df = pd.DataFrame(data) if data else pd.DataFrame()
+    if "exercise" in df.columns:
+        df["exercise"] = canonicalize_exercises(df["exercise"])
+    return df
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_training_load(user_uuid, archive_revision):
+    """Belastungskennzahlen (Tonnage, ACWR, RIR-Trend) pro User."""
+    return compute_training_load(load_archive_data(user_uuid, archive_revision))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_exercise_stats(user_uuid, archive_revision, max_points=CHART_MAX_POINTS):
+    """Kennzahlen und Chart-Serien aller Übungen, einmal pro Archivstand berechnet."""
+    return exercise_stats(load_archive_data(user_uuid, archive_revision), max_points)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_workout_index(user_uuid, revision, archive_revision):
+    """Aktueller Plan als DataFrame und vorgruppierter Render-Index; neu berechnet, sobald eine der Revisionen steigt."""
+    df = load_user_workouts(user_uuid)
+    return df, build_workout_index(df, get_last_performance(user_uuid, archive_revision))
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_last_performance(user_uuid, archive_revision):
+    """{(Übung, Satz): "60 kg × 8, RIR 2 (12.10.)"} aus last_performance (per Trigger beim Archivieren gepflegt)."""
+    response = requests.get(f"{SUPABASE_URL}/rest/v1/{TABLE_LAST_PERFORMANCE}?uuid=eq.{user_uuid}", headers=HEADERS)
+    if response.status_code == 200:
+        return last_performance_lookup(response.json())
+    # Tabelle noch nicht angelegt (Migration 002 fehlt): aus dem Archiv ableiten
+    archive = load_archive_data(user_uuid, archive_revision)
+    return last_performance_lookup(last_performance_rows(archive.to_dict('records'))) if not archive.empty else {}
+
+def history_revision(user_uuid):
+    """Archivierungszähler pro Nutzer; Teil der Cache-Schlüssel aller aus workout_history abgeleiteten Daten."""
+    return get_data_revisions().get(TABLE_ARCHIVE, user_uuid)
+
+def clear_history_caches(user_uuid):
+    """Verwirft die aus workout_history abgeleiteten Caches eines Nutzers (nach dem Archivieren).
+
+    Wie bei clear_workout_cache wird nur sein Zähler erhöht; die Einträge
+    anderer Nutzer bleiben gültig."""
+    get_data_revisions().bump(TABLE_ARCHIVE, user_uuid)
 
 def parse_ai_plan_to_rows(plan_text, user_uuid, user_name):
-    rows = []
-    current_date = datetime.date.today().isoformat()
-    current_workout = None
-    plan_explanation = ""  # Speichere die Erklärung
-    lines = plan_text.split('\n')
-    
-    # Extrahiere die Plan-Erklärung wenn vorhanden
-    if "**DEIN PERSÖNLICHER TRAININGSPLAN**" in plan_text:
-        explanation_start = plan_text.find("**DEIN PERSÖNLICHER TRAININGSPLAN**")
-        explanation_end = plan_text.find("**", explanation_start + len("**DEIN PERSÖNLICHER TRAININGSPLAN**"))
-        if explanation_end > explanation_start:
-            plan_explanation = plan_text[explanation_start:explanation_end].replace("**DEIN PERSÖNLICHER TRAININGSPLAN**", "").strip()
+    rows, plan_explanation, warnings = parse_plan_text(plan_text, user_uuid, user_name)
+    for warning in warnings:
+        st.warning(warning)
+    return rows, plan_explanation
+
+def render_plan_preview(workouts):
+    """Markdown-Vorschau der bisher erkannten Workouts und Übungen."""
+    lines = []
+    for workout_name, exercises in workouts.items():
+        lines.append(f"**{workout_name}**")
+        for exercise_name, sets, reps, weight in exercises:
+            lines.append(f"- {exercise_name}: {sets} × {reps}, {weight:g} kg")
+    return "\n".join(lines)
+
+def build_plan_request(user_name, profile, history_summary, additional_info, training_days, split_type, focus, seed=None):
+    """Rendert den Prompt und sammelt alle Parameter für eine Plan-Generierung."""
+    return render_plan_request(
+        get_ai_prompt_template(), user_name, profile, history_summary, additional_info,
+        training_days, split_type, focus,
+        load_context=format_load_context(get_training_load(st.session_state.userid, history_revision(st.session_state.userid))), seed=seed
+    )
+
+def get_plan_changes(user_uuid, new_rows):
+    """Changeset vom aktuellen Plan (Rohdaten aus workouts) zum neuen Plan."""
+    current_rows = get_supabase_data(TABLE_WORKOUT, f"uuid=eq.{user_uuid}")
+    return diff_plan(current_rows or [], new_rows)
+
+def apply_plan_changes(user_uuid, changes):
+    """Führt den Changeset in einer Transaktion aus (RPC aus migrations/004_apply_plan_changes.sql)."""
+    response = requests.post(
+        f"{SUPABASE_URL}/rest/v1/rpc/apply_plan_changes",
+        headers=HEADERS,
+        json={
+            "p_uuid": user_uuid,
+            "delete_ids": [row['id'] for row in changes['delete']],
+            "updates": [{"id": old['id'], "updates": updates} for old, updates in changes['update']],
+            "inserts": changes['insert'],
+        }
+    )
+    clear_workout_cache(TABLE_WORKOUT)
+    if response.status_code in (200, 204):
+        return True
+    if response.status_code != 404:
+        st.error(f"Fehler beim Aktivieren: {response.text}")
+        return False
+    # Migration 004 fehlt noch: wie bisher in drei Anfragen (nicht atomar)
+    return apply_plan_changes_separately(changes)
+
+def apply_plan_changes_separately(changes):
+    """Führt den Changeset als drei Bulk-Anfragen aus: löschen, aktualisieren, anlegen."""
+    if not bulk_delete_supabase_data(TABLE_WORKOUT, [row['id'] for row in changes['delete']]):
+        return False
+    if not bulk_upsert_supabase_data(TABLE_WORKOUT, [dict(old, **updates) for old, updates in changes['update']]):
+        return False
+    return bulk_insert_supabase_data(TABLE_WORKOUT, changes['insert'])
+
+def apply_plan_result(plan_text, rows, explanation, warnings, training_days=None):
+    """Repariert den Plan lokal (Gewichte, Wdh, Sätze, Trainingstage) und übernimmt ihn zur Anzeige."""
+    rows, fixes = repair_plan(rows, training_days, load_archive_data(st.session_state.userid, history_revision(st.session_state.userid)))
+    st.session_state['ai_plan'] = plan_text
+    st.session_state['ai_plan_rows'] = rows
+    st.session_state['ai_plan_fixes'] = fixes
+    st.session_state['ai_plan_explanation'] = explanation
+    st.session_state['ai_plan_warnings'] = warnings
+
+@st.fragment(run_every=1)
+def render_plan_job_status(user_name):
+    """Fragt den Hintergrund-Job ab; zeigt den Zwischenstand und übernimmt das Ergebnis."""
+    job_queue = get_plan_job_queue()
+    job_id = st.session_state.get('plan_job_id')
+    job = job_queue.store.get(job_id) if job_id else None
+    if job is None:
+        st.session_state.pop('plan_job_id', None)
+        return
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Skip die Erklärung
-        if "DEIN PERSÖNLICHER TRAININGSPLAN" in line or line == plan_explanation:
-            continue
-            
-        # Verbesserte Erkennung von Workout-Namen
-        workout_patterns = [
-            r'^\*\*(.+?):\*\*',  # **Workout Name:**
-            r'^\*\*(.+)\*\*',    # **Workout Name** (ohne Doppelpunkt)
-            r'^##\s*(.+)',       # ## Workout Name
-            r'^###\s*(.+)',      # ### Workout Name
-            r'^(.+):$'           # Workout Name:
-        ]
-        
-        workout_found = False
-        for pattern in workout_patterns:
-            workout_match = re.match(pattern, line)
-            if workout_match:
-                current_workout = workout_match.group(1).strip()
-                workout_found = True
-                break
-        
-        if workout_found:
-            continue
-            
-        # Wenn noch kein Workout definiert wurde, überspringe
-        if current_workout is None:
-            continue
-            
-        exercise_match = re.match(r'^\s*[-*]\s*(.+?):\s*(.*)', line)
-        if exercise_match:
-            exercise_name = exercise_match.group(1).strip()
-            details = exercise_match.group(2).strip()
-            
-            try:
-                sets, weight, reps, explanation = 3, 0.0, "10", ""
-                
-                explanation_match = re.search(r'\((?:Erklärung|Fokus):\s*(.+)\)$', details)
-                if explanation_match:
-                    explanation = explanation_match.group(1).strip()
-                    details = details.replace(explanation_match.group(0), '').strip()
-
-                sets_match = re.search(r'(\d+)\s*(?:x|[Ss]ätze|[Ss]ets)', details)
-                if sets_match:
-                    sets = int(sets_match.group(1))
-
-                weight_match = re.search(r'(\d+[\.,]?\d*)\s*kg', details)
-                if weight_match:
-                    weight = float(weight_match.group(1).replace(',', '.'))
-                elif "körpergewicht" in details.lower() or "bw" in details.lower():
-                    weight = 0.0
-
-                reps_match = re.search(r'(\d+\s*-\s*\d+|\d+)\s*(?:Wdh|Wiederholungen|reps)', details, re.IGNORECASE)
-                if reps_match:
-                    reps = reps_match.group(1).strip()
-
-                for satz in range(1, sets + 1):
-                    rows.append({
-                        'uuid': user_uuid, 
-                        'date': current_date, 
-                        'name': user_name,
-                        'workout': current_workout,
-                        'exercise': exercise_name,
-                        'set': satz, 
-                        'weight': weight,
-                        'reps': reps.split('-')[0] if '-' in str(reps) else reps,
-                        'unit': 'kg', 
-                        'type': '', 
-                        'completed': False,
-                        'messageToCoach': '', 
-                        'messageFromCoach': explanation,
-                        'rirSuggested': 0, 
-                        'rirDone': 0, 
-                        'generalStatementFrom': '', 
-                        'generalStatementTo': '',
-                        'dummy1': '', 'dummy2': '', 'dummy3': '', 'dummy4': '', 'dummy5': '',
-                        'dummy6': '', 'dummy7': '', 'dummy8': '', 'dummy9': '', 'dummy10': ''
-                    })
-            except Exception as e:
-                st.warning(f"Parsing-Fehler bei Übung '{line}': {e}")
-            
-            continue
+    if job['status'] in (JOB_QUEUED, JOB_RUNNING):
+        label = "KI erstellt deinen personalisierten Plan..."
+        if job['status'] == JOB_QUEUED:
+            wait_seconds = job_queue.estimate_wait(job_id)
+            label = "Plan ist in der Warteschlange..."
+            if wait_seconds:
+                label = f"Viele Anfragen gerade – dein Plan startet in ca. {max(1, round(wait_seconds))} s"
+        with st.status(label, expanded=True):
+            partial = job['partial_text']
+            if partial and job['request'].get('output_format') == 'json':
+                # output_format: json ist opt-in und verzichtet auf die Live-Vorschau:
+                # halbfertiges JSON ergibt keinen lesbaren Zwischenstand
+                st.caption(f"{len(partial)} Zeichen empfangen...")
+            elif partial:
+                # Zwischenstand mit dem Stream-Parser aufbereiten: Workouts erscheinen, sobald sie vollständig sind
+                parser = PlanStreamParser(st.session_state.userid, user_name)
+                parser.feed(partial)
+                st.markdown(render_plan_preview(parser.workouts))
+            st.caption("Du kannst die Seite verlassen – der Plan wird im Hintergrund fertiggestellt.")
+        return
     
-    return rows, plan_explanation
+    job_queue.store.claim(job_id)
+    st.session_state.pop('plan_job_id', None)
+    if job['status'] == JOB_DONE:
+        result = job['result']
+        apply_plan_result(result['plan_text'], result['rows'], result['explanation'], result['warnings'],
+                          job['request']['params'].get('training_days'))
+    else:
+        st.session_state['ai_plan_error'] = job['error']
+    st.rerun()
+
+def render_plan_variants(variant_jobs, jobs):
+    """Zeigt Plan-Varianten nebeneinander: Workouts, Übungen und Sätze pro Variante."""
+    cols = st.columns(len(variant_jobs))
+    for col, variant, job in zip(cols, variant_jobs, jobs):
+        with col:
+            st.markdown(f"**{variant['label']}**")
+            if job is None or job['status'] in (JOB_QUEUED, JOB_RUNNING):
+                st.caption("⏳ wird erstellt...")
+                continue
+            if job['status'] != JOB_DONE:
+                st.error(f"Fehler: {job['error']}")
+                continue
+            rows = job['result']['rows']
+            workouts = summarize_rows(rows)
+            st.metric("Workouts", len(workouts))
+            st.metric("Übungen", sum(len(exercises) for exercises in workouts.values()))
+            st.metric("Sätze gesamt", len(rows))
+            for workout_name, exercises in workouts.items():
+                st.caption(f"{workout_name}: " + ", ".join(exercise[0] for exercise in exercises))
+            if st.button("Diese Variante wählen", key=f"choose_variant_{job['id']}", disabled=not rows):
+                result = job['result']
+                apply_plan_result(result['plan_text'], rows, result['explanation'], result['warnings'],
+                                  job['request']['params'].get('training_days'))
+                for other in variant_jobs:
+                    get_plan_job_queue().store.claim(other['job_id'])
+                st.session_state.pop('plan_variant_jobs', None)
+                st.rerun()
+
+@st.fragment(run_every=1)
+def render_plan_variants_status():
+    """Aktualisiert den Variantenvergleich, bis alle Jobs fertig sind."""
+    variant_jobs = st.session_state.get('plan_variant_jobs', [])
+    store = get_plan_job_queue().store
+    jobs = [store.get(variant['job_id']) for variant in variant_jobs]
+    render_plan_variants(variant_jobs, jobs)
+    if all(job is None or job['status'] not in (JOB_QUEUED, JOB_RUNNING) for job in jobs):
+        st.session_state['plan_variants_ready'] = True
+        st.rerun()
 
 def add_set_to_exercise(user_uuid, exercise_data, new_set_number):
     """Fügt einen neuen Satz zu einer Übung hinzu"""
@@ -607,6 +715,7 @@ def add_set_to_exercise(user_uuid, exercise_data, new_set_number):
 
 def add_exercise_to_workout(user_uuid, workout_name, exercise_name, sets=3, weight=0, reps="10"):
     """Fügt eine neue Übung zu einem Workout hinzu"""
+    exercise_name = canonical_exercise_name(exercise_name)
     df = load_user_workouts(user_uuid)
     workout_data = df[df['workout'] == workout_name].iloc[0] if not df[df['workout'] == workout_name].empty else None
     
@@ -646,6 +755,7 @@ def add_exercise_to_workout(user_uuid, workout_name, exercise_name, sets=3, weig
 
 def add_workout(user_uuid, user_name, workout_name, exercise_name, sets=3, weight=0, reps="10"):
     """Fügt ein neues Workout mit einer ersten Übung hinzu"""
+    exercise_name = canonical_exercise_name(exercise_name)
     current_date = datetime.date.today().isoformat()
     
     success = True
@@ -678,17 +788,41 @@ def add_workout(user_uuid, user_name, workout_name, exercise_name, sets=3, weigh
     
     return success
 
-def delete_exercise(user_uuid, workout_name, exercise_name):
-    """Löscht alle Sätze einer Übung"""
-    df = load_user_workouts(user_uuid)
-    exercise_rows = df[(df['workout'] == workout_name) & (df['exercise'] == exercise_name)]
-    
-    success = True
-    for _, row in exercise_rows.iterrows():
-        if not delete_supabase_data(TABLE_WORKOUT, row['id']):
-            success = False
-    
-    return success
+# ---- Übungsnamen bestätigen ----
+# Exakte Treffer im Katalog übernehmen add_exercise_to_workout/add_workout selbst.
+# Bei nur ähnlichem Namen wird nichts umbenannt: der User entscheidet zwischen
+# Vorschlag und eigener Eingabe, erst dann wird angelegt.
+EXERCISE_ADDERS = {"exercise": add_exercise_to_workout, "workout": add_workout}
+
+def add_or_suggest_exercise(form_key, adder, **kwargs):
+    """Legt direkt an oder merkt sich einen Namensvorschlag zur Bestätigung (dann None)."""
+    suggestion = suggest_exercise_name(kwargs['exercise_name'])
+    if suggestion is None:
+        return EXERCISE_ADDERS[adder](**kwargs)
+    st.session_state.setdefault('exercise_suggestions', {})[form_key] = {
+        'adder': adder, 'kwargs': kwargs, 'suggestion': suggestion
+    }
+    return None
+
+def confirm_exercise_name(form_key, exercise_name):
+    pending = st.session_state.get('exercise_suggestions', {}).pop(form_key, None)
+    if pending:
+        EXERCISE_ADDERS[pending['adder']](**dict(pending['kwargs'], exercise_name=exercise_name))
+
+def render_exercise_suggestion(form_key):
+    """Rückfrage unter dem Formular, solange ein Vorschlag offen ist."""
+    pending = st.session_state.get('exercise_suggestions', {}).get(form_key)
+    if not pending:
+        return
+    entered, suggestion = pending['kwargs']['exercise_name'], pending['suggestion']
+    st.info(f"Meintest du '{suggestion}'? '{entered}' ist nicht im Übungskatalog.")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button(f"'{suggestion}' verwenden", key=f"use_suggestion_{form_key}",
+                  on_click=confirm_exercise_name, args=(form_key, suggestion))
+    with col2:
+        st.button(f"'{entered}' behalten", key=f"keep_name_{form_key}",
+                  on_click=confirm_exercise_name, args=(form_key, entered))
 
 def delete_workout(user_uuid, workout_name):
     """Löscht ein komplettes Workout"""
@@ -750,6 +884,460 @@ def archive_completed_workouts(user_uuid):
     
     return success, f"{archived_count} Einträge archiviert und {reset_count} zurückgesetzt"
 
+# ---- Aktionen der Übungskarten ----
+# Laufen als on_click-Callbacks vor dem Fragment-Rerun: Sie schreiben, laden nur die
+# betroffene Übung neu und das Fragment zeichnet danach nur diese Karte. Meldungen
+# gehen über card_notices, weil Callbacks in Fragment-Reruns nichts anzeigen sollen.
+def card_row(workout_name, exercise_name, row_id):
+    """Aktuelles Satz-Dict der Karte (None, wenn Übung oder Satz nicht mehr geladen sind)."""
+    exercise = st.session_state.exercise_cards.get((workout_name, exercise_name))
+    return next((row for row in exercise['sets'] if row['id'] == row_id), None) if exercise else None
+
+def changes_notice(changes, failed, conflicts):
+    """Meldung für die Karte: Konflikte einzeln, sonst Fehleranzahl."""
+    if conflicts:
+        return ("warning", "  \n".join(["Nicht gespeichert, neuer Stand geladen:"] + conflicts))
+    if failed:
+        return ("error", f"{failed} von {len(changes)} Sätzen nicht gespeichert")
+    return None
+
+def refresh_exercise_card(user_uuid, workout_name, exercise_name, notice=None):
+    st.session_state.exercise_cards[(workout_name, exercise_name)] = load_exercise(user_uuid, workout_name, exercise_name)
+    # Neue Revision = neuer Tabellen-Key, damit die Kompaktansicht nicht auf alten Edits aufsetzt
+    revisions = st.session_state.setdefault('card_revisions', {})
+    revisions[(workout_name, exercise_name)] = revisions.get((workout_name, exercise_name), 0) + 1
+    if notice:
+        st.session_state.setdefault('card_notices', {})[(workout_name, exercise_name)] = notice
+
+# ---- Autosave für Gewicht/Wdh/RIR ----
+# Eingaben landen per on_change im Puffer (eine Zeile = ein Eintrag, spätere Werte
+# überschreiben frühere). render_autosave_status schreibt Einträge, die
+# AUTOSAVE_IDLE_SECONDS nicht mehr geändert wurden, gebündelt in einer Anfrage.
+# Der Puffer hält nur Karte und id: Das Satz-Dict wird erst beim Schreiben
+# aufgelöst, weil refresh_exercise_card und jeder volle Lauf die Karten ersetzen.
+AUTOSAVE_IDLE_SECONDS = 2.0
+AUTOSAVE_INTERVAL_SECONDS = 2
+
+def buffer_set_edit(workout_name, exercise_name, row_id):
+    st.session_state.setdefault("autosave_buffer", {})[row_id] = {
+        "card": (workout_name, exercise_name),
+        "updates": {
+            "weight": st.session_state[f"weight_{row_id}"],
+            "reps": str(st.session_state[f"reps_{row_id}"]),
+            "rirDone": st.session_state[f"rir_{row_id}"],
+        },
+        "changed_at": time.time(),
+    }
+
+def flush_autosave(force=False):
+    """Ruhende (oder mit force alle) gepufferten Eingaben schreiben; liefert die Konflikte."""
+    buffer = st.session_state.get("autosave_buffer") or {}
+    now = time.time()
+    due = [row_id for row_id, entry in buffer.items() if force or now - entry["changed_at"] >= AUTOSAVE_IDLE_SECONDS]
+    if not due:
+        return {}
+    entries = {row_id: buffer.pop(row_id) for row_id in due}
+    changes = []
+    for row_id, entry in entries.items():
+        row = card_row(*entry["card"], row_id)
+        if row is not None:  # inzwischen gelöschte Sätze fallen weg
+            changes.append((row, entry["updates"]))
+    failed, conflicts = update_sets_batch(changes) if changes else ([], {})
+    for row, updates in failed:
+        # Beim nächsten Intervall erneut versuchen
+        buffer.setdefault(row['id'], dict(entries[row['id']], changed_at=now))
+    st.session_state.autosave_status = {"saved_at": now, "saved": len(changes) - len(failed) - len(conflicts)}
+    # Nur die Eingaben der Sätze im Konflikt verwerfen, damit sie den aktuellen Stand zeigen;
+    # erneut gepufferte Eingaben bleiben stehen
+    for row_id in conflicts:
+        for prefix in ("weight_", "reps_", "rir_"):
+            st.session_state.pop(f"{prefix}{row_id}", None)
+    # Meldungen einmal im nächsten vollständigen Lauf anzeigen (nicht bei jedem Intervall)
+    st.session_state.setdefault("autosave_conflicts", []).extend(conflicts.values())
+    return conflicts
+
+@st.fragment(run_every=AUTOSAVE_INTERVAL_SECONDS)
+def render_autosave_status():
+    """Schreibt ruhende Eingaben gebündelt und zeigt an, ob alles gespeichert ist."""
+    if flush_autosave():
+        st.rerun()  # Konflikt: ganze Ansicht mit dem neuen Stand neu aufbauen
+    pending = len(st.session_state.get("autosave_buffer") or {})
+    status = st.session_state.get("autosave_status")
+    if pending:
+        st.caption(f"⏳ {pending} {'Satz' if pending == 1 else 'Sätze'} mit ungespeicherten Änderungen …")
+    elif status:
+        st.caption(f"☁️ Alles gespeichert ({time.strftime('%H:%M:%S', time.localtime(status['saved_at']))})")
+
+def save_set(user_uuid, workout_name, exercise_name, row_id):
+    update = {
+        "weight": st.session_state[f"weight_{row_id}"],
+        "reps": str(st.session_state[f"reps_{row_id}"]),
+        "rirDone": st.session_state[f"rir_{row_id}"],
+        "completed": True,
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat()
+    }
+    # Gepufferte Eingaben dieses Satzes gehen mit diesem Update raus
+    st.session_state.get("autosave_buffer", {}).pop(row_id, None)
+    changes = [(card_row(workout_name, exercise_name, row_id), update)]
+    refresh_exercise_card(user_uuid, workout_name, exercise_name, changes_notice(changes, *update_workout_rows(changes)))
+
+def reset_set(user_uuid, workout_name, exercise_name, row_id):
+    changes = [(card_row(workout_name, exercise_name, row_id), {"completed": False})]
+    refresh_exercise_card(user_uuid, workout_name, exercise_name, changes_notice(changes, *update_workout_rows(changes)))
+
+def add_set(user_uuid, workout_name, exercise_name):
+    last_set = st.session_state.exercise_cards[(workout_name, exercise_name)]['sets'][-1]
+    if add_set_to_exercise(user_uuid, last_set, last_set['set'] + 1):
+        refresh_exercise_card(user_uuid, workout_name, exercise_name)
+
+def delete_last_set(user_uuid, workout_name, exercise_name):
+    last_set = st.session_state.exercise_cards[(workout_name, exercise_name)]['sets'][-1]
+    if delete_supabase_data(TABLE_WORKOUT, last_set['id']):
+        refresh_exercise_card(user_uuid, workout_name, exercise_name)
+
+def send_exercise_message(user_uuid, workout_name, exercise_name):
+    # Update alle Sätze dieser Übung mit der Nachricht
+    message = st.session_state[f"msg_{exercise_name}_{workout_name}"]
+    exercise_sets = st.session_state.exercise_cards[(workout_name, exercise_name)]['sets']
+    changes = [(row, {"messageToCoach": message}) for row in exercise_sets]
+    notice = changes_notice(changes, *update_workout_rows(changes)) or ("success", "Nachricht gesendet!")
+    refresh_exercise_card(user_uuid, workout_name, exercise_name, notice)
+
+def remove_exercise(user_uuid, workout_name, exercise_name):
+    exercise_sets = st.session_state.exercise_cards[(workout_name, exercise_name)]['sets']
+    if bulk_delete_supabase_data(TABLE_WORKOUT, [row['id'] for row in exercise_sets]):
+        st.session_state.exercise_cards[(workout_name, exercise_name)] = None
+
+@st.fragment
+def render_exercise_card(user_uuid, workout_name, exercise_name):
+    """Übungskarte als Fragment: Klicks rerunnen nur diese Karte, nicht das ganze Skript."""
+    card_args = (user_uuid, workout_name, exercise_name)
+    exercise = st.session_state.exercise_cards.get((workout_name, exercise_name))
+    if exercise is None:
+        st.caption(f"Übung '{exercise_name}' gelöscht.")
+        return
+    exercise_sets = exercise['sets']
+    notice = st.session_state.get('card_notices', {}).pop((workout_name, exercise_name), None)
+
+    with st.expander(f"💪 {exercise_name}", expanded=False):
+        if notice:
+            getattr(st, notice[0])(notice[1])
+        # Nachricht vom Coach anzeigen, falls vorhanden
+        coach_msg = exercise['coach_message']
+        if coach_msg and coach_msg.strip():
+            st.info(f"💬 Hinweis vom Coach: {coach_msg}")
+
+        for row in exercise_sets:
+            completed = row['completed']
+            bg_color = "#d4edda" if completed else "#f8f9fa"
+
+            with st.container():
+                st.markdown(
+                    f"""<div style='background-color: {bg_color}; 
+                    padding: 15px; 
+                    border-radius: 8px; 
+                    margin-bottom: 10px;
+                    border: 1px solid {"#c3e6cb" if completed else "#dee2e6"};'>""", 
+                    unsafe_allow_html=True
+                )
+
+                col1, col2, col3, col4, col5 = st.columns([1, 2, 2, 2, 2])
+
+                with col1:
+                    st.markdown(f"**Satz {row['set']}**")
+                    if row['last']:
+                        st.caption(f"Letztes Mal: {row['last']}")
+
+                with col2:
+                    # Bearbeitbares Gewicht
+                    st.number_input(
+                        "Gewicht (kg)", 
+                        value=float(row['weight']), 
+                        min_value=0.0,
+                        step=0.5,
+                        key=f"weight_{row['id']}",
+                        on_change=buffer_set_edit,
+                        args=(workout_name, exercise_name, row['id']),
+                        disabled=completed
+                    )
+
+                with col3:
+                    # Bearbeitbare Wiederholungen
+                    try:
+                        reps_value = int(row['reps'])
+                    except:
+                        reps_value = 10
+
+                    st.number_input(
+                        "Wiederholungen", 
+                        value=reps_value,
+                        min_value=1,
+                        step=1,
+                        key=f"reps_{row['id']}",
+                        on_change=buffer_set_edit,
+                        args=(workout_name, exercise_name, row['id']),
+                        disabled=completed
+                    )
+
+                with col4:
+                    # RIR (Reps in Reserve)
+                    try:
+                        rir_value = int(row['rirDone']) if row['rirDone'] else 0
+                    except:
+                        rir_value = 0
+
+                    st.number_input(
+                        "RIR", 
+                        value=rir_value,
+                        min_value=0,
+                        max_value=10,
+                        step=1,
+                        key=f"rir_{row['id']}",
+                        on_change=buffer_set_edit,
+                        args=(workout_name, exercise_name, row['id']),
+                        help="Reps in Reserve - Wie viele Wiederholungen hättest du noch schaffen können?",
+                        disabled=completed
+                    )
+
+                with col5:
+                    if not completed:
+                        # Speichern und als erledigt markieren
+                        st.button("✅ Erledigt", key=f"save_{row['id']}", on_click=save_set,
+                                  args=(*card_args, row['id']))
+                    else:
+                        # Option zum Zurücksetzen
+                        st.button("↩️ Zurücksetzen", key=f"reset_{row['id']}", on_click=reset_set,
+                                  args=(*card_args, row['id']))
+
+                st.markdown("</div>", unsafe_allow_html=True)
+
+        # Buttons für Satzverwaltung NACH allen Sätzen
+        col_add, col_del, col_space = st.columns([1, 1, 3])
+        with col_add:
+            st.button("➕ Satz hinzufügen", key=f"add_set_{exercise_name}_{workout_name}",
+                      on_click=add_set, args=card_args)
+
+        with col_del:
+            if len(exercise_sets) > 1:
+                st.button("➖ Letzten Satz löschen", key=f"del_set_{exercise_name}_{workout_name}",
+                          on_click=delete_last_set, args=card_args)
+
+        # Nachricht an den Coach
+        with st.expander("💬 Nachricht an Coach", expanded=False):
+            current_message = exercise['athlete_message']
+            st.text_area(
+                "Feedback zur Übung",
+                value=current_message,
+                key=f"msg_{exercise_name}_{workout_name}",
+                placeholder="z.B. Gewicht war zu leicht, Technik-Fragen, etc."
+            )
+            st.button("Nachricht senden", key=f"send_msg_{exercise_name}_{workout_name}",
+                      on_click=send_exercise_message, args=card_args)
+
+        # Übung löschen Button am Ende
+        st.markdown("---")
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col3:
+            st.button("🗑️ Übung löschen", key=f"del_ex_{exercise_name}_{workout_name}",
+                      on_click=remove_exercise, args=card_args)
+
+# ---- Kompaktansicht und Schnellerfassung ----
+SET_GRID_COLUMN_CONFIG = {
+    "Gewicht (kg)": st.column_config.NumberColumn(min_value=0.0, step=0.5, format="%.1f"),
+    "Wdh": st.column_config.NumberColumn(min_value=1, step=1),
+    "RIR": st.column_config.NumberColumn(min_value=0, max_value=10, step=1, help="Reps in Reserve"),
+    "Erledigt": st.column_config.CheckboxColumn(),
+    "Letztes Mal": st.column_config.TextColumn(disabled=True),
+}
+
+def get_current_workout(workout_index):
+    """Erstes Workout mit offenen Sätzen (sonst das erste) – ist in der Kompaktansicht aufgeklappt."""
+    workouts = workout_index['workouts']
+    for workout in workouts:
+        if any(not row['completed'] for exercise in workout['exercises'] for row in exercise['sets']):
+            return workout['name']
+    return workouts[0]['name'] if workouts else None
+
+def save_exercise_grid(user_uuid, workout_name, exercise_name, grid_key):
+    """Geänderte Zeilen der Satz-Tabelle speichern (on_change der Kompaktansicht)."""
+    exercise_sets = st.session_state.exercise_cards[(workout_name, exercise_name)]['sets']
+    original = grid_frame(exercise_sets)
+    changes = diff_grid(exercise_sets, original, apply_grid_edits(original, st.session_state[grid_key]["edited_rows"]))
+    refresh_exercise_card(user_uuid, workout_name, exercise_name, changes_notice(changes, *update_workout_rows(changes)))
+
+def load_workout(user_uuid, workout_name):
+    """Nur die Sätze eines Workouts als Eintrag des Render-Index (None, wenn es nicht mehr existiert)."""
+    filters = f"uuid=eq.{user_uuid}&workout=eq.{quote(workout_name)}"
+    index = build_workout_index(workouts_to_frame(get_supabase_data(TABLE_WORKOUT, filters)), get_last_performance(user_uuid, history_revision(user_uuid)))
+    return index['workouts'][0] if index['workouts'] else None
+
+def workout_set_rows(workout):
+    return [row for exercise in workout['exercises'] for row in exercise['sets']]
+
+def save_set_changes(changes):
+    """Prüft Änderungen gegen den aktuellen DB-Stand und schreibt sie als ein Bulk-Update.
+
+    Liefert (Anzahl gespeichert, Konflikte pro Satz)."""
+    ids = ",".join(str(row['id']) for row, _ in changes)
+    server_rows = get_supabase_data(TABLE_WORKOUT, f"id=in.({ids})")
+    rows, conflicts = check_conflicts(changes, server_rows)
+    ok, conflict_ids = bulk_update_if_unchanged(rows)
+    if not ok:
+        return 0, conflicts + [f"{len(rows)} Sätze konnten nicht gespeichert werden"]
+    if conflict_ids:
+        # Zwischen Laden und Schreiben geändert: aktuellen Stand für die Meldung holen
+        current = {row['id']: row for row in get_supabase_data(
+            TABLE_WORKOUT, f"id=in.({','.join(str(row_id) for row_id in conflict_ids)})")}
+        loaded = {row['id']: row for row, _ in changes}
+        conflicts += [describe_conflict(loaded[row_id], current.get(row_id)) for row_id in conflict_ids]
+    return len(rows) - len(conflict_ids), conflicts
+
+def save_quick_edit(user_uuid, workout_name, grid_key):
+    """Alle Änderungen der Schnellerfassung eines Workouts in einer Anfrage speichern (on_click)."""
+    set_rows = workout_set_rows(st.session_state.quick_edit_workouts[workout_name])
+    original = grid_frame(set_rows, with_exercise=True)
+    changes = diff_grid(set_rows, original, apply_grid_edits(original, st.session_state[grid_key]["edited_rows"]))
+    saved, conflicts = save_set_changes(changes) if changes else (0, [])
+    st.session_state.quick_edit_workouts[workout_name] = load_workout(user_uuid, workout_name)
+    st.session_state.setdefault('quick_edit_reports', {})[workout_name] = (len(changes), saved, conflicts)
+    revisions = st.session_state.setdefault('card_revisions', {})
+    revisions[workout_name] = revisions.get(workout_name, 0) + 1
+
+@st.fragment
+def render_quick_edit(user_uuid, workout_name):
+    """Schnellerfassung: alle Sätze eines Workouts in einer Tabelle, gespeichert mit einem Klick."""
+    workout = st.session_state.quick_edit_workouts.get(workout_name)
+    if workout is None:
+        st.caption(f"Workout '{workout_name}' gelöscht.")
+        return
+    revision = st.session_state.get('card_revisions', {}).get(workout_name, 0)
+    grid_key = f"quick_grid_{workout_name}_{revision}"
+
+    report = st.session_state.get('quick_edit_reports', {}).pop(workout_name, None)
+    if report:
+        changed, saved, conflicts = report
+        if not changed:
+            st.info("Keine Änderungen")
+        elif saved:
+            st.success(f"{saved} von {changed} Sätzen gespeichert")
+        for conflict in conflicts:
+            st.warning(conflict)
+
+    set_rows = workout_set_rows(workout)
+    done = sum(1 for row in set_rows if row['completed'])
+    st.caption(f"{done}/{len(set_rows)} Sätze erledigt · Änderungen werden erst mit „Alle speichern“ geschrieben")
+    with st.form(key=f"quick_form_{workout_name}_{revision}", border=False):
+        st.data_editor(
+            grid_frame(set_rows, with_exercise=True),
+            key=grid_key,
+            hide_index=True,
+            disabled=["Übung", "Satz"],
+            column_config=SET_GRID_COLUMN_CONFIG
+        )
+        st.form_submit_button("💾 Alle speichern", type="primary", on_click=save_quick_edit,
+                              args=(user_uuid, workout_name, grid_key))
+
+@st.fragment
+def render_exercise_grid(user_uuid, workout_name, exercise_name):
+    """Kompakte Übungskarte: eine editierbare Tabelle statt drei Eingaben und einem Button pro Satz."""
+    card_args = (user_uuid, workout_name, exercise_name)
+    exercise = st.session_state.exercise_cards.get((workout_name, exercise_name))
+    if exercise is None:
+        st.caption(f"Übung '{exercise_name}' gelöscht.")
+        return
+    notice = st.session_state.get('card_notices', {}).pop((workout_name, exercise_name), None)
+    revision = st.session_state.get('card_revisions', {}).get((workout_name, exercise_name), 0)
+    grid_key = f"grid_{workout_name}_{exercise_name}_{revision}"
+
+    done = sum(1 for row in exercise['sets'] if row['completed'])
+    st.markdown(f"**💪 {exercise_name}** · {done}/{len(exercise['sets'])} Sätze")
+    if notice:
+        getattr(st, notice[0])(notice[1])
+    if exercise['coach_message'].strip():
+        st.caption(f"💬 Hinweis vom Coach: {exercise['coach_message']}")
+
+    st.data_editor(
+        grid_frame(exercise['sets']),
+        key=grid_key,
+        hide_index=True,
+        disabled=["Satz"],
+        column_config=SET_GRID_COLUMN_CONFIG,
+        on_change=save_exercise_grid,
+        args=(*card_args, grid_key)
+    )
+
+    col_add, col_del, col_msg, col_remove = st.columns(4)
+    with col_add:
+        st.button("➕ Satz", key=f"add_set_{exercise_name}_{workout_name}", on_click=add_set, args=card_args)
+    with col_del:
+        if len(exercise['sets']) > 1:
+            st.button("➖ Satz", key=f"del_set_{exercise_name}_{workout_name}",
+                      on_click=delete_last_set, args=card_args)
+    with col_msg:
+        with st.popover("💬 Coach"):
+            st.text_area(
+                "Feedback zur Übung",
+                value=exercise['athlete_message'],
+                key=f"msg_{exercise_name}_{workout_name}",
+                placeholder="z.B. Gewicht war zu leicht, Technik-Fragen, etc."
+            )
+            st.button("Nachricht senden", key=f"send_msg_{exercise_name}_{workout_name}",
+                      on_click=send_exercise_message, args=card_args)
+    with col_remove:
+        st.button("🗑️ Übung", key=f"del_ex_{exercise_name}_{workout_name}", on_click=remove_exercise, args=card_args)
+
+# ---- Offline-Erfassung ----
+# Komponente ohne Build-Schritt (offline_queue/index.html), Warteschlange im localStorage
+offline_queue_component = components.declare_component(
+    "offline_queue", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "offline_queue")
+)
+OFFLINE_ACK_LIMIT = 500  # so viele bestätigte op_ids merkt sich die Session
+
+def sync_offline_queue(user_uuid):
+    """Übernimmt die vom Browser gesendeten Offline-Sätze als ein Bulk-Update (idempotent)."""
+    payload = st.session_state.get("offline_queue") or {}
+    acked = st.session_state.setdefault("offline_acked", [])
+    ops = [op for op in payload.get("ops", []) if op.get("op_id") not in acked]
+    if not ops:
+        return
+    ids = ",".join(sorted({str(int(op['row_id'])) for op in ops}))
+    server_rows = get_supabase_data(TABLE_WORKOUT, f"uuid=eq.{user_uuid}&id=in.({ids})")
+    rows, op_ids, conflicts = resolve_offline_ops(ops, server_rows)
+    ok, conflict_ids = bulk_update_if_unchanged(rows)
+    if not ok or conflict_ids:
+        return  # nicht bestätigen: der Browser sendet erneut und die Ops werden gegen den neuen Stand geprüft
+    acked.extend(op_ids)
+    del acked[:-OFFLINE_ACK_LIMIT]
+    st.session_state.setdefault("offline_conflicts", []).extend(conflicts)
+    st.session_state.offline_synced = st.session_state.get("offline_synced", 0) + len(rows)
+
+def render_offline_logging(user_uuid, workout_index, current_workout):
+    """Ein Workout zum Abhaken im Browser; funktioniert auch ohne Verbindung zum Server."""
+    workout_names = [workout['name'] for workout in workout_index['workouts']]
+    workout_name = st.selectbox(
+        "Workout", workout_names,
+        index=workout_names.index(current_workout) if current_workout in workout_names else 0,
+        key="offline_workout"
+    )
+    workout = workout_index['workouts'][workout_names.index(workout_name)]
+    if st.session_state.get("offline_synced"):
+        st.success(f"☁️ {st.session_state.offline_synced} offline erfasste Sätze synchronisiert")
+    for conflict in st.session_state.pop("offline_conflicts", []):
+        st.warning(conflict)
+    offline_queue_component(
+        user=user_uuid,
+        sets=[
+            {"id": int(row['id']), "exercise": row['exercise'], "set": int(row['set']),
+             "weight": normalize_field("weight", row['weight']), "reps": normalize_field("reps", row['reps']),
+             "rirDone": normalize_field("rirDone", row.get('rirDone')), "completed": bool(row['completed']),
+             "last": row.get('last', "")}
+            for row in workout_set_rows(workout)
+        ],
+        acked=st.session_state.get("offline_acked", [])[-OFFLINE_ACK_LIMIT:],
+        key="offline_queue",
+        default=None
+    )
+
 def export_to_csv(df):
     """Exportiert DataFrame als CSV"""
     return df.to_csv(index=False).encode('utf-8')
@@ -849,13 +1437,30 @@ if st.sidebar.button("🚪 Abmelden"):
     st.session_state.user_email = None
     st.rerun()
 
-# Mobile-optimierte Tabs
-tab_names = ["Training", "KI-Plan", "Stats", "Mehr"]
-tab1, tab2, tab3, tab4 = st.tabs(tab_names)
+TRAINING_MODES = ["Kompakt", "Details", "Schnellerfassung", "Offline"]
 
-with tab1:
+# Mobile-optimierte Navigation: anders als st.tabs läuft nur die gewählte Ansicht,
+# die anderen werden erst beim Öffnen geladen und gerendert
+VIEW_NAMES = ["Training", "KI-Plan", "Stats", "Mehr"]
+active_view = st.segmented_control(
+    "Ansicht", VIEW_NAMES, default=VIEW_NAMES[0], key="active_view", label_visibility="collapsed"
+) or VIEW_NAMES[0]
+
+if active_view != "Training":
+    # Beim Verlassen des Trainings nichts im Autosave-Puffer liegen lassen
+    flush_autosave(force=True)
+
+if active_view == "Training":
     st.subheader("Deine Workouts")
-    df = load_user_workouts(st.session_state.userid)
+    # Offline erfasste Sätze zuerst übernehmen, damit der Index sie schon enthält
+    sync_offline_queue(st.session_state.userid)
+    render_autosave_status()
+    # Konflikte beim automatischen Speichern: außerhalb des Fragments, genau einmal
+    for conflict in st.session_state.pop("autosave_conflicts", []):
+        st.warning(conflict)
+    df, workout_index = get_workout_index(
+        st.session_state.userid, workout_revision(st.session_state.userid), history_revision(st.session_state.userid)
+    )
     
     # Hole Benutzername für neue Workouts
     profile = get_user_profile(st.session_state.userid)
@@ -864,8 +1469,16 @@ with tab1:
     if df.empty:
         st.info("Keine Workouts gefunden. Füge dein erstes Workout hinzu!")
     else:
-        # Export-Button
+        # Darstellung und Export-Button
         col1, col2 = st.columns([4, 1])
+        with col1:
+            training_mode = st.segmented_control(
+                "Darstellung", TRAINING_MODES, default=TRAINING_MODES[0], key="training_mode",
+                help="Kompakt: nur das aktuelle Workout offen, Sätze als Tabelle pro Übung. "
+                     "Schnellerfassung: ganze Workouts als Tabelle, gespeichert mit einem Klick. "
+                     "Offline: vor dem Training wählen – Sätze werden im Browser gespeichert und später synchronisiert."
+            ) or TRAINING_MODES[0]
+            lazy_workouts = training_mode != "Details"
         with col2:
             csv = export_to_csv(df)
             st.download_button(
@@ -875,201 +1488,76 @@ with tab1:
                 mime="text/csv"
             )
         
-        # Gruppiere nach Workout, behalte aber die Reihenfolge bei
-        workout_order = df.groupby('workout').first().sort_values('id').index
-        
-        for workout_name in workout_order:
-            workout_group = df[df['workout'] == workout_name]
-            with st.expander(f"{workout_name}", expanded=False):
-                # Gruppiere nach Übung, behalte aber die Reihenfolge bei
-                exercise_order = workout_group.groupby('exercise').first().sort_values('id').index
+        # Workouts, Übungen und Sätze kommen vorgruppiert und sortiert aus dem Render-Index;
+        # jede Übungskarte ist ein eigenes Fragment und liest ihre Sätze aus exercise_cards
+        exercise_cards = st.session_state.exercise_cards = {}
+        quick_edit_workouts = st.session_state.quick_edit_workouts = {}
+        current_workout = get_current_workout(workout_index)
+        if training_mode == "Offline":
+            render_offline_logging(st.session_state.userid, workout_index, current_workout)
+        else:
+            for workout in workout_index['workouts']:
+                workout_name = workout['name']
+                if lazy_workouts:
+                    # Geschlossene Workouts werden gar nicht erst gerendert (lazy Expander)
+                    workout_expander = st.expander(
+                        workout_name, expanded=workout_name == current_workout,
+                        key=f"workout_open_{workout_name}", on_change="rerun"
+                    )
+                    if not workout_expander.open:
+                        continue
+                else:
+                    workout_expander = st.expander(f"{workout_name}", expanded=False)
+                with workout_expander:
+                    if training_mode == "Schnellerfassung":
+                        quick_edit_workouts[workout_name] = workout
+                        render_quick_edit(st.session_state.userid, workout_name)
+                    else:
+                        for exercise in workout['exercises']:
+                            exercise_cards[(workout_name, exercise['name'])] = exercise
+                            if training_mode == "Kompakt":
+                                render_exercise_grid(st.session_state.userid, workout_name, exercise['name'])
+                            else:
+                                render_exercise_card(st.session_state.userid, workout_name, exercise['name'])
                 
-                for exercise_name in exercise_order:
-                    exercise_group = workout_group[workout_group['exercise'] == exercise_name]
-                    with st.expander(f"💪 {exercise_name}", expanded=False):
-                        # Nachricht vom Coach anzeigen, falls vorhanden
-                        coach_msg = exercise_group.iloc[0]['messageFromCoach']
-                        if coach_msg and coach_msg.strip():
-                            st.info(f"💬 Hinweis vom Coach: {coach_msg}")
+                    # Formular zum Hinzufügen einer neuen Übung in Expander
+                    with st.expander("➕ Neue Übung hinzufügen", expanded=False):
+                        with st.form(key=f"add_exercise_form_{workout_name}"):
+                            col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+                            with col1:
+                                new_exercise_name = st.text_input("Übungsname", placeholder="z.B. Bizeps Curls")
+                            with col2:
+                                new_exercise_sets = st.number_input("Sätze", min_value=1, value=3)
+                            with col3:
+                                new_exercise_weight = st.number_input("Gewicht", min_value=0.0, value=0.0, step=0.5)
+                            with col4:
+                                new_exercise_reps = st.number_input("Wdh", min_value=1, value=10)
                         
-                        # Sortiere Sätze nach Satz-Nummer
-                        exercise_group = exercise_group.sort_values('set')
-                        
-                        for idx, row in exercise_group.iterrows():
-                            completed = row['completed']
-                            bg_color = "#d4edda" if completed else "#f8f9fa"
-                            
-                            with st.container():
-                                st.markdown(
-                                    f"""<div style='background-color: {bg_color}; 
-                                    padding: 15px; 
-                                    border-radius: 8px; 
-                                    margin-bottom: 10px;
-                                    border: 1px solid {"#c3e6cb" if completed else "#dee2e6"};'>""", 
-                                    unsafe_allow_html=True
-                                )
-                                
-                                col1, col2, col3, col4, col5 = st.columns([1, 2, 2, 2, 2])
-                                
-                                with col1:
-                                    st.markdown(f"**Satz {row['set']}**")
-                                
-                                with col2:
-                                    # Bearbeitbares Gewicht
-                                    new_weight = st.number_input(
-                                        "Gewicht (kg)", 
-                                        value=float(row['weight']), 
-                                        min_value=0.0,
-                                        step=0.5,
-                                        key=f"weight_{row['id']}",
-                                        disabled=completed
-                                    )
-                                
-                                with col3:
-                                    # Bearbeitbare Wiederholungen
-                                    try:
-                                        reps_value = int(row['reps'])
-                                    except:
-                                        reps_value = 10
-                                    
-                                    new_reps = st.number_input(
-                                        "Wiederholungen", 
-                                        value=reps_value,
-                                        min_value=1,
-                                        step=1,
-                                        key=f"reps_{row['id']}",
-                                        disabled=completed
-                                    )
-                                
-                                with col4:
-                                    # RIR (Reps in Reserve)
-                                    try:
-                                        rir_value = int(row['rirDone']) if row['rirDone'] else 0
-                                    except:
-                                        rir_value = 0
-                                    
-                                    rir_done = st.number_input(
-                                        "RIR", 
-                                        value=rir_value,
-                                        min_value=0,
-                                        max_value=10,
-                                        step=1,
-                                        key=f"rir_{row['id']}",
-                                        help="Reps in Reserve - Wie viele Wiederholungen hättest du noch schaffen können?",
-                                        disabled=completed
-                                    )
-                                
-                                with col5:
-                                    if not completed:
-                                        # Speichern und als erledigt markieren
-                                        if st.button("✅ Speichern & Erledigt", key=f"save_{row['id']}"):
-                                            update = {
-                                                "weight": new_weight,
-                                                "reps": str(new_reps),
-                                                "rirDone": rir_done,
-                                                "completed": True,
-                                                "time": datetime.datetime.now(datetime.timezone.utc).isoformat()
-                                            }
-                                            
-                                            success = update_supabase_data(TABLE_WORKOUT, update, row['id'])
-                                            if success:
-                                                st.success("Gespeichert!")
-                                                st.rerun()
-                                            else:
-                                                st.error("Fehler beim Speichern")
-                                    else:
-                                        # Option zum Zurücksetzen
-                                        if st.button("↩️ Zurücksetzen", key=f"reset_{row['id']}"):
-                                            update = {"completed": False}
-                                            success = update_supabase_data(TABLE_WORKOUT, update, row['id'])
-                                            if success:
-                                                st.rerun()
-                                
-                                st.markdown("</div>", unsafe_allow_html=True)
-                        
-                        # Buttons für Satzverwaltung NACH allen Sätzen
-                        col_add, col_del, col_space = st.columns([1, 1, 3])
-                        with col_add:
-                            if st.button("➕ Satz hinzufügen", key=f"add_set_{exercise_name}_{workout_name}"):
-                                last_set = exercise_group.iloc[-1]
-                                new_set_number = exercise_group['set'].max() + 1
-                                if add_set_to_exercise(st.session_state.userid, last_set.to_dict(), new_set_number):
-                                    st.success("Satz hinzugefügt!")
-                                    st.rerun()
-                        
-                        with col_del:
-                            if len(exercise_group) > 1:
-                                if st.button("➖ Letzten Satz löschen", key=f"del_set_{exercise_name}_{workout_name}"):
-                                    last_set_id = exercise_group.iloc[-1]['id']
-                                    if delete_supabase_data(TABLE_WORKOUT, last_set_id):
-                                        st.success("Satz gelöscht!")
+                            if st.form_submit_button("➕ Übung hinzufügen"):
+                                if new_exercise_name:
+                                    if add_or_suggest_exercise(
+                                        f"add_exercise_form_{workout_name}", "exercise",
+                                        user_uuid=st.session_state.userid,
+                                        workout_name=workout_name,
+                                        exercise_name=new_exercise_name,
+                                        sets=new_exercise_sets,
+                                        weight=new_exercise_weight,
+                                        reps=str(new_exercise_reps)
+                                    ):
+                                        st.success(f"Übung '{new_exercise_name}' hinzugefügt!")
                                         st.rerun()
-                        
-                        # Nachricht an den Coach
-                        with st.expander("💬 Nachricht an Coach", expanded=False):
-                            current_message = exercise_group.iloc[0].get('messageToCoach', '')
-                            message = st.text_area(
-                                "Feedback zur Übung",
-                                value=current_message,
-                                key=f"msg_{exercise_name}_{workout_name}",
-                                placeholder="z.B. Gewicht war zu leicht, Technik-Fragen, etc."
-                            )
-                            if st.button("Nachricht senden", key=f"send_msg_{exercise_name}_{workout_name}"):
-                                # Update alle Sätze dieser Übung mit der Nachricht
-                                success = True
-                                for _, row in exercise_group.iterrows():
-                                    update = {"messageToCoach": message}
-                                    if not update_supabase_data(TABLE_WORKOUT, update, row['id']):
-                                        success = False
-                                if success:
-                                    st.success("Nachricht gesendet!")
-                                    st.rerun()
-                        
-                        # Übung löschen Button am Ende
-                        st.markdown("---")
-                        col1, col2, col3 = st.columns([3, 1, 1])
-                        with col3:
-                            if st.button("🗑️ Übung löschen", key=f"del_ex_{exercise_name}_{workout_name}"):
-                                if delete_exercise(st.session_state.userid, workout_name, exercise_name):
-                                    st.success(f"Übung '{exercise_name}' gelöscht!")
-                                    st.rerun()
-                
-                # Formular zum Hinzufügen einer neuen Übung in Expander
-                with st.expander("➕ Neue Übung hinzufügen", expanded=False):
-                    with st.form(key=f"add_exercise_form_{workout_name}"):
-                        col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
-                        with col1:
-                            new_exercise_name = st.text_input("Übungsname", placeholder="z.B. Bizeps Curls")
-                        with col2:
-                            new_exercise_sets = st.number_input("Sätze", min_value=1, value=3)
-                        with col3:
-                            new_exercise_weight = st.number_input("Gewicht", min_value=0.0, value=0.0, step=0.5)
-                        with col4:
-                            new_exercise_reps = st.number_input("Wdh", min_value=1, value=10)
-                        
-                        if st.form_submit_button("➕ Übung hinzufügen"):
-                            if new_exercise_name:
-                                if add_exercise_to_workout(
-                                    st.session_state.userid, 
-                                    workout_name, 
-                                    new_exercise_name, 
-                                    new_exercise_sets, 
-                                    new_exercise_weight, 
-                                    str(new_exercise_reps)
-                                ):
-                                    st.success(f"Übung '{new_exercise_name}' hinzugefügt!")
-                                    st.rerun()
-                            else:
-                                st.error("Bitte gib einen Übungsnamen ein")
+                                else:
+                                    st.error("Bitte gib einen Übungsnamen ein")
+                        render_exercise_suggestion(f"add_exercise_form_{workout_name}")
                 
-                # Workout löschen Button am Ende
-                st.markdown("---")
-                col1, col2, col3 = st.columns([3, 1, 1])
-                with col3:
-                    if st.button(f"🗑️ Workout löschen", key=f"del_workout_{workout_name}"):
-                        if delete_workout(st.session_state.userid, workout_name):
-                            st.success(f"Workout '{workout_name}' gelöscht!")
-                            st.rerun()
+                    # Workout löschen Button am Ende
+                    st.markdown("---")
+                    col1, col2, col3 = st.columns([3, 1, 1])
+                    with col3:
+                        if st.button(f"🗑️ Workout löschen", key=f"del_workout_{workout_name}"):
+                            if delete_workout(st.session_state.userid, workout_name):
+                                st.success(f"Workout '{workout_name}' gelöscht!")
+                                st.rerun()
     
     # Formular für neues Workout in Expander
     with st.expander("🆕 Neues Workout erstellen", expanded=False):
@@ -1092,21 +1580,23 @@ with tab1:
             
             if st.form_submit_button("🆕 Workout erstellen"):
                 if new_workout_name and first_exercise_name:
-                    if add_workout(
-                        st.session_state.userid,
-                        user_name,
-                        new_workout_name,
-                        first_exercise_name,
-                        first_exercise_sets,
-                        first_exercise_weight,
-                        str(first_exercise_reps)
+                    if add_or_suggest_exercise(
+                        "add_workout_form", "workout",
+                        user_uuid=st.session_state.userid,
+                        user_name=user_name,
+                        workout_name=new_workout_name,
+                        exercise_name=first_exercise_name,
+                        sets=first_exercise_sets,
+                        weight=first_exercise_weight,
+                        reps=str(first_exercise_reps)
                     ):
                         st.success(f"Workout '{new_workout_name}' erstellt!")
                         st.rerun()
                 else:
                     st.error("Bitte gib sowohl einen Workout-Namen als auch eine erste Übung ein")
+        render_exercise_suggestion("add_workout_form")
 
-with tab2:
+if active_view == "KI-Plan":
     st.subheader("Neuen Trainingsplan mit KI erstellen")
     
     if not client:
@@ -1169,51 +1659,95 @@ with tab2:
         with col3:
             focus = st.selectbox("Fokus", ["Ausgewogen", "Kraft", "Hypertrophie", "Kraftausdauer"])
         
-        if st.button("Plan generieren", type="primary"):
-            with st.spinner("KI erstellt deinen personalisierten Plan..."):
-                # Lade Prompt und Config
-                ai_config = get_ai_prompt_template()
-                
-                # Erstelle Prompt mit Template
-                if "Keine Trainingshistorie vorhanden" in history_summary:
-                    weight_instruction = "Setze alle Gewichte auf 0 kg, da keine Trainingshistorie vorhanden ist."
-                else:
-                    weight_instruction = "Basiere die Gewichte auf der Trainingshistorie und passe sie progressiv an."
-                
-                if not additional_info or additional_info.strip() == "":
-                    additional_info = "Keine zusätzlichen Wünsche angegeben."
-
-                prompt = ai_config['prompt'].format(
-                    profile=comprehensive_profile,
-                    history_analysis=history_summary,
-                    additional_info=additional_info,
-                    training_days=training_days,
-                    split_type=split_type,
-                    focus=focus,
-                    weight_instruction=weight_instruction
+        bypass_cache = st.checkbox(
+            "Neue Variante erzeugen (Cache umgehen)",
+            help="Bei identischen Eingaben wird sonst der zuletzt generierte Plan sofort wiederverwendet."
+        )
+        
+        user_name = comprehensive_profile.get('name', 'Unbekannt')
+        job_queue = get_plan_job_queue()
+        
+        # Nach Seitenwechsel oder Verbindungsabbruch: noch nicht abgeholten Einzelplan wieder aufnehmen
+        # (nie während eines Variantenvergleichs – Varianten übernimmt nur die Auswahl des Users)
+        if ('plan_job_id' not in st.session_state and 'plan_variant_jobs' not in st.session_state
+                and not st.session_state.get('ai_plan')):
+            pending_job = job_queue.store.latest_unclaimed(st.session_state.userid)
+            if pending_job:
+                st.session_state['plan_job_id'] = pending_job['id']
+        
+        if st.button("Plan generieren", type="primary", disabled='plan_job_id' in st.session_state):
+            plan_request = build_plan_request(
+                user_name, comprehensive_profile, history_summary, additional_info,
+                training_days, split_type, focus
+            )
+            cached_plan = None if bypass_cache else get_plan_cache().get(plan_request['cache_key'])
+            
+            if cached_plan:
+                parsed_rows, plan_explanation, warnings, _ = parse_plan_response(
+                    cached_plan, st.session_state.userid, user_name
                 )
-                
-                try:
-                    response = client.chat.completions.create(
-                        model=ai_config['model'],
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=ai_config['temperature'],
-                        max_tokens=ai_config['max_tokens'],
-                        top_p=ai_config['top_p']
-                    )
-                    
-                    plan_text = response.choices[0].message.content
-                    st.session_state['ai_plan'] = plan_text
-                    parsed_rows, plan_explanation = parse_ai_plan_to_rows(
-                        plan_text,
-                        st.session_state.userid,
-                        comprehensive_profile.get('name', 'Unbekannt')
+                apply_plan_result(cached_plan, parsed_rows, plan_explanation, warnings, training_days)
+                st.info("♻️ Gleiche Eingaben wie zuvor – Plan aus dem Cache geladen. Für eine neue Variante 'Cache umgehen' aktivieren.")
+            else:
+                st.session_state['plan_job_id'] = job_queue.submit(st.session_state.userid, plan_request)
+                st.session_state.pop('ai_plan_error', None)
+        
+        # Mehrere Varianten parallel generieren und vergleichen
+        with st.expander("🔀 Mehrere Varianten vergleichen", expanded=False):
+            variant_splits = st.multiselect(
+                "Split-Typen", ["Ganzkörper", "2er Split", "3er Split", "Push/Pull/Legs", "Individuell"],
+                default=[split_type]
+            )
+            variant_focuses = st.multiselect(
+                "Fokus-Varianten", ["Ausgewogen", "Kraft", "Hypertrophie", "Kraftausdauer"], default=[focus]
+            )
+            combinations = list(itertools.product(variant_splits, variant_focuses))[:MAX_PLAN_VARIANTS]
+            if len(combinations) == 1:
+                # Gleiche Parameter: Varianten unterscheiden sich nur über den Seed
+                variant_count = st.slider("Anzahl Varianten", 2, MAX_PLAN_VARIANTS, 3)
+                combinations = combinations * variant_count
+            st.caption(f"{len(combinations)} Varianten werden gleichzeitig erstellt (max. {MAX_PLAN_VARIANTS}).")
+            
+            if st.button("Varianten generieren", disabled=not combinations or 'plan_variant_jobs' in st.session_state):
+                variant_jobs = []
+                for seed, (variant_split, variant_focus) in enumerate(combinations, 1):
+                    plan_request = build_plan_request(
+                        user_name, comprehensive_profile, history_summary, additional_info,
+                        training_days, variant_split, variant_focus, seed=seed
                     )
-                    st.session_state['ai_plan_rows'] = parsed_rows
-                    st.session_state['ai_plan_explanation'] = plan_explanation
-                    
-                except Exception as e:
-                    st.error(f"Fehler bei der KI-Generierung: {e}")
+                    variant_jobs.append({
+                        'label': f"{variant_split} · {variant_focus} (#{seed})",
+                        'job_id': job_queue.submit(st.session_state.userid, plan_request, JOB_KIND_VARIANT),
+                    })
+                st.session_state['plan_variant_jobs'] = variant_jobs
+                st.session_state.pop('plan_variants_ready', None)
+        
+        if 'plan_variant_jobs' in st.session_state:
+            st.markdown("### 🔀 Variantenvergleich")
+            if st.session_state.get('plan_variants_ready'):
+                variant_jobs = st.session_state['plan_variant_jobs']
+                render_plan_variants(variant_jobs, [job_queue.store.get(variant['job_id']) for variant in variant_jobs])
+                if st.button("Vergleich verwerfen"):
+                    for variant in variant_jobs:
+                        job_queue.store.claim(variant['job_id'])
+                    st.session_state.pop('plan_variant_jobs', None)
+                    st.rerun()
+            else:
+                render_plan_variants_status()
+        
+        if 'plan_job_id' in st.session_state:
+            render_plan_job_status(user_name)
+        
+        if st.session_state.get('ai_plan_error'):
+            st.error(f"Fehler bei der KI-Generierung: {st.session_state['ai_plan_error']}")
+        
+        for warning in st.session_state.get('ai_plan_warnings', []):
+            st.warning(warning)
+        
+        if st.session_state.get('ai_plan_fixes'):
+            with st.expander(f"🔧 {len(st.session_state['ai_plan_fixes'])} Korrekturen am Plan automatisch vorgenommen", expanded=False):
+                for fix in st.session_state['ai_plan_fixes']:
+                    st.write(f"• {fix}")
         
         # Zeige generierten Plan
         if 'ai_plan' in st.session_state and st.session_state['ai_plan']:
@@ -1227,6 +1761,8 @@ with tab2:
                     del st.session_state['ai_plan_rows']
                     if 'ai_plan_explanation' in st.session_state:
                         del st.session_state['ai_plan_explanation']
+                    st.session_state.pop('ai_plan_warnings', None)
+                    st.session_state.pop('ai_plan_fixes', None)
                     st.session_state.plan_activated_success = False # Für den nächsten Durchlauf zurücksetzen
                     st.rerun()
             else:
@@ -1265,25 +1801,34 @@ with tab2:
                 # Vollständiger Plan in Expander
                 with st.expander("📄 Vollständiger Plan anzeigen", expanded=False):
                     st.text_area("", value=st.session_state['ai_plan'], height=400, disabled=True)
+                    # Prozessweite Zähler aller Mitglieder: nur im Debug-Modus zeigen
+                    if st.secrets.get("debug", False):
+                        if PARSE_STATS:
+                            st.caption("Parser-Statistik: " + ", ".join(f"{key}: {value}" for key, value in sorted(PARSE_STATS.items())))
+                        scheduler_state = get_rate_scheduler().snapshot()
+                        st.caption(
+                            f"KI-Auslastung: {scheduler_state['running']} laufend, {scheduler_state['waiting']} wartend, "
+                            f"{scheduler_state['requests_last_minute']} Anfragen / {scheduler_state['tokens_last_minute']:,} Tokens in der letzten Minute"
+                        )
                 
                 if st.session_state.get('ai_plan_rows'):
+                    # Nur geänderte Sätze anfassen; Fortschritt in unveränderten Sätzen bleibt erhalten
+                    plan_changes = get_plan_changes(st.session_state.userid, st.session_state['ai_plan_rows'])
+                    st.markdown("### 🔄 Änderungen gegenüber deinem aktuellen Plan")
+                    change_cols = st.columns(4)
+                    change_cols[0].metric("Neu", len(plan_changes['insert']))
+                    change_cols[1].metric("Geändert", len(plan_changes['update']))
+                    change_cols[2].metric("Entfernt", len(plan_changes['delete']))
+                    change_cols[3].metric("Unverändert", plan_changes['unchanged'])
+                    change_lines = describe_changes(plan_changes)
+                    if change_lines:
+                        with st.expander("Alle Änderungen anzeigen", expanded=False):
+                            st.text("\n".join(change_lines))
+                    
                     col1, col2 = st.columns(2)
                     with col1:
                         if st.button("Plan aktivieren", type="primary", use_container_width=True, key="activate_plan"):
-                            # Lösche aktuelle Workouts
-                            df = load_user_workouts(st.session_state.userid)
-                            if not df.empty:
-                                for _, row in df.iterrows():
-                                    delete_supabase_data(TABLE_WORKOUT, row['id'])
-                            
-                            # Füge neue Workouts hinzu
-                            success = True
-                            for row_data in st.session_state['ai_plan_rows']:
-                                if not insert_supabase_data(TABLE_WORKOUT, row_data):
-                                    success = False
-                                    break
-                            
-                            if success:
+                            if apply_plan_changes(st.session_state.userid, plan_changes):
                                 # Setze Erfolgs-Flag und lade neu, um die Erfolgsmeldung anzuzeigen
                                 st.session_state.plan_activated_success = True
                                 st.rerun()
@@ -1297,65 +1842,88 @@ with tab2:
                             del st.session_state['ai_plan_rows']
                             if 'ai_plan_explanation' in st.session_state:
                                 del st.session_state['ai_plan_explanation']
+                            st.session_state.pop('ai_plan_warnings', None)
+                            st.session_state.pop('ai_plan_fixes', None)
                             st.session_state.plan_activated_success = False
                             st.rerun()
             # --- ENDE DER KORRIGIERTEN LOGIK ---
 
-with tab3:
+if active_view == "Stats":
     st.subheader("Deine Trainingsanalyse")
     
-    _, archive_df = analyze_workout_history(st.session_state.userid)
+    # Alle Übungen vorberechnet; Auswahl und Auflösung sind nur noch Schlüssel-Zugriffe
+    exercise_stats_by_name = get_exercise_stats(st.session_state.userid, history_revision(st.session_state.userid))
     
-    if archive_df.empty:
+    if not exercise_stats_by_name:
         st.info("Noch keine archivierten Daten vorhanden. Trainiere und archiviere zuerst einige Workouts.")
     else:
-        # Berechne Volumen
-        archive_df['volume'] = archive_df['weight'] * archive_df['reps']
-        
         # Übungsauswahl
-        exercises = sorted(archive_df['exercise'].unique())
-        selected_exercise = st.selectbox("Wähle eine Übung für die Analyse:", exercises)
+        selected_exercise = st.selectbox("Wähle eine Übung für die Analyse:", list(exercise_stats_by_name))
         
         if selected_exercise:
-            exercise_df = archive_df[archive_df['exercise'] == selected_exercise]
-            
-            # Konvertiere date zu datetime
-            exercise_df['date'] = pd.to_datetime(exercise_df['date'])
-            
-            # Gruppiere nach Datum
-            daily_stats = exercise_df.groupby('date').agg({
-                'weight': 'max',
-                'reps': 'mean',
-                'volume': 'sum'
-            }).reset_index()
+            stats = exercise_stats_by_name[selected_exercise]
+            metrics = stats['metrics']
+            resolution = st.radio("Auflösung", ["Tag", "Woche", "Monat"], horizontal=True, key="chart_resolution")
+            chart_series = stats['series'][resolution]
             
             # Visualisierungen
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("#### Gewichtsentwicklung")
-                st.line_chart(daily_stats.set_index('date')['weight'])
+                st.line_chart(chart_series['weight'])
             
             with col2:
-                st.markdown("#### Volumen pro Training")
-                st.bar_chart(daily_stats.set_index('date')['volume'])
+                st.markdown(f"#### Volumen pro {'Training' if resolution == 'Tag' else resolution}")
+                st.bar_chart(chart_series['volume'])
             
             # Statistiken
             st.markdown("#### Statistiken")
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                st.metric("Max Gewicht", f"{exercise_df['weight'].max():.1f} kg")
+                st.metric("Max Gewicht", f"{metrics['max_weight']:.1f} kg")
             with col2:
-                st.metric("Ø Wiederholungen", f"{exercise_df['reps'].mean():.1f}")
+                st.metric("Ø Wiederholungen", f"{metrics['avg_reps']:.1f}")
             with col3:
-                st.metric("Trainings", len(daily_stats))
+                st.metric("Trainings", metrics['sessions'])
             with col4:
-                if len(daily_stats) > 1:
-                    weight_change = daily_stats.iloc[-1]['weight'] - daily_stats.iloc[0]['weight']
-                    st.metric("Fortschritt", f"{weight_change:+.1f} kg")
+                if metrics['progress'] is not None:
+                    st.metric("Fortschritt", f"{metrics['progress']:+.1f} kg")
+
+        # Belastungssteuerung über alle Übungen
+        st.markdown("---")
+        st.markdown("### Belastungssteuerung")
+        load = get_training_load(st.session_state.userid, history_revision(st.session_state.userid))
+        weekly = load['weekly']
+        if not weekly.empty:
+            current_acwr = load['daily']['acwr'].iloc[-1]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Tonnage diese Woche", f"{weekly['tonnage'].iloc[-1]:,.0f} kg")
+            with col2:
+                st.metric(
+                    "Acute:Chronic Ratio",
+                    "–" if pd.isna(current_acwr) else f"{current_acwr:.2f}",
+                    help="Last der letzten 7 Tage im Verhältnis zum Wochenschnitt der letzten 28 Tage"
+                )
+                st.caption(acwr_zone(current_acwr))
+            with col3:
+                current_rir = weekly['rir_trend'].iloc[-1]
+                st.metric("RIR-Trend (3 Wochen)", "–" if pd.isna(current_rir) else f"{current_rir:.1f}")
+
+            load_view = st.radio("Tonnage pro Woche nach", ["Muskelgruppe", "Workout"], horizontal=True)
+            st.bar_chart(load['weekly_muscle'] if load_view == "Muskelgruppe" else load['weekly_workout'])
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("#### Acute:Chronic Workload Ratio")
+                st.line_chart(weekly['acwr'])
+            with col2:
+                st.markdown("#### RIR-Verlauf")
+                st.line_chart(weekly[['rir', 'rir_trend']])
 
-with tab4:
+if active_view == "Mehr":
     st.subheader("Verwaltung")
     
     col1, col2 = st.columns(2)
@@ -1366,6 +1934,7 @@ with tab4:
         
         if st.button("📦 Manuell archivieren", type="primary"):
             success, message = archive_completed_workouts(st.session_state.userid)
+            clear_history_caches(st.session_state.userid)
             if success:
                 st.success(message)
                 st.rerun()
@@ -1396,3 +1965,12 @@ with tab4:
                 file_name=f"training_history_{datetime.date.today()}.csv",
                 mime="text/csv"
             )
+
+# ---- Laufzeit pro Rerun (nur mit debug = true in .streamlit/secrets.toml) ----
+if st.secrets.get("debug", False):
+    rerun_timings = st.session_state.setdefault("rerun_timings", {})
+    timings = rerun_timings.setdefault(active_view, deque(maxlen=20))
+    timings.append(time.perf_counter() - rerun_started)
+    timing_parts = [f"⏱️ Rerun {active_view}: {timings[-1] * 1000:.0f} ms (Ø {sum(timings) / len(timings) * 1000:.0f} ms)"]
+    timing_parts += [f"{view} Ø {sum(t) / len(t) * 1000:.0f} ms" for view, t in rerun_timings.items() if view != active_view]
+    st.sidebar.caption(" · ".join(timing_parts))
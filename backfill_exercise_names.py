@@ -0,0 +1,108 @@
+"""Vereinheitlicht Übungsnamen in bestehenden Daten (workout_history, workouts).
+
+Lädt id und Übungsname seitenweise, ordnet jede unterschiedliche Schreibweise
+einmal dem Katalog zu (exercise_catalog.py) und schreibt die Änderungen als
+Bulk-PATCH: eine Anfrage pro Zielname und Block von ids (id=in.(...)).
+
+Umbenannt werden nur exakte Treffer auf Name oder Alias. Unscharfe Treffer
+stehen als Vorschlag im Protokoll; wer sie übernehmen will, trägt sie als
+Alias in den Katalog ein. Ohne --apply wird nichts geschrieben. Jeder Lauf
+schreibt ein JSON-Protokoll (alter Name, neuer Name, betroffene ids), mit dem
+sich eine Umbenennung gezielt zurücknehmen lässt.
+
+Aufruf:
+    python backfill_exercise_names.py                    # nur Protokoll, nichts schreiben
+    python backfill_exercise_names.py --apply --table workout_history --table workouts
+"""
+import argparse
+import datetime
+import json
+import time
+from collections import defaultdict
+
+import requests
+
+from exercise_catalog import get_exercise_index
+from studio_analytics import HEADERS, SUPABASE_URL, TABLE_ARCHIVE, fetch_all_pages
+
+TABLE_WORKOUT = "workouts"
+PATCH_CHUNK_SIZE = 200  # ids pro PATCH (Länge der URL bleibt überschaubar)
+
+
+def plan_renames(rows):
+    """Umbenennungen (exakte Treffer) und Vorschläge (unscharfe Treffer) pro Schreibweise.
+
+    Liefert ({alter Name: {"target", "ids"}}, {alter Name: {"suggestion", "score", "ids"}}).
+    """
+    index = get_exercise_index()
+    ids_by_name = defaultdict(list)
+    for row in rows:
+        if row.get("exercise"):
+            ids_by_name[row["exercise"]].append(row["id"])
+    renames, suggestions = {}, {}
+    for name, ids in ids_by_name.items():
+        cleaned = " ".join(str(name).split())
+        target = index.canonical_name(cleaned)
+        if target != name:
+            renames[name] = {"target": target, "ids": ids}
+            continue
+        suggestion = index.suggestion(cleaned)
+        if suggestion:
+            suggestions[name] = {"suggestion": suggestion, "score": round(index.match(cleaned)[1], 2), "ids": ids}
+    return renames, suggestions
+
+
+def write_log(path, table, renames, suggestions, applied):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"table": table, "applied": applied, "created_at": datetime.datetime.now().isoformat(),
+                   "renames": renames, "suggestions": suggestions}, f, ensure_ascii=False, indent=1)
+
+
+def apply_renames(table, renames, chunk_size=PATCH_CHUNK_SIZE):
+    ids_by_target = defaultdict(list)
+    for rename in renames.values():
+        ids_by_target[rename["target"]].extend(rename["ids"])
+    requests_sent = 0
+    for target, ids in ids_by_target.items():
+        for start in range(0, len(ids), chunk_size):
+            chunk = ",".join(str(row_id) for row_id in ids[start:start + chunk_size])
+            response = requests.patch(
+                f"{SUPABASE_URL}/rest/v1/{table}?id=in.({chunk})",
+                headers=HEADERS, json={"exercise": target}, timeout=60
+            )
+            if response.status_code not in (200, 204):
+                raise RuntimeError(f"Fehler beim Aktualisieren von {table}: {response.text}")
+            requests_sent += 1
+    return requests_sent
+
+
+def run(tables, apply=False):
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    for table in tables:
+        start = time.perf_counter()
+        rows = fetch_all_pages(table, "id,exercise")
+        renames, suggestions = plan_renames(rows)
+        n_rows = sum(len(rename["ids"]) for rename in renames.values())
+        print(f"{table}: {len(rows)} Zeilen, {len(renames)} Schreibweisen umzubenennen ({n_rows} Zeilen), "
+              f"{len(suggestions)} Vorschläge")
+        for name, rename in sorted(renames.items(), key=lambda item: item[1]["target"]):
+            print(f"  {name!r:40} → {rename['target']!r}")
+        for name, suggestion in sorted(suggestions.items(), key=lambda item: item[1]["suggestion"]):
+            print(f"  {name!r:40} ? {suggestion['suggestion']!r} ({suggestion['score']:.2f}, nicht umbenannt)")
+        log_path = f"backfill_exercise_names_{table}_{stamp}.json"
+        write_log(log_path, table, renames, suggestions, applied=apply and bool(renames))
+        print(f"  Protokoll: {log_path}")
+        if apply and renames:
+            requests_sent = apply_renames(table, renames)
+            print(f"  {requests_sent} PATCH-Anfragen in {time.perf_counter() - start:.2f} s")
+        elif renames:
+            print("  Nichts geschrieben – zum Übernehmen mit --apply aufrufen")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Übungsnamen auf den Katalog vereinheitlichen")
+    parser.add_argument("--table", action="append", choices=[TABLE_ARCHIVE, TABLE_WORKOUT],
+                        help="Tabelle(n); Standard: workout_history und workouts")
+    parser.add_argument("--apply", action="store_true", help="Umbenennungen wirklich schreiben (sonst nur Protokoll)")
+    args = parser.parse_args()
+    run(args.table or [TABLE_ARCHIVE, TABLE_WORKOUT], apply=args.apply)
@@ -0,0 +1,106 @@
+"""Batch-fähige LLM-Schnittstelle für viele Plan-Generierungen auf einmal.
+
+Alle Backends haben dieselbe Methode run(requests): requests ist eine Liste
+von Dicts mit custom_id und den Parametern einer Chat-Completion (model,
+messages, temperature, ...). Zurück kommt ein Dict custom_id -> {"text", "error"}.
+
+- OpenAIBatchBackend: OpenAI Batch API (JSONL-Upload, Auswertung nach Abschluss,
+  halber Preis, Ergebnis innerhalb des completion_window)
+- ConcurrentChatBackend: parallele Chat-Completions (sofortiges Ergebnis,
+  funktioniert auch gegen jeden OpenAI-kompatiblen Endpunkt)
+- MockBatchBackend: liefert Pläne aus plan_corpus/, deterministisch pro custom_id
+"""
+import glob
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BATCH_POLL_SECONDS = 30
+BATCH_TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+CHAT_MAX_WORKERS = 8
+
+
+class OpenAIBatchBackend:
+    def __init__(self, client, poll_seconds=BATCH_POLL_SECONDS, completion_window="24h"):
+        self.client = client
+        self.poll_seconds = poll_seconds
+        self.completion_window = completion_window
+
+    def run(self, requests):
+        lines = [
+            json.dumps({"custom_id": request["custom_id"], "method": "POST", "url": "/v1/chat/completions",
+                        "body": {key: value for key, value in request.items() if key != "custom_id"}},
+                       ensure_ascii=False)
+            for request in requests
+        ]
+        input_file = self.client.files.create(
+            file=("plan_batch.jsonl", io.BytesIO("\n".join(lines).encode("utf-8"))), purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id, endpoint="/v1/chat/completions",
+            completion_window=self.completion_window
+        )
+        print(f"Batch {batch.id} angelegt ({len(requests)} Anfragen)")
+        while batch.status not in BATCH_TERMINAL_STATES:
+            time.sleep(self.poll_seconds)
+            batch = self.client.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            print(f"  {batch.status}: {counts.completed}/{counts.total} fertig, {counts.failed} fehlgeschlagen")
+
+        results = {request["custom_id"]: {"text": None, "error": f"Batch {batch.status}"} for request in requests}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    text = response["body"]["choices"][0]["message"]["content"]
+                    results[item["custom_id"]] = {"text": text, "error": None}
+                else:
+                    error = item.get("error") or response.get("body", {}).get("error")
+                    results[item["custom_id"]] = {"text": None, "error": str(error)}
+        return results
+
+
+class ConcurrentChatBackend:
+    def __init__(self, client, max_workers=CHAT_MAX_WORKERS):
+        self.client = client
+        self.max_workers = max_workers
+
+    def _complete(self, request):
+        try:
+            response = self.client.chat.completions.create(
+                **{key: value for key, value in request.items() if key != "custom_id"}
+            )
+            return {"text": response.choices[0].message.content, "error": None}
+        except Exception as e:
+            return {"text": None, "error": str(e)}
+
+    def run(self, requests):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan-batch") as pool:
+            texts = pool.map(self._complete, requests)
+            return {request["custom_id"]: result for request, result in zip(requests, texts)}
+
+
+class MockBatchBackend:
+    """Offline-Backend für Tests: JSON-Pläne bei response_format, sonst Text-Pläne aus dem Korpus."""
+
+    def __init__(self, corpus_dir="plan_corpus"):
+        paths = sorted(glob.glob(os.path.join(corpus_dir, "*.txt")) + glob.glob(os.path.join(corpus_dir, "*.json")))
+        paths = [path for path in paths if os.path.basename(path) != "expected.json"]
+        self.text_plans = [open(path, encoding="utf-8").read() for path in paths if path.endswith(".txt")]
+        self.json_plans = [open(path, encoding="utf-8").read() for path in paths if path.endswith(".json")]
+
+    def run(self, requests):
+        results = {}
+        for request in requests:
+            plans = self.json_plans if "response_format" in request and self.json_plans else self.text_plans
+            index = int(hashlib.sha256(request["custom_id"].encode("utf-8")).hexdigest(), 16) % len(plans)
+            results[request["custom_id"]] = {"text": plans[index], "error": None}
+        return results
@@ -0,0 +1,201 @@
+"""Neue Trainingspläne für alle aktiven Mitglieder eines Studios auf einmal.
+
+Ablauf:
+1. Fragebogen und Trainingshistorie seitenweise laden, aktive Mitglieder wählen
+   (mindestens ein Training in den letzten --active-weeks Wochen)
+2. Prompts pro Mitglied bauen (Profil, Historie, Belastung) – im Prozess-Pool
+3. Alle Anfragen über ein Batch-Backend schicken (siehe batch_llm.py)
+4. Antworten im Prozess-Pool parsen und lokal reparieren (plan_repair.py)
+5. Pläne für die Coach-Prüfung ablegen: CSV und optional als Bulk-Insert in
+   eine Staging-Tabelle (Spalten wie workouts plus batch_id, angelegt durch
+   migrations/003_workouts_staging.sql)
+
+Aufruf:
+    python batch_plans.py --backend mock --studio Zentrum --limit 20
+    python batch_plans.py --backend openai-batch --stage-table workouts_staging
+"""
+import argparse
+import datetime
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import requests
+import streamlit as st
+
+from batch_llm import ConcurrentChatBackend, MockBatchBackend, OpenAIBatchBackend
+from plan_inputs import build_comprehensive_profile, load_prompt_config, render_plan_request, summarize_workout_history
+from plan_parser import PLAN_RESPONSE_FORMAT, parse_plan_response
+from plan_repair import repair_plan
+from studio_analytics import HEADERS, SUPABASE_URL, TABLE_ARCHIVE, TABLE_QUESTIONNAIRE, fetch_all_pages
+from training_metrics import compute_training_load, format_load_context
+
+STAGE_CHUNK_SIZE = 500  # Zeilen pro Bulk-Insert
+DEFAULT_TRAINING_DAYS = 3
+
+
+def select_active_members(profiles, history, active_weeks, studio=None, limit=None):
+    """Fragebogen-Zeilen aller Mitglieder mit Training in den letzten active_weeks Wochen."""
+    dates = pd.to_datetime(history["date"], errors="coerce")
+    cutoff = pd.Timestamp(datetime.date.today()) - pd.Timedelta(weeks=active_weeks)
+    active = set(history.loc[dates >= cutoff, "uuid"])
+    members = profiles[profiles["uuid"].isin(active)].drop_duplicates("uuid")
+    if studio:
+        members = members[members["studio"] == studio]
+    return members.head(limit) if limit else members
+
+
+def training_days_for(profile_row):
+    """Trainingstage aus dem Fragebogen (trainFrequency), sonst Standardwert."""
+    try:
+        return min(max(int(profile_row.get("trainFrequency")), 2), 6)
+    except (TypeError, ValueError):
+        return DEFAULT_TRAINING_DAYS
+
+
+def _prepare_member(task):
+    """Worker: Chat-Anfrage für ein Mitglied aus Fragebogen und Historie bauen."""
+    profile_row, history_rows, ai_config, split_type, focus = task
+    profile = build_comprehensive_profile(profile_row)
+    user_name = profile.get("name", "Unbekannt")
+    history_summary, _ = summarize_workout_history(history_rows)
+    load_context = format_load_context(compute_training_load(pd.DataFrame(history_rows)))
+    plan_request = render_plan_request(
+        ai_config, user_name, profile, history_summary, "", training_days_for(profile_row),
+        split_type, focus, load_context=load_context
+    )
+    chat_request = {
+        "custom_id": profile_row["uuid"],
+        "model": plan_request["model"],
+        "messages": [{"role": "user", "content": plan_request["prompt"]}],
+        "temperature": plan_request["temperature"],
+        "max_tokens": plan_request["max_tokens"],
+        "top_p": plan_request["top_p"],
+    }
+    if plan_request["output_format"] == "json":
+        chat_request["response_format"] = PLAN_RESPONSE_FORMAT
+    return chat_request, user_name
+
+
+def _parse_member(task):
+    """Worker: Antwort eines Mitglieds in Plan-Zeilen umwandeln und lokal reparieren."""
+    user_uuid, user_name, text, training_days, history_rows = task
+    rows, _, warnings, mode = parse_plan_response(text, user_uuid, user_name)
+    rows, fixes = repair_plan(rows, training_days, pd.DataFrame(history_rows))
+    return user_uuid, rows, warnings + fixes, mode
+
+
+def stage_rows(table, rows, chunk_size=STAGE_CHUNK_SIZE):
+    """Bulk-Insert in die Staging-Tabelle (eine POST-Anfrage pro chunk_size Zeilen)."""
+    for start in range(0, len(rows), chunk_size):
+        response = requests.post(
+            f"{SUPABASE_URL}/rest/v1/{table}",
+            headers={**HEADERS, "Prefer": "return=minimal"},
+            json=rows[start:start + chunk_size],
+            timeout=60
+        )
+        if response.status_code not in (200, 201, 204):
+            raise RuntimeError(f"Fehler beim Speichern in {table}: {response.text}")
+
+
+def make_backend(name, workers):
+    if name == "mock":
+        return MockBatchBackend()
+    from openai import OpenAI
+    client = OpenAI(api_key=st.secrets["openai_api_key"], base_url=st.secrets.get("openai_base_url", None))
+    if name == "openai-batch":
+        return OpenAIBatchBackend(client)
+    return ConcurrentChatBackend(client, max_workers=workers)
+
+
+def run(backend_name="mock", studio=None, active_weeks=8, limit=None, split_type="Individuell",
+        focus="Ausgewogen", workers=None, stage_table=None, out_prefix="batch_plans"):
+    timings = {}
+    workers = workers or os.cpu_count() or 1
+    batch_id = uuid.uuid4().hex[:12]
+    today = datetime.date.today()
+
+    start = time.perf_counter()
+    profiles = pd.DataFrame(fetch_all_pages(TABLE_QUESTIONNAIRE, "*"))
+    history = pd.DataFrame(fetch_all_pages(TABLE_ARCHIVE, "*"))
+    timings["laden"] = time.perf_counter() - start
+    if profiles.empty or history.empty:
+        print("Keine Daten vorhanden.")
+        return pd.DataFrame()
+
+    start = time.perf_counter()
+    members = select_active_members(profiles, history, active_weeks, studio=studio, limit=limit)
+    history_by_member = {
+        member: group.to_dict("records")
+        for member, group in history[history["uuid"].isin(members["uuid"])].groupby("uuid")
+    }
+    ai_config = load_prompt_config()
+    tasks = [
+        (profile_row, history_by_member.get(profile_row["uuid"], []), ai_config, split_type, focus)
+        for profile_row in members.to_dict("records")
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        prepared = list(pool.map(_prepare_member, tasks, chunksize=8))
+    chat_requests = [chat_request for chat_request, _ in prepared]
+    names = {chat_request["custom_id"]: user_name for chat_request, user_name in prepared}
+    training_days = {row["uuid"]: training_days_for(row) for row in members.to_dict("records")}
+    timings["prompts"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = make_backend(backend_name, workers).run(chat_requests)
+    timings["generieren"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parse_tasks = [(user_uuid, names[user_uuid], result["text"], training_days[user_uuid],
+                    history_by_member.get(user_uuid, []))
+                   for user_uuid, result in results.items() if result["text"]]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = list(pool.map(_parse_member, parse_tasks, chunksize=8))
+    timings["parsen"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    staged_rows = []
+    report = []
+    parsed_by_member = {user_uuid: (rows, warnings, mode) for user_uuid, rows, warnings, mode in parsed}
+    for user_uuid, result in results.items():
+        rows, warnings, mode = parsed_by_member.get(user_uuid, ([], [], None))
+        staged_rows.extend(dict(row, batch_id=batch_id) for row in rows)
+        report.append({
+            "uuid": user_uuid, "name": names[user_uuid], "status": "ok" if rows else "fehler",
+            "fehler": result["error"] or ("" if rows else "Keine Übungen erkannt"),
+            "modus": mode, "saetze": len(rows), "warnungen": len(warnings),
+        })
+    report = pd.DataFrame(report)
+    pd.DataFrame(staged_rows).to_csv(f"{out_prefix}_{batch_id}_plaene_{today}.csv", index=False)
+    report.to_csv(f"{out_prefix}_{batch_id}_bericht_{today}.csv", index=False)
+    if stage_table and staged_rows:
+        stage_rows(stage_table, staged_rows)
+    timings["ablegen"] = time.perf_counter() - start
+
+    n_ok = int((report["status"] == "ok").sum()) if not report.empty else 0
+    print(f"Batch {batch_id}: {n_ok}/{len(report)} Pläne, {len(staged_rows)} Sätze"
+          + (f" in {stage_table} abgelegt" if stage_table else ""))
+    for phase, seconds in timings.items():
+        print(f"{phase:<10} {seconds:8.2f} s")
+    print(f"{'gesamt':<10} {sum(timings.values()):8.2f} s")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trainingspläne für alle aktiven Mitglieder generieren")
+    parser.add_argument("--backend", choices=["mock", "chat", "openai-batch"], default="mock",
+                        help="mock: Korpus-Pläne, chat: parallele Completions, openai-batch: OpenAI Batch API")
+    parser.add_argument("--studio", default=None, help="Nur Mitglieder dieses Studios")
+    parser.add_argument("--active-weeks", type=int, default=8, help="Aktiv = Training in diesem Zeitraum")
+    parser.add_argument("--limit", type=int, default=None, help="Höchstens so viele Mitglieder")
+    parser.add_argument("--split", default="Individuell")
+    parser.add_argument("--focus", default="Ausgewogen")
+    parser.add_argument("--workers", type=int, default=None, help="Prozesse/Threads (Standard: alle Kerne)")
+    parser.add_argument("--stage-table", default=None, help="Staging-Tabelle für den Bulk-Insert (workouts_staging, siehe migrations/003_workouts_staging.sql)")
+    parser.add_argument("--out", default="batch_plans", help="Präfix der CSV-Dateien")
+    args = parser.parse_args()
+    run(backend_name=args.backend, studio=args.studio, active_weeks=args.active_weeks, limit=args.limit,
+        split_type=args.split, focus=args.focus, workers=args.workers, stage_table=args.stage_table,
+        out_prefix=args.out)
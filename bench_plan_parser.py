@@ -0,0 +1,99 @@
+"""Korrektheits- und Durchsatz-Benchmark für plan_parser.
+
+- Korrektheit: alle Pläne in plan_corpus/ (echte und handgeschriebene
+  KI-Antworten) werden geparst und mit plan_corpus/expected.json verglichen.
+- Durchsatz: eine Menge synthetischer Pläne (seeded) wird am Stück und
+  gestreamt (in kleinen Stücken) geparst.
+
+Aufruf:
+    python bench_plan_parser.py --plans 500
+    python bench_plan_parser.py --update-expected   # nach gewollten Parser-Änderungen
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+
+from plan_parser import PlanStreamParser, parse_plan_response, parse_plan_text
+from synthetic_plans import synthetic_plan
+
+CORPUS_DIR = "plan_corpus"
+EXPECTED_PATH = os.path.join(CORPUS_DIR, "expected.json")
+
+def summarize(rows, explanation):
+    """Vergleichbare Kurzform: Erklärung und (Workout, Übung, Sätze, Wdh, Gewicht, Fokus)."""
+    exercises = {}
+    for row in rows:
+        key = (row["workout"], row["exercise"])
+        if key in exercises:
+            exercises[key][2] += 1
+        else:
+            exercises[key] = [row["workout"], row["exercise"], 1, str(row["reps"]),
+                              float(row["weight"]), row["messageFromCoach"]]
+    return {"explanation": explanation, "exercises": list(exercises.values())}
+
+
+def load_corpus():
+    paths = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.txt")) + glob.glob(os.path.join(CORPUS_DIR, "*.json")))
+    return [(os.path.basename(path), open(path, encoding="utf-8").read())
+            for path in paths if path != EXPECTED_PATH]
+
+
+def check_corpus(update_expected=False):
+    results = {}
+    for name, text in load_corpus():
+        rows, explanation, _, _ = parse_plan_response(text, "bench", "Bench")
+        results[name] = summarize(rows, explanation)
+
+    if update_expected:
+        with open(EXPECTED_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"{EXPECTED_PATH} aktualisiert ({len(results)} Pläne)")
+        return True
+
+    with open(EXPECTED_PATH, encoding="utf-8") as f:
+        expected = json.load(f)
+    ok = True
+    for name, summary in results.items():
+        passed = expected.get(name) == summary
+        ok = ok and passed
+        print(f"{'OK  ' if passed else 'FAIL'} {name} ({len(summary['exercises'])} Übungen)")
+    return ok
+
+
+def benchmark(n_plans, seed, chunk_size=16):
+    rng = random.Random(seed)
+    plans = [synthetic_plan(rng, rng.randint(2, 6)) for _ in range(n_plans)]
+    n_lines = sum(plan.count("\n") + 1 for plan in plans)
+
+    start = time.perf_counter()
+    n_rows = sum(len(parse_plan_text(plan, "bench", "Bench")[0]) for plan in plans)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for plan in plans:
+        parser = PlanStreamParser("bench", "Bench")
+        for i in range(0, len(plan), chunk_size):
+            parser.feed(plan[i:i + chunk_size])
+        parser.close()
+    stream_seconds = time.perf_counter() - start
+
+    print(f"{n_plans} Pläne, {n_lines} Zeilen, {n_rows} Sätze")
+    print(f"am Stück:   {batch_seconds * 1000:8.1f} ms  ({n_plans / batch_seconds:,.0f} Pläne/s, {n_lines / batch_seconds:,.0f} Zeilen/s)")
+    print(f"gestreamt:  {stream_seconds * 1000:8.1f} ms  ({n_plans / stream_seconds:,.0f} Pläne/s, Stückgröße {chunk_size})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark für den Plan-Parser")
+    parser.add_argument("--plans", type=int, default=500, help="Anzahl synthetischer Pläne")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--update-expected", action="store_true", help="expected.json neu schreiben")
+    args = parser.parse_args()
+
+    corpus_ok = check_corpus(update_expected=args.update_expected)
+    print()
+    benchmark(args.plans, args.seed)
+    sys.exit(0 if corpus_ok else 1)
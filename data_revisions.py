@@ -0,0 +1,28 @@
+"""Prozessweite Schreibzähler pro (Tabelle, Nutzer).
+
+st.cache_data teilt seine Einträge zwischen allen Sessions. Ein Zähler in
+st.session_state taugt deshalb nicht als Cache-Schlüssel: zwei Geräte
+desselben Nutzers zählen unabhängig 0, 1, 2… und bekommen gegenseitig
+veraltete Einträge. Eine Instanz dieser Klasse liegt in st.cache_resource und
+wird von allen Sessions des Prozesses gemeinsam hochgezählt; nach einem
+Schreibzugriff ist der Schlüssel für jedes Gerät des Nutzers neu, die Einträge
+anderer Nutzer bleiben gültig.
+"""
+import threading
+from collections import Counter
+
+
+class DataRevisions:
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, table, user_uuid):
+        with self._lock:
+            return self._counts[(table, user_uuid)]
+
+    def bump(self, table, user_uuid):
+        """Nach dem Schreiben aufrufen, damit der neue Stand unter dem neuen Schlüssel landet."""
+        with self._lock:
+            self._counts[(table, user_uuid)] += 1
+            return self._counts[(table, user_uuid)]
@@ -0,0 +1,164 @@
+"""Kanonischer Übungskatalog und unscharfe Zuordnung von Übungsnamen.
+
+Dieselbe Übung taucht in KI-Plänen und manuellen Einträgen unterschiedlich
+auf ("Bankdrücken", "Bankdrücken (Langhantel)", "Bench Press"). Der
+ExerciseIndex ordnet solche Schreibweisen dem kanonischen Namen zu:
+
+1. exakt über einen normalisierten Schlüssel (Kleinschreibung, Umlaute,
+   Satzzeichen, Wortreihenfolge egal) – ein Dict-Zugriff
+2. sonst unscharf über Trigramme (Dice-Koeffizient) gegen alle Aliase;
+   Kandidaten kommen aus einem invertierten Index, nicht aus einem Vollscan
+
+Automatisch umbenannt wird nur bei exaktem Treffer (Name oder Alias). Ein
+unscharfer Treffer ist nur ein Vorschlag, den der User bestätigen muss –
+"Sumo Kreuzheben" ist eben nicht "Kreuzheben". Unbekannte Übungen bleiben
+unverändert (nur Leerzeichen bereinigt).
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+MATCH_THRESHOLD = 0.8  # ab hier wird ein unscharfer Treffer als Vorschlag angezeigt
+
+# Kanonischer Name -> weitere Schreibweisen (der kanonische Name zählt automatisch als Alias)
+EXERCISE_CATALOG = {
+    "Bankdrücken": ["Bankdrücken Langhantel", "Langhantel-Bankdrücken", "Flachbankdrücken", "Bench Press",
+                    "Barbell Bench Press", "Bankdrücken LH"],
+    "Kurzhantel-Bankdrücken": ["Bankdrücken Kurzhantel", "Kurzhantel Bankdrücken", "Dumbbell Bench Press",
+                               "Bankdrücken KH"],
+    "Schrägbankdrücken": ["Schrägbankdrücken Langhantel", "Incline Bench Press", "Schrägbank Bankdrücken"],
+    "Schrägbankdrücken Kurzhantel": ["Kurzhantel-Schrägbankdrücken", "Incline Dumbbell Press",
+                                     "Schrägbankdrücken KH"],
+    "Brustpresse (Maschine)": ["Brustpresse", "Chest Press", "Maschinen-Brustpresse"],
+    "Butterfly": ["Butterfly Maschine", "Pec Deck", "Fliegende", "Chest Fly"],
+    "Liegestütze": ["Liegestütz", "Push-ups", "Push Ups", "Pushups"],
+    "Dips": ["Barrenstütz", "Dips am Barren", "Trizeps Dips"],
+    "Kniebeuge": ["Kniebeugen", "Langhantel-Kniebeuge", "Kniebeuge Langhantel", "Back Squat", "Squat", "Squats"],
+    "Frontkniebeuge": ["Front Squat", "Frontkniebeugen"],
+    "Goblet Squat": ["Goblet Squats", "Goblet-Kniebeuge"],
+    "Beinpresse": ["Leg Press", "Beinpresse Maschine", "Beinpressen"],
+    "Beinstrecker": ["Leg Extension", "Beinstrecker Maschine", "Leg Extensions"],
+    "Beinbeuger": ["Leg Curl", "Beinbeuger liegend", "Beinbeuger sitzend", "Leg Curls"],
+    "Ausfallschritte": ["Ausfallschritt", "Lunges", "Walking Lunges"],
+    "Bulgarian Split Squats": ["Bulgarische Kniebeuge", "Bulgarian Split Squat", "Split Squats"],
+    "Kreuzheben": ["Deadlift", "Deadlifts", "Kreuzheben Langhantel"],
+    "Sumo-Kreuzheben": ["Sumo Deadlift", "Sumo Kreuzheben"],
+    "Rumänisches Kreuzheben": ["Romanian Deadlift", "RDL", "Rumänisches Kreuzheben Langhantel"],
+    "Hip Thrust": ["Hip Thrusts", "Hüftheben", "Glute Bridge Langhantel"],
+    "Wadenheben": ["Calf Raises", "Wadenheben stehend", "Wadenheben sitzend"],
+    "Latzug": ["Lat Pulldown", "Latziehen", "Lat-Zug", "Latzug breit", "Latzug zur Brust"],
+    "Klimmzüge": ["Klimmzug", "Pull-ups", "Pull Ups", "Pullups", "Chin-ups"],
+    "Rudern am Kabel": ["Kabelrudern", "Seated Cable Row", "Rudern Kabel sitzend"],
+    "Rudern": ["Rudern Maschine", "Rudermaschine", "Machine Row"],
+    "Langhantelrudern": ["Rudern Langhantel", "Langhantel-Rudern", "Barbell Row"],
+    "Kurzhantelrudern": ["Rudern Kurzhantel", "Einarmiges Kurzhantelrudern", "Dumbbell Row"],
+    "Face Pulls": ["Face Pull", "Facepulls"],
+    "Schulterdrücken": ["Overhead Press", "Military Press", "Schulterdrücken Langhantel", "Shoulder Press"],
+    "Kurzhantel-Schulterdrücken": ["Schulterdrücken Kurzhantel", "Dumbbell Shoulder Press",
+                                   "Kurzhantel-Schulterdrücken sitzend"],
+    "Kurzhantel-Schulterdrücken stehend": ["Schulterdrücken Kurzhantel stehend"],
+    "Seitheben": ["Seitheben Kurzhantel", "Lateral Raises", "Seitenheben", "Lateral Raise"],
+    "Bizeps Curls": ["Bizepscurls", "Bizeps Curl", "Bicep Curls", "Biceps Curls"],
+    "Langhantel-Curls": ["Langhantel Curls", "Barbell Curls", "Bizeps Curls Langhantel"],
+    "Kurzhantel-Curls": ["Kurzhantel Curls", "Dumbbell Curls", "Bizeps Curls Kurzhantel"],
+    "Hammer Curls": ["Hammercurls", "Hammer Curl"],
+    "Trizepsdrücken am Kabel": ["Trizepsdrücken", "Trizeps Pushdown", "Triceps Pushdown", "Trizepsdrücken Kabel"],
+    "Plank": ["Planks", "Unterarmstütz", "Plank Hold"],
+    "Crunches": ["Crunch", "Bauchpresse"],
+    "Pallof Press": ["Pallof-Press", "Anti-Rotation Press"],
+}
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_key(name):
+    """Vergleichsschlüssel: klein, Umlaute aufgelöst, ohne Satzzeichen, Wörter sortiert."""
+    tokens = _NON_WORD_RE.sub(" ", str(name).lower().translate(_UMLAUTS)).split()
+    return " ".join(sorted(tokens))
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class ExerciseIndex:
+    def __init__(self, catalog=EXERCISE_CATALOG, threshold=MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.exact = {}  # normalisierter Schlüssel -> kanonischer Name
+        self.alias_grams = []  # (kanonischer Name, Trigramme, Anzahl Trigramme)
+        self.postings = {}  # Trigramm -> Positionen in alias_grams
+        for canonical, aliases in catalog.items():
+            for alias in [canonical] + aliases:
+                key = normalize_key(alias)
+                self.exact.setdefault(key, canonical)
+                grams = trigrams(key)
+                position = len(self.alias_grams)
+                self.alias_grams.append((canonical, grams, sum(grams.values())))
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(position)
+        self.match = lru_cache(maxsize=4096)(self._match)
+
+    def _match(self, name):
+        """(kanonischer Name, Ähnlichkeit) oder (None, beste Ähnlichkeit)."""
+        key = normalize_key(name)
+        if not key:
+            return None, 0.0
+        if key in self.exact:
+            return self.exact[key], 1.0
+
+        grams = trigrams(key)
+        size = sum(grams.values())
+        shared = Counter()
+        for gram, count in grams.items():
+            for position in self.postings.get(gram, ()):
+                shared[position] += min(count, self.alias_grams[position][1][gram])
+        best, best_score = None, 0.0
+        for position, overlap in shared.items():
+            canonical, _, alias_size = self.alias_grams[position]
+            score = 2 * overlap / (size + alias_size)
+            if score > best_score:
+                best, best_score = canonical, score
+        return (best, best_score) if best_score >= self.threshold else (None, best_score)
+
+    def exact_match(self, name):
+        """Kanonischer Name bei exaktem Treffer auf Name oder Alias, sonst None."""
+        return self.exact.get(normalize_key(name))
+
+    def canonical_name(self, name):
+        """Kanonischer Name bei exaktem Treffer, sonst der bereinigte Originalname."""
+        cleaned = " ".join(str(name).split())
+        return self.exact_match(cleaned) or cleaned
+
+    def suggestion(self, name):
+        """Unscharfer Treffer als Vorschlag (nur wenn es keinen exakten gibt), sonst None."""
+        cleaned = " ".join(str(name).split())
+        if self.exact_match(cleaned):
+            return None
+        canonical, _ = self.match(cleaned)
+        return canonical
+
+
+_DEFAULT_INDEX = None
+
+
+def get_exercise_index():
+    global _DEFAULT_INDEX
+    if _DEFAULT_INDEX is None:
+        _DEFAULT_INDEX = ExerciseIndex()
+    return _DEFAULT_INDEX
+
+
+def canonical_exercise_name(name):
+    return get_exercise_index().canonical_name(name)
+
+
+def suggest_exercise_name(name):
+    return get_exercise_index().suggestion(name)
+
+
+def canonicalize_exercises(exercises):
+    """Vektorisiert für pandas-Spalten: jede unterschiedliche Schreibweise wird nur einmal zugeordnet."""
+    mapping = {name: canonical_exercise_name(name) for name in exercises.dropna().unique()}
+    return exercises.map(mapping).fillna(exercises)
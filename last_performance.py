@@ -0,0 +1,57 @@
+"""Letzte Leistung pro Übung und Satz ("Letztes Mal" im Training-Tab).
+
+Die Tabelle last_performance (migrations/002_last_performance.sql) hält pro
+(uuid, exercise, set) den zuletzt archivierten Satz; ein Trigger auf
+workout_history schreibt sie beim Archivieren fort. Sie wird einmal zusammen
+mit dem Plan geladen; der Render-Index (workout_index.py) hängt den fertigen
+Anzeigetext an jeden Satz, sodass beim Zeichnen nichts mehr gesucht oder
+formatiert wird. Fehlt die Tabelle noch, leitet last_performance_rows() dieselben
+Zeilen aus dem Archiv ab.
+"""
+import datetime
+import math
+
+TABLE_LAST_PERFORMANCE = "last_performance"
+LAST_PERFORMANCE_COLUMNS = ("uuid", "exercise", "set", "date", "weight", "reps", "rirDone")
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(number) else number
+
+
+def _has_value(value):
+    return value not in (None, "") and not (isinstance(value, float) and math.isnan(value))
+
+
+def last_performance_rows(archive_rows):
+    """Neuester Eintrag pro (uuid, exercise, set) aus Archivzeilen, im Format von last_performance."""
+    latest = {}
+    for row in sorted(archive_rows, key=lambda row: (str(row.get("date") or ""), row.get("id") or 0)):
+        entry = {column: row.get(column) for column in LAST_PERFORMANCE_COLUMNS}
+        entry["set"] = int(row["set"])
+        entry["weight"] = _number(row.get("weight"))
+        entry["reps"] = int(_number(row.get("reps")))
+        entry["rirDone"] = int(_number(row["rirDone"])) if _has_value(row.get("rirDone")) else None
+        latest[(row["uuid"], row["exercise"], entry["set"])] = entry
+    return list(latest.values())
+
+
+def format_last_performance(entry):
+    """z.B. '60 kg × 8, RIR 2 (12.10.)'."""
+    text = f"{_number(entry.get('weight')):g} kg × {int(_number(entry.get('reps')))}"
+    if _has_value(entry.get("rirDone")):
+        text += f", RIR {int(_number(entry.get('rirDone')))}"
+    try:
+        text += f" ({datetime.date.fromisoformat(str(entry.get('date'))[:10]).strftime('%d.%m.')})"
+    except ValueError:
+        pass
+    return text
+
+
+def last_performance_lookup(rows):
+    """{(Übung, Satznummer): Anzeigetext} für den Render-Index."""
+    return {(row["exercise"], int(row["set"])): format_last_performance(row) for row in rows}
@@ -0,0 +1,44 @@
+-- Zeilenversion für workouts (Konflikterkennung zwischen Geräten)
+--
+-- Jede Änderung an einer Zeile erhöht version und setzt updated_at – auch
+-- bei Schreibern, die die Spalten nicht kennen (Trigger). app.supa.py
+-- schreibt nur noch bedingt: PATCH ...?id=eq.<id>&version=eq.<geladene Version>
+-- mit Prefer: return=representation. Kommt keine Zeile zurück, hat ein
+-- anderes Gerät den Satz inzwischen geändert (oder gelöscht).
+--
+-- Im Supabase SQL-Editor ausführen; mehrfaches Ausführen ist unschädlich.
+
+alter table workouts add column if not exists version integer not null default 1;
+alter table workouts add column if not exists updated_at timestamptz not null default now();
+
+create or replace function workouts_bump_version() returns trigger
+language plpgsql as $$
+begin
+    new.version := old.version + 1;
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists workouts_bump_version on workouts;
+create trigger workouts_bump_version
+    before update on workouts
+    for each row execute function workouts_bump_version();
+
+-- Bedingtes Bulk-Update für Schnellerfassung und Offline-Sync:
+-- changes = [{"id": 1, "version": 3, "updates": {"weight": 60, ...}}, ...]
+-- Aktualisiert nur Zeilen, deren version noch passt, und gibt sie zurück;
+-- fehlende ids sind Konflikte. Nicht enthaltene Felder bleiben unverändert.
+create or replace function update_workouts_if_unchanged(changes jsonb)
+returns setof workouts
+language sql as $$
+    update workouts w
+       set (weight, reps, "rirDone", completed, "time", "messageToCoach") = (
+               select r.weight, r.reps, r."rirDone", r.completed, r."time", r."messageToCoach"
+                 from jsonb_populate_record(w, c -> 'updates') r
+           )
+      from jsonb_array_elements(changes) c
+     where w.id = (c ->> 'id')::bigint
+       and w.version = (c ->> 'version')::integer
+    returning w.*;
+$$;
@@ -0,0 +1,59 @@
+-- Letzte Leistung pro Übung und Satz ("Letztes Mal" im Training-Tab)
+--
+-- Eine Zeile pro (uuid, exercise, set) mit dem zuletzt archivierten Satz.
+-- Ein Trigger auf workout_history schreibt sie bei jedem Archivieren fort –
+-- egal ob manuell aus app.supa.py oder durch die nächtliche Archivierung.
+-- app.supa.py lädt sie einmal zusammen mit dem Plan, statt workout_history
+-- pro Übung zu durchsuchen.
+--
+-- Im Supabase SQL-Editor ausführen; mehrfaches Ausführen ist unschädlich.
+
+create table if not exists last_performance (
+    uuid text not null,
+    exercise text not null,
+    "set" integer not null,
+    "date" text,
+    weight numeric not null default 0,
+    reps integer not null default 0,
+    "rirDone" integer,
+    primary key (uuid, exercise, "set")
+);
+
+-- Bestehende Historie übernehmen: pro Schlüssel der neueste Eintrag
+insert into last_performance (uuid, exercise, "set", "date", weight, reps, "rirDone")
+select distinct on (uuid, exercise, "set"::integer)
+       uuid, exercise, "set"::integer, "date"::text,
+       coalesce(nullif(weight::text, '')::numeric, 0),
+       coalesce(nullif(reps::text, '')::numeric, 0)::integer,
+       nullif("rirDone"::text, '')::numeric::integer
+from workout_history
+where uuid is not null and exercise is not null and "set" is not null
+order by uuid, exercise, "set"::integer, "date" desc, id desc
+on conflict (uuid, exercise, "set") do update
+    set "date" = excluded."date", weight = excluded.weight,
+        reps = excluded.reps, "rirDone" = excluded."rirDone";
+
+-- Fortschreiben beim Archivieren; ältere Nachträge überschreiben nichts
+create or replace function last_performance_from_history() returns trigger
+language plpgsql as $$
+begin
+    if new.uuid is null or new.exercise is null or new."set" is null then
+        return new;
+    end if;
+    insert into last_performance (uuid, exercise, "set", "date", weight, reps, "rirDone")
+    values (new.uuid, new.exercise, new."set"::integer, new."date"::text,
+            coalesce(nullif(new.weight::text, '')::numeric, 0),
+            coalesce(nullif(new.reps::text, '')::numeric, 0)::integer,
+            nullif(new."rirDone"::text, '')::numeric::integer)
+    on conflict (uuid, exercise, "set") do update
+        set "date" = excluded."date", weight = excluded.weight,
+            reps = excluded.reps, "rirDone" = excluded."rirDone"
+        where last_performance."date" is null or excluded."date" >= last_performance."date";
+    return new;
+end;
+$$;
+
+drop trigger if exists last_performance_from_history on workout_history;
+create trigger last_performance_from_history
+    after insert on workout_history
+    for each row execute function last_performance_from_history();
@@ -0,0 +1,14 @@
+-- Staging-Tabelle für Batch-Pläne (batch_plans.py --stage-table workouts_staging)
+--
+-- Gleiche Spalten wie workouts plus batch_id und Zeitpunkt der Ablage. Coaches
+-- prüfen die Pläne eines Batches hier, bevor sie in workouts übernommen werden;
+-- ein verworfener Batch wird über batch_id gelöscht.
+--
+-- Im Supabase SQL-Editor ausführen; mehrfaches Ausführen ist unschädlich.
+
+create table if not exists workouts_staging (like workouts including all);
+
+alter table workouts_staging add column if not exists batch_id text not null;
+alter table workouts_staging add column if not exists staged_at timestamptz not null default now();
+
+create index if not exists workouts_staging_batch on workouts_staging (batch_id, uuid);
@@ -0,0 +1,40 @@
+-- Plan-Aktivierung in einer Transaktion (app.supa.py apply_plan_changes)
+--
+-- Der Changeset aus plan_diff.py (löschen, aktualisieren, anlegen) wird als
+-- eine RPC ausgeführt. Schlägt ein Teil fehl, wird alles zurückgerollt – es
+-- entsteht nie ein Plan, der halb alt und halb neu ist.
+--
+--   delete_ids: [id, ...]
+--   updates:    [{"id": 1, "updates": {"weight": 60, "reps": "8", "completed": false, ...}}, ...]
+--   inserts:    [vollständige Zeilen ohne id, wie plan_parser.py sie erzeugt]
+--
+-- Alle Zeilen müssen zu p_uuid gehören; fremde ids werden nicht angefasst.
+-- Im Supabase SQL-Editor ausführen; mehrfaches Ausführen ist unschädlich.
+
+create or replace function apply_plan_changes(p_uuid text, delete_ids bigint[], updates jsonb, inserts jsonb)
+returns void
+language plpgsql as $$
+begin
+    delete from workouts where uuid = p_uuid and id = any(delete_ids);
+
+    -- Nicht enthaltene Felder bleiben unverändert (wie update_workouts_if_unchanged)
+    update workouts w
+       set (weight, reps, "messageFromCoach", "date", completed, "rirDone", "time") = (
+               select r.weight, r.reps, r."messageFromCoach", r."date", r.completed, r."rirDone", r."time"
+                 from jsonb_populate_record(w, c -> 'updates') r
+           )
+      from jsonb_array_elements(updates) c
+     where w.id = (c ->> 'id')::bigint
+       and w.uuid = p_uuid;
+
+    insert into workouts (uuid, "date", name, workout, exercise, "set", weight, reps, unit, type, completed,
+                          "messageToCoach", "messageFromCoach", "rirSuggested", "rirDone",
+                          "generalStatementFrom", "generalStatementTo",
+                          dummy1, dummy2, dummy3, dummy4, dummy5, dummy6, dummy7, dummy8, dummy9, dummy10)
+    select p_uuid, r."date", r.name, r.workout, r.exercise, r."set", r.weight, r.reps, r.unit, r.type,
+           coalesce(r.completed, false), r."messageToCoach", r."messageFromCoach", r."rirSuggested", r."rirDone",
+           r."generalStatementFrom", r."generalStatementTo",
+           r.dummy1, r.dummy2, r.dummy3, r.dummy4, r.dummy5, r.dummy6, r.dummy7, r.dummy8, r.dummy9, r.dummy10
+      from jsonb_populate_recordset(null::workouts, inserts) r;
+end;
+$$;
@@ -0,0 +1,231 @@
+"""Lokaler, OpenAI-kompatibler Mock-Server für Last- und Regressionstests.
+
+Beantwortet POST /v1/chat/completions (mit und ohne stream=True) mit Plänen
+aus plan_corpus/ oder aus einem seeded Generator. Die Antwort hängt nur vom
+Seed, dem seed-Parameter der Anfrage und den Nachrichten ab – gleiche Anfrage,
+gleicher Plan. Mit response_format kommt ein JSON-Plan, sonst ein Text-Plan.
+
+Latenz, Stückgröße beim Streaming und Fehler (HTTP-Fehler, abgebrochene
+Streams) sind konfigurierbar. GET /stats liefert Zähler für Lasttests.
+
+Aufruf:
+    python mock_llm_server.py --port 8765 --latency 0.5 --chunk-size 24 --error-rate 0.05
+
+In .streamlit/secrets.toml:
+    openai_api_key = "mock"
+    openai_base_url = "http://127.0.0.1:8765/v1"
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic_plans import synthetic_json_plan, synthetic_plan
+
+CORPUS_DIR = "plan_corpus"
+MAX_TRACKED_REQUESTS = 10_000  # Versuchszähler für die Fehler-Injektion, älteste fallen heraus
+
+
+def load_fixtures(corpus_dir=CORPUS_DIR):
+    """Text- und JSON-Pläne aus dem Korpus (ohne expected.json)."""
+    text_plans, json_plans = [], []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*"))):
+        if os.path.basename(path) == "expected.json":
+            continue
+        with open(path, encoding="utf-8") as f:
+            (json_plans if path.endswith(".json") else text_plans).append(f.read())
+    return text_plans, json_plans
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+class MockLLM:
+    """Erzeugt Antworten und entscheidet über Fehler; von allen Handler-Threads geteilt."""
+
+    def __init__(self, source="fixtures", seed=0, latency=0.0, chunk_size=24, chunk_delay=0.01,
+                 error_rate=0.0, error_status=500, stream_break_rate=0.0, corpus_dir=CORPUS_DIR,
+                 max_tracked_requests=MAX_TRACKED_REQUESTS):
+        self.source = source
+        self.seed = seed
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_break_rate = stream_break_rate
+        self.text_plans, self.json_plans = load_fixtures(corpus_dir)
+        self.stats = Counter()
+        self.attempts = OrderedDict()  # Hash der Anfrage -> Anzahl Versuche (für die Fehler-Injektion)
+        self.max_tracked_requests = max_tracked_requests
+        self._lock = threading.Lock()
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def rng_for(self, body):
+        # Deterministisch pro Anfrage: Server-Seed, seed-Parameter und Nachrichten
+        messages = json.dumps(body.get("messages", []), sort_keys=True, ensure_ascii=False)
+        return random.Random(f"{self.seed}:{body.get('seed')}:{messages}")
+
+    def fault_for(self, body):
+        """Zufallswert der Fehler-Injektion, reproduzierbar aus Server-Seed, Anfrage und Versuch.
+
+        Pro identischer Anfrage wird mitgezählt: ein Retry bekommt einen neuen,
+        aber ebenso reproduzierbaren Wert – unabhängig davon, in welcher
+        Reihenfolge parallele Anfragen eintreffen. Gezählt wird über einen Hash
+        der Anfrage, begrenzt auf max_tracked_requests, damit lange Lasttests den
+        Speicher nicht füllen.
+        """
+        key = hashlib.sha256(json.dumps(body, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self.attempts.pop(key, 0) + 1
+            self.attempts[key] = attempt
+            if len(self.attempts) > self.max_tracked_requests:
+                self.attempts.popitem(last=False)
+        return random.Random(f"{self.seed}:fault:{key}:{attempt}").random()
+
+    def plan_for(self, body, rng):
+        structured = "response_format" in body
+        if self.source == "generator":
+            days = rng.randint(2, 5)
+            return synthetic_json_plan(rng, days) if structured else synthetic_plan(rng, days)
+        plans = self.json_plans if structured and self.json_plans else self.text_plans
+        return rng.choice(plans)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    llm = None  # wird in serve() gesetzt
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, dict(self.llm.stats))
+        else:
+            self._send_json(404, {"error": {"message": f"Unbekannter Pfad {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unbekannter Pfad {self.path}", "type": "invalid_request_error"}})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        llm = self.llm
+        llm.count("requests")
+        rng = llm.rng_for(body)
+        # Fehler-Injektion mit eigenem Zufall, damit der Plan zur Anfrage stabil bleibt
+        fault = llm.fault_for(body)
+        time.sleep(llm.latency)
+
+        if fault < llm.error_rate:
+            llm.count(f"errors_{llm.error_status}")
+            self._send_json(
+                llm.error_status,
+                {"error": {"message": "Simulierter Fehler", "type": "server_error" if llm.error_status >= 500
+                           else "rate_limit_exceeded", "code": str(llm.error_status)}},
+                headers={"Retry-After": "1"} if llm.error_status == 429 else None
+            )
+            return
+
+        text = llm.plan_for(body, rng)
+        usage = {"prompt_tokens": estimate_tokens(json.dumps(body.get("messages", []), ensure_ascii=False)),
+                 "completion_tokens": estimate_tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        llm.count("prompt_tokens", usage["prompt_tokens"])
+        llm.count("completion_tokens", usage["completion_tokens"])
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "mock")
+
+        if not body.get("stream"):
+            llm.count("completions")
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send_chunk(delta, finish_reason=None, chunk_usage=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            if chunk_usage is not None:
+                chunk = dict(chunk, choices=[], usage=chunk_usage)
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        break_at = len(text) // 2 if fault < llm.error_rate + llm.stream_break_rate else None
+        send_chunk({"role": "assistant", "content": ""})
+        for start in range(0, len(text), llm.chunk_size):
+            if break_at is not None and start >= break_at:
+                # Verbindung mitten im Stream abbrechen
+                llm.count("stream_breaks")
+                return
+            send_chunk({"content": text[start:start + llm.chunk_size]})
+            time.sleep(llm.chunk_delay)
+        send_chunk({}, finish_reason="stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send_chunk({}, chunk_usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        llm.count("completions")
+
+
+def serve(llm, host="127.0.0.1", port=8765):
+    """Erstellt den Server; serve_forever() blockiert und läuft für Tests in einem eigenen Thread."""
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"llm": llm})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-kompatibler Mock-Server für Trainingspläne")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--source", choices=["fixtures", "generator"], default="fixtures",
+                        help="fixtures: Pläne aus plan_corpus/, generator: synthetische Pläne")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Sekunden bis zur ersten Antwort")
+    parser.add_argument("--chunk-size", type=int, default=24, help="Zeichen pro Stream-Stück")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="Sekunden zwischen Stream-Stücken")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil der Anfragen mit HTTP-Fehler")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP-Status der simulierten Fehler")
+    parser.add_argument("--stream-break-rate", type=float, default=0.0, help="Anteil abgebrochener Streams")
+    args = parser.parse_args()
+
+    llm = MockLLM(source=args.source, seed=args.seed, latency=args.latency, chunk_size=args.chunk_size,
+                  chunk_delay=args.chunk_delay, error_rate=args.error_rate, error_status=args.error_status,
+                  stream_break_rate=args.stream_break_rate)
+    server = serve(llm, args.host, args.port)
+    print(f"Mock-Server auf http://{args.host}:{args.port}/v1 ({args.source}, Seed {args.seed})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,59 @@
+"""Serverseitige Übernahme offline erfasster Sätze.
+
+Die Komponente offline_queue/ schreibt jede Satz-Erledigung als Operation in
+eine Warteschlange im localStorage und sendet sie gesammelt, sobald wieder
+Verbindung besteht:
+
+    {"op_id", "row_id", "exercise", "set",
+     "values": {"weight", "reps", "rirDone", "completed", "time"},
+     "base":   {"weight", "reps", "rirDone", "completed"}}
+
+base ist der Stand des Satzes, den der Browser beim Erfassen kannte. Da eine
+Operation mehrfach ankommen kann (Verbindungsabbruch vor der Bestätigung,
+neue Session), wird sie idempotent angewendet: Steht der Satz in der
+Datenbank schon auf den Zielwerten, gilt sie als übernommen; weicht er von
+base ab, ist es ein Konflikt und nichts wird überschrieben.
+"""
+from set_grid import FIELD_LABELS, normalize_field, set_label
+
+
+def _same(values, row):
+    return all(
+        normalize_field(field, value) == normalize_field(field, row.get(field))
+        for field, value in values.items() if field in FIELD_LABELS
+    )
+
+
+def resolve_offline_ops(ops, server_rows):
+    """Liefert (zu schreibende Zeilen, bestätigte op_ids, Konflikte).
+
+    Mehrere Operationen auf denselben Satz werden der Reihe nach gegen den
+    jeweils neuesten Stand geprüft; geschrieben wird pro Satz nur die letzte
+    Version. Konflikte werden ebenfalls bestätigt, damit der Browser sie nicht
+    endlos erneut sendet.
+    """
+    current = {row["id"]: row for row in server_rows}
+    rows, acked, conflicts = {}, [], []
+    for op in ops:
+        acked.append(op["op_id"])
+        label = set_label(op)
+        server = current.get(op["row_id"])
+        if server is None:
+            conflicts.append(f"{label}: existiert nicht mehr – Offline-Eintrag verworfen")
+            continue
+        if _same(op["values"], server):
+            continue  # bereits übernommen (z.B. erneut gesendet)
+        if not _same(op.get("base", {}), server):
+            details = ", ".join(
+                f"{FIELD_LABELS[field]} ist jetzt {server.get(field)}"
+                for field, value in op.get("base", {}).items()
+                if field in FIELD_LABELS and normalize_field(field, value) != normalize_field(field, server.get(field))
+            )
+            conflicts.append(f"{label}: inzwischen geändert ({details}) – Offline-Eintrag nicht übernommen")
+            continue
+        values = {field: op["values"][field] for field in ("weight", "reps", "rirDone", "completed", "time")
+                  if field in op["values"]}
+        if "reps" in values:
+            values["reps"] = str(normalize_field("reps", values["reps"]))
+        current[op["row_id"]] = rows[op["row_id"]] = dict(server, **values)
+    return list(rows.values()), acked, conflicts
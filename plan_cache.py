@@ -0,0 +1,84 @@
+"""Persistenter Cache für generierte Trainingspläne (SQLite).
+
+Schlüssel ist ein Hash aus gerendertem Prompt, Modell, Temperatur und den
+Planparametern. Einträge laufen nach TTL ab; bei mehr als max_entries werden
+die am längsten nicht genutzten Einträge verworfen.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+PLAN_CACHE_PATH = "plan_cache.sqlite3"
+PLAN_CACHE_TTL = 7 * 24 * 3600  # eine Woche
+PLAN_CACHE_MAX_ENTRIES = 500
+
+
+def make_plan_cache_key(prompt, model, temperature, params):
+    """Stabiler Hash über alles, was das Ergebnis der Generierung bestimmt."""
+    payload = json.dumps(
+        {"prompt": prompt, "model": model, "temperature": temperature, "params": params},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    def __init__(self, path=PLAN_CACHE_PATH, ttl=PLAN_CACHE_TTL, max_entries=PLAN_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                "key TEXT PRIMARY KEY, plan_text TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS plans_last_access ON plans (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        # Eigene Verbindung pro Aufruf: Streamlit führt Sessions in verschiedenen Threads aus
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Plan-Text zum Schlüssel oder None (abgelaufen/nicht vorhanden)."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT plan_text, created_at FROM plans WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE plans SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key, plan_text):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (key, plan_text, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, plan_text, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM plans WHERE created_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM plans WHERE key IN ("
+            "SELECT key FROM plans ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM plans")
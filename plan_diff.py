@@ -0,0 +1,90 @@
+"""Vergleich zwischen aktuellem und neuem Plan für die Aktivierung.
+
+Zeilen werden über (Workout, Übung, Satz) zugeordnet. Statt alle Zeilen zu
+löschen und neu anzulegen, entstehen nur die nötigen Inserts, Updates und
+Deletes. Fortschritt in unveränderten Sätzen (completed, RIR, Nachrichten)
+bleibt dadurch erhalten; ändert sich die Vorgabe eines Satzes (Gewicht oder
+Wdh), gilt er wieder als offen.
+"""
+
+# Vorgaben, die ein neuer Plan ändern kann; alles andere gehört zum Trainingsfortschritt
+PLAN_FIELDS = ["weight", "reps", "messageFromCoach"]
+# Bei geänderter Vorgabe passt der bisherige Fortschritt nicht mehr zum Satz
+PRESCRIPTION_FIELDS = ["weight", "reps"]
+PROGRESS_RESET = {"completed": False, "rirDone": 0, "time": None}
+
+
+def plan_key(row):
+    return (str(row["workout"]), str(row["exercise"]), int(row["set"]))
+
+
+def _normalize(field, value):
+    if field == "weight":
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0.0
+    if field == "reps":
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return str(value)
+    return "" if value is None else str(value)
+
+
+def diff_plan(current_rows, new_rows):
+    """Minimaler Changeset von current_rows (mit id) zu new_rows.
+
+    Rückgabe: Dict mit
+    - insert: neue Zeilen (ohne id)
+    - update: Liste von (aktuelle Zeile, geänderte Felder)
+    - delete: aktuelle Zeilen, die im neuen Plan fehlen (oder doppelt sind)
+    - unchanged: Anzahl unveränderter Sätze
+    """
+    current = {}
+    duplicates = []
+    for row in current_rows:
+        key = plan_key(row)
+        if key in current:
+            duplicates.append(row)
+        else:
+            current[key] = row
+
+    changes = {"insert": [], "update": [], "delete": duplicates, "unchanged": 0}
+    seen = set()
+    for row in new_rows:
+        key = plan_key(row)
+        if key in seen:
+            continue
+        seen.add(key)
+        old = current.get(key)
+        if old is None:
+            changes["insert"].append(row)
+            continue
+        updates = {
+            field: row[field] for field in PLAN_FIELDS
+            if field in row and _normalize(field, old.get(field)) != _normalize(field, row[field])
+        }
+        if updates:
+            if any(field in updates for field in PRESCRIPTION_FIELDS):
+                updates.update(PROGRESS_RESET)
+            changes["update"].append((old, dict(updates, date=row["date"])))
+        else:
+            changes["unchanged"] += 1
+
+    changes["delete"].extend(row for key, row in current.items() if key not in seen)
+    return changes
+
+
+def describe_changes(changes):
+    """Lesbare Zeilen für die Vorschau, gruppiert nach Art der Änderung."""
+    lines = []
+    for row in changes["insert"]:
+        lines.append(f"➕ {row['workout']} · {row['exercise']} · Satz {row['set']}: {row['weight']} kg × {row['reps']}")
+    for old, updates in changes["update"]:
+        details = ", ".join(f"{field}: {old.get(field)} → {value}" for field, value in updates.items()
+                            if field in ("weight", "reps"))
+        lines.append(f"✏️ {old['workout']} · {old['exercise']} · Satz {old['set']}" + (f": {details}" if details else ""))
+    for row in changes["delete"]:
+        lines.append(f"➖ {row['workout']} · {row['exercise']} · Satz {row['set']}")
+    return lines
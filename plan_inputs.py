@@ -0,0 +1,283 @@
+"""Eingaben für die Plan-Generierung ohne Streamlit-Abhängigkeit.
+
+Profil aus dem Fragebogen, Zusammenfassung der Trainingshistorie und das
+Rendern des Prompts aus ai_prompt.txt. Wird von app.supa.py (pro User) und
+batch_plans.py (für viele Mitglieder auf einmal) gemeinsam genutzt.
+"""
+import datetime
+
+import pandas as pd
+
+from exercise_catalog import canonicalize_exercises
+from plan_cache import make_plan_cache_key
+from plan_parser import JSON_FORMAT_INSTRUCTION
+
+AI_PROMPT_PATH = "ai_prompt.txt"
+DEFAULT_AI_CONFIG = {
+    'temperature': 0.7,
+    'model': 'gpt-4o-mini',
+    'max_tokens': 4000,
+    'top_p': 1.0,
+    'output_format': 'text',
+    'prompt': ''
+}
+
+
+def parse_prompt_config(content):
+    """Trennt Konfiguration und Prompt-Template einer ai_prompt.txt."""
+    config = dict(DEFAULT_AI_CONFIG)
+    if '### KONFIGURATION ###' in content and '### ENDE KONFIGURATION ###' in content:
+        config_section = content.split('### KONFIGURATION ###')[1].split('### ENDE KONFIGURATION ###')[0]
+        prompt_section = content.split('### ENDE KONFIGURATION ###')[1]
+        
+        # Parse config values
+        for line in config_section.strip().split('\n'):
+            if ':' in line:
+                key, value = line.split(':', 1)
+                key = key.strip()
+                value = value.strip()
+                if key == 'temperature':
+                    config['temperature'] = float(value)
+                elif key == 'model':
+                    config['model'] = value
+                elif key == 'max_tokens':
+                    config['max_tokens'] = int(value)
+                elif key == 'top_p':
+                    config['top_p'] = float(value)
+                elif key == 'output_format':
+                    config['output_format'] = value.lower()
+        
+        config['prompt'] = prompt_section.strip()
+    else:
+        # Keine Konfiguration gefunden, ganzer Inhalt ist Prompt
+        config['prompt'] = content
+    return config
+
+
+def load_prompt_config(path=AI_PROMPT_PATH):
+    with open(path, 'r', encoding='utf-8') as file:
+        return parse_prompt_config(file.read())
+
+
+def build_comprehensive_profile(profile):
+    """Extrahiert alle relevanten Gesundheits- und Trainingsdaten aus einer Fragebogen-Zeile"""
+    if not profile:
+        return {}
+    # Zeilen aus einem DataFrame (batch_plans.py) enthalten NaN für fehlende Felder:
+    # wie fehlende Schlüssel behandeln, damit die Standardwerte greifen statt "nan"
+    profile = {key: value for key, value in profile.items() if not _is_missing(value)}
+    
+    # Extrahiere alle relevanten Felder für die KI
+    comprehensive_profile = {
+        # Persönliche Daten
+        "name": f"{profile.get('forename', '')} {profile.get('surename', '')}".strip(),
+        "alter": calculate_age(profile.get('birthday')) if profile.get('birthday') else None,
+        "geschlecht": profile.get('gender', 'nicht angegeben'),
+        "größe": profile.get('height', 'nicht angegeben'),
+        "gewicht": profile.get('weight', 'nicht angegeben'),
+        "körperfett": profile.get('bodyfat', 'nicht angegeben'),
+        
+        # Trainingserfahrung und Ziele
+        "erfahrung": profile.get('experience', 'nicht angegeben'),
+        "ziele": profile.get('goals', 'nicht angegeben'),
+        "ziel_details": profile.get('goalDetail', ''),
+        "trainingsfrequenz": profile.get('trainFrequency', 'nicht angegeben'),
+        "motivation": profile.get('motivation', 'nicht angegeben'),
+        
+        # Gesundheitszustand
+        "gesundheitszustand": profile.get('healthCondition', 'gut'),
+        "einschränkungen": profile.get('restrictions', 'keine'),
+        "schmerzen": profile.get('pains', 'keine'),
+        
+        # Spezifische Gesundheitsprobleme
+        "operationen": profile.get('surgery', 'nein'),
+        "operations_details": profile.get('surgeryDetails', '') if profile.get('surgery') == 'ja' else '',
+        "ausstrahlende_schmerzen": profile.get('radiatingPain', 'nein'),
+        "schmerz_details": profile.get('painDetails', '') if profile.get('radiatingPain') == 'ja' else '',
+        "bandscheibenvorfall": profile.get('discHerniated', 'nein'),
+        "bandscheiben_details": profile.get('discDetails', '') if profile.get('discHerniated') == 'ja' else '',
+        "osteoporose": profile.get('osteoporose', 'nein'),
+        "bluthochdruck": profile.get('hypertension', 'nein'),
+        "hernie": profile.get('hernia', 'nein'),
+        "herzprobleme": profile.get('cardic', 'nein'),
+        "schlaganfall": profile.get('stroke', 'nein'),
+        "andere_gesundheitsprobleme": profile.get('healthOther', ''),
+        
+        # Lifestyle
+        "stresslevel": profile.get('stresslevel', 'mittel'),
+        "schlafdauer": profile.get('sleepDuration', 'nicht angegeben'),
+        "ernährung": profile.get('diet', 'nicht angegeben'),
+    }
+    
+    # Entferne leere Werte für kompaktere Darstellung
+    return {k: v for k, v in comprehensive_profile.items() if v and v != 'nicht angegeben' and v != 'nein' and v != ''}
+
+
+def _is_missing(value):
+    return value is None or (not isinstance(value, (list, dict)) and bool(pd.isna(value)))
+
+
+def calculate_age(birthday_str):
+    """Berechnet das Alter aus dem Geburtstag"""
+    if not birthday_str:
+        return None
+    try:
+        birthday = datetime.datetime.strptime(str(birthday_str), "%Y-%m-%d").date()
+        today = datetime.date.today()
+        age = today.year - birthday.year - ((today.month, today.day) < (birthday.month, birthday.day))
+        return age
+    except:
+        return None
+
+
+def summarize_workout_history(data):
+    """Analysiert die Trainingshistorie (Zeilen aus workout_history) und bereitet sie für die KI auf."""
+    if not data:
+        return "Keine Trainingshistorie vorhanden.", pd.DataFrame()
+    
+    df = pd.DataFrame(data)
+    # Schreibweisen derselben Übung zusammenführen (z.B. "Bench Press" -> "Bankdrücken")
+    df["exercise"] = canonicalize_exercises(df["exercise"])
+    if "weight" in df.columns:
+        df["weight"] = pd.to_numeric(df["weight"], errors="coerce").fillna(0)
+    if "reps" in df.columns:
+        df["reps"] = pd.to_numeric(df["reps"], errors="coerce").fillna(0)
+    if "rirDone" in df.columns:
+        df["rirDone"] = pd.to_numeric(df["rirDone"], errors="coerce").fillna(0)
+    
+    # Konvertiere date zu datetime für bessere Analyse
+    df['date'] = pd.to_datetime(df['date'])
+    
+    # Erstelle detaillierte Zusammenfassung
+    analysis_parts = []
+    
+    # 1. Allgemeine Statistiken
+    total_workouts = df['date'].nunique()
+    if total_workouts > 0:
+        first_workout = df['date'].min()
+        last_workout = df['date'].max()
+        days_training = (last_workout - first_workout).days + 1
+        frequency = total_workouts / max(days_training / 7, 1)  # Trainings pro Woche
+        
+        analysis_parts.append(f"TRAININGSÜBERSICHT:")
+        analysis_parts.append(f"- Trainingseinheiten gesamt: {total_workouts}")
+        analysis_parts.append(f"- Zeitraum: {first_workout.strftime('%d.%m.%Y')} bis {last_workout.strftime('%d.%m.%Y')}")
+        analysis_parts.append(f"- Durchschnittliche Frequenz: {frequency:.1f} Trainings/Woche")
+        analysis_parts.append("")
+    
+    # 2. Übungsanalyse mit Progression
+    analysis_parts.append("ÜBUNGSFORTSCHRITTE:")
+    exercises = df['exercise'].unique()
+    
+    for exercise in sorted(exercises):
+        ex_data = df[df['exercise'] == exercise].sort_values('date')
+        
+        # Berechne Fortschritt
+        first_weight = ex_data.iloc[0]['weight'] if len(ex_data) > 0 else 0
+        last_weight = ex_data.iloc[-1]['weight'] if len(ex_data) > 0 else 0
+        weight_progress = last_weight - first_weight
+        
+        # Durchschnittswerte
+        avg_weight = ex_data['weight'].mean()
+        avg_reps = ex_data['reps'].mean()
+        avg_rir = ex_data['rirDone'].mean()
+        max_weight = ex_data['weight'].max()
+        
+        # Trainingsanzahl
+        training_count = len(ex_data.groupby('date'))
+        
+        analysis_parts.append(f"\n{exercise}:")
+        analysis_parts.append(f"  - Trainiert: {training_count}x")
+        analysis_parts.append(f"  - Aktuelles Gewicht: {last_weight:.1f} kg (Max: {max_weight:.1f} kg)")
+        analysis_parts.append(f"  - Fortschritt: {weight_progress:+.1f} kg seit Beginn")
+        analysis_parts.append(f"  - Durchschnitt: {avg_weight:.1f} kg × {avg_reps:.0f} Wdh")
+        if avg_rir > 0:
+            analysis_parts.append(f"  - Durchschnittliche RIR: {avg_rir:.1f}")
+        
+        # Coach-Nachrichten für diese Übung
+        messages = ex_data[ex_data['messageToCoach'].notna() & (ex_data['messageToCoach'] != '')]
+        if not messages.empty:
+            analysis_parts.append(f"  - Feedback vom Athleten:")
+            for _, msg_row in messages.iterrows():
+                date_str = msg_row['date'].strftime('%d.%m.')
+                analysis_parts.append(f"    • {date_str}: \"{msg_row['messageToCoach']}\"")
+    
+    # 3. Workout-Split Analyse
+    analysis_parts.append("\nWORKOUT-VERTEILUNG:")
+    workout_counts = df.groupby('workout')['date'].nunique()
+    for workout, count in workout_counts.items():
+        analysis_parts.append(f"- {workout}: {count}x trainiert")
+    
+    # 4. Intensitätsanalyse basierend auf RIR
+    if 'rirDone' in df.columns and df['rirDone'].sum() > 0:
+        analysis_parts.append("\nINTENSITÄTSANALYSE:")
+        avg_rir_total = df[df['rirDone'] > 0]['rirDone'].mean()
+        analysis_parts.append(f"- Durchschnittliche RIR gesamt: {avg_rir_total:.1f}")
+        
+        # RIR nach Übung
+        rir_by_exercise = df[df['rirDone'] > 0].groupby('exercise')['rirDone'].mean().sort_values()
+        if len(rir_by_exercise) > 0:
+            analysis_parts.append("- Höchste Intensität (niedrigste RIR):")
+            for ex, rir in rir_by_exercise.head(3).items():
+                analysis_parts.append(f"  • {ex}: RIR {rir:.1f}")
+    
+    # 5. Allgemeine Coach-Nachrichten (nicht übungsspezifisch)
+    all_messages = df[df['messageToCoach'].notna() & (df['messageToCoach'] != '')]['messageToCoach'].unique()
+    if len(all_messages) > 0:
+        analysis_parts.append("\nALLGEMEINES FEEDBACK:")
+        for i, msg in enumerate(all_messages[:5]):  # Maximal 5 neueste Nachrichten
+            analysis_parts.append(f"- \"{msg}\"")
+    
+    summary = "\n".join(analysis_parts)
+    
+    return summary, df
+
+
+def render_plan_request(ai_config, user_name, profile, history_summary, additional_info,
+                        training_days, split_type, focus, load_context="", seed=None):
+    """Rendert den Prompt und sammelt alle Parameter für eine Plan-Generierung."""
+    if "Keine Trainingshistorie vorhanden" in history_summary:
+        weight_instruction = "Setze alle Gewichte auf 0 kg, da keine Trainingshistorie vorhanden ist."
+    else:
+        weight_instruction = "Basiere die Gewichte auf der Trainingshistorie und passe sie progressiv an."
+    
+    if not additional_info or additional_info.strip() == "":
+        additional_info = "Keine zusätzlichen Wünsche angegeben."
+    
+    # Kompakte Belastungskennzahlen als zusätzlicher Kontext
+    history_for_prompt = f"{history_summary}\n\n{load_context}" if load_context else history_summary
+    
+    prompt = ai_config['prompt'].format(
+        profile=profile,
+        history_analysis=history_for_prompt,
+        additional_info=additional_info,
+        training_days=training_days,
+        split_type=split_type,
+        focus=focus,
+        weight_instruction=weight_instruction
+    )
+    # Strukturierte Ausgabe: JSON nach Schema statt Textformat
+    if ai_config['output_format'] == 'json':
+        prompt += JSON_FORMAT_INSTRUCTION
+    
+    params = {
+        'training_days': training_days,
+        'split_type': split_type,
+        'focus': focus,
+        'top_p': ai_config['top_p'],
+        'max_tokens': ai_config['max_tokens'],
+        'output_format': ai_config['output_format'],
+        'seed': seed,
+    }
+    return {
+        'prompt': prompt,
+        'model': ai_config['model'],
+        'temperature': ai_config['temperature'],
+        'max_tokens': ai_config['max_tokens'],
+        'top_p': ai_config['top_p'],
+        'output_format': ai_config['output_format'],
+        'params': params,
+        'seed': seed,
+        'user_name': user_name,
+        'cache_key': make_plan_cache_key(prompt, ai_config['model'], ai_config['temperature'], params),
+    }
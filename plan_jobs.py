@@ -0,0 +1,229 @@
+"""Hintergrund-Jobs für die Plan-Generierung.
+
+Die OpenAI-Anfrage läuft in einem Thread-Pool statt im Streamlit-Skriptlauf.
+Jeder Job hat eine ID und wird in einer lokalen SQLite-Datei gespeichert
+(Status, Zwischenstand des Textes, Ergebnis), sodass der Plan auch nach einem
+Seitenwechsel oder Verbindungsabbruch abgeholt werden kann.
+"""
+import json
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from plan_parser import PLAN_RESPONSE_FORMAT, parse_plan_response
+from rate_limiter import estimate_request_tokens
+
+PLAN_JOBS_PATH = "plan_jobs.sqlite3"
+PLAN_JOB_WORKERS = 32  # wartende Jobs blockieren nur einen Thread; gleichzeitige Anfragen begrenzt der Scheduler
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF_SECONDS = 10
+PARTIAL_FLUSH_SECONDS = 0.5  # wie oft der Zwischenstand gespeichert wird
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Einzelplan (wird nach Verbindungsabbruch automatisch wieder aufgenommen) oder
+# Variante eines Vergleichs (wird nur durch Auswahl des Users übernommen)
+JOB_KIND_PLAN = "plan"
+JOB_KIND_VARIANT = "variant"
+
+
+class PlanJobStore:
+    def __init__(self, path=PLAN_JOBS_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, user_uuid TEXT NOT NULL, status TEXT NOT NULL, "
+                "request TEXT NOT NULL, partial_text TEXT NOT NULL DEFAULT '', "
+                "result TEXT, error TEXT, claimed INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user_uuid, created_at)")
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "kind" not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT '{JOB_KIND_PLAN}'")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, user_uuid, request, kind=JOB_KIND_PLAN):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, user_uuid, status, request, kind, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_uuid, JOB_QUEUED, json.dumps(request, ensure_ascii=False), kind, now, now)
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def latest_unclaimed(self, user_uuid):
+        """Jüngster noch nicht abgeholter Einzelplan eines Users (z.B. nach Verbindungsabbruch).
+
+        Varianten bleiben bis zur Auswahl offen und werden hier nie geliefert,
+        sonst würde eine davon ohne Wahl des Users als Plan übernommen.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE user_uuid = ? AND claimed = 0 AND kind = ? "
+                "ORDER BY created_at DESC LIMIT 1", (user_uuid, JOB_KIND_PLAN)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def claim(self, job_id):
+        self.update(job_id, claimed=1)
+
+    def unfinished(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class PlanJobQueue:
+    """Führt Plan-Generierungen im Hintergrund aus (ein Thread pro laufender Anfrage)."""
+
+    def __init__(self, client, store=None, max_workers=PLAN_JOB_WORKERS, plan_cache=None, scheduler=None):
+        self.client = client
+        self.store = store or PlanJobStore()
+        self.plan_cache = plan_cache
+        self.scheduler = scheduler
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-job")
+        self._recover()
+
+    def _recover(self):
+        # Nach einem Neustart: wartende Jobs erneut einplanen, abgebrochene als Fehler markieren
+        for job in self.store.unfinished():
+            if job["status"] == JOB_QUEUED:
+                self.executor.submit(self._run, job["id"])
+            else:
+                self.store.update(job["id"], status=JOB_FAILED, error="Generierung durch Neustart abgebrochen")
+
+    def submit(self, user_uuid, request, kind=JOB_KIND_PLAN):
+        """Legt einen Job an und startet ihn; request enthält Prompt, Modell-Parameter und User-Daten."""
+        job_id = self.store.create(user_uuid, request, kind)
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def _stream_completion(self, job_id, request):
+        """Streamt eine Completion, speichert den Zwischenstand; gibt (Text, usage) zurück."""
+        structured_output = request.get("output_format") == "json"
+        stream = self.client.chat.completions.create(
+            model=request["model"],
+            messages=[{"role": "user", "content": request["prompt"]}],
+            temperature=request["temperature"],
+            max_tokens=request["max_tokens"],
+            top_p=request["top_p"],
+            stream=True,
+            stream_options={"include_usage": True},
+            **({"response_format": PLAN_RESPONSE_FORMAT} if structured_output else {}),
+            **({"seed": request["seed"]} if request.get("seed") is not None else {})
+        )
+        chunks = []
+        finish_reason = None
+        usage = None
+        last_flush = time.monotonic()
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].finish_reason:
+                finish_reason = chunk.choices[0].finish_reason
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            chunks.append(delta)
+            if time.monotonic() - last_flush > PARTIAL_FLUSH_SECONDS:
+                self.store.update(job_id, partial_text="".join(chunks))
+                last_flush = time.monotonic()
+
+        plan_text = "".join(chunks)
+        if finish_reason is None:
+            # Stream ohne Abschluss: Verbindung abgebrochen, Plan wäre unvollständig
+            raise RuntimeError("Antwort unvollständig – Verbindung zum KI-Dienst abgebrochen")
+        if finish_reason == "length":
+            # max_tokens erreicht: der Plan bricht mitten im Text ab
+            raise RuntimeError("Antwort abgeschnitten (max_tokens erreicht) – Plan unvollständig")
+        return plan_text, usage
+
+    def _generate(self, job_id, user_uuid, request):
+        """Completion über den Scheduler; bei 429 Pause für alle und erneuter Versuch."""
+        tokens = estimate_request_tokens(request["prompt"], request["max_tokens"])
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            ticket = self.scheduler.acquire(user_uuid, tokens, ticket_id=job_id) if self.scheduler else None
+            self.store.update(job_id, status=JOB_RUNNING)
+            usage = None
+            try:
+                plan_text, usage = self._stream_completion(job_id, request)
+                return plan_text, usage
+            except Exception as e:
+                if getattr(e, "status_code", None) != 429 or attempt == RATE_LIMIT_RETRIES or not self.scheduler:
+                    raise
+                retry_after = getattr(getattr(e, "response", None), "headers", {}).get("retry-after")
+                self.scheduler.backoff(float(retry_after) if retry_after else RATE_LIMIT_BACKOFF_SECONDS)
+                self.store.update(job_id, status=JOB_QUEUED, partial_text="")
+            finally:
+                if ticket is not None:
+                    self.scheduler.release(
+                        ticket,
+                        prompt_tokens=usage.prompt_tokens if usage else None,
+                        completion_tokens=usage.completion_tokens if usage else None
+                    )
+
+    def estimate_wait(self, job_id):
+        """Geschätzte Wartezeit eines Jobs in der Warteschlange (Sekunden) oder None."""
+        return self.scheduler.estimate_wait(job_id) if self.scheduler else None
+
+    def _run(self, job_id):
+        job = self.store.get(job_id)
+        request = job["request"]
+        try:
+            plan_text, usage = self._generate(job_id, job["user_uuid"], request)
+            rows, explanation, warnings, mode = parse_plan_response(
+                plan_text, job["user_uuid"], request.get("user_name", "Unbekannt")
+            )
+            if self.plan_cache is not None and request.get("cache_key") and rows:
+                self.plan_cache.put(request["cache_key"], plan_text)
+            self.store.update(
+                job_id, status=JOB_DONE, partial_text=plan_text,
+                result={"plan_text": plan_text, "rows": rows, "explanation": explanation,
+                        "warnings": warnings, "mode": mode,
+                        "usage": {"prompt_tokens": usage.prompt_tokens,
+                                  "completion_tokens": usage.completion_tokens} if usage else None}
+            )
+        except Exception as e:
+            self.store.update(job_id, status=JOB_FAILED, error=str(e))
@@ -0,0 +1,338 @@
+"""Parser für KI-generierte Trainingspläne.
+
+Zwei Formate werden unterstützt:
+- strukturiertes JSON (response_format mit PLAN_JSON_SCHEMA), das direkt
+  validiert und in Zeilen umgewandelt wird
+- das Textformat aus ai_prompt.txt als Fallback. Dieser Parser arbeitet
+  zeilenweise und kann direkt mit gestreamten Antworten gefüttert werden.
+"""
+import datetime
+import json
+import re
+from collections import Counter
+
+EXPLANATION_HEADER = "**DEIN PERSÖNLICHER TRAININGSPLAN**"
+
+# Zählt Parse-Ergebnisse pro Prozess (z.B. "json_ok", "json_failed", "text_ok", "text_empty")
+PARSE_STATS = Counter()
+
+PLAN_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "explanation": {"type": "string"},
+        "workouts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "exercises": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "sets": {"type": "integer"},
+                                "reps": {"type": "string"},
+                                "weight": {"type": "number"},
+                                "focus": {"type": "string"},
+                            },
+                            "required": ["name", "sets", "reps", "weight", "focus"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
+                "required": ["name", "exercises"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["explanation", "workouts"],
+    "additionalProperties": False,
+}
+
+PLAN_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "trainingsplan", "strict": True, "schema": PLAN_JSON_SCHEMA},
+}
+
+JSON_FORMAT_INSTRUCTION = """
+AUSGABEFORMAT (ersetzt die Formatierungsregeln oben):
+Antworte ausschließlich mit einem JSON-Objekt:
+- "explanation": die persönliche Erklärung (3-4 Sätze)
+- "workouts": Liste der Trainingstage mit "name" und "exercises"
+- jede Übung mit "name", "sets" (Anzahl), "reps" (z.B. "8-10"), "weight" (kg, 0 bei Körpergewicht) und "focus" (kurzer Hinweis)
+"""
+
+
+# Vorkompilierte Muster für den Text-Parser
+WORKOUT_HEADER_RE = re.compile(
+    r'^(?:'
+    r'\*\*(.+?):\*\*'   # **Workout Name:**
+    r'|\*\*(.+)\*\*'    # **Workout Name** (ohne Doppelpunkt)
+    r'|#{2,3}\s*(.+)'   # ## Workout Name / ### Workout Name
+    r'|(.+):$'         # Workout Name:
+    r')'
+)
+EXERCISE_RE = re.compile(r'^[-*]\s*(.+?):\s*(.*)')
+FOCUS_RE = re.compile(r'\((?:Erklärung|Fokus):\s*(.+)\)$')
+SETS_RE = re.compile(r'(\d+)\s*(?:x|[Ss]ätze|[Ss]ets)')
+WEIGHT_RE = re.compile(r'(\d+[\.,]?\d*)\s*kg')
+REPS_RE = re.compile(r'(\d+\s*-\s*\d+|\d+)\s*(?:Wdh|Wiederholungen|reps)', re.IGNORECASE)
+
+
+class PlanFormatError(ValueError):
+    """Antwort entspricht nicht dem erwarteten Planformat."""
+
+
+def build_plan_row(user_uuid, user_name, current_date, workout, exercise, set_number,
+                   weight, reps, explanation):
+    """Eine Zeile für die workouts-Tabelle (ein Satz)."""
+    return {
+        'uuid': user_uuid,
+        'date': current_date,
+        'name': user_name,
+        'workout': workout,
+        'exercise': exercise,
+        'set': set_number,
+        'weight': weight,
+        'reps': reps.split('-')[0] if '-' in str(reps) else reps,
+        'unit': 'kg',
+        'type': '',
+        'completed': False,
+        'messageToCoach': '',
+        'messageFromCoach': explanation,
+        'rirSuggested': 0,
+        'rirDone': 0,
+        'generalStatementFrom': '',
+        'generalStatementTo': '',
+        'dummy1': '', 'dummy2': '', 'dummy3': '', 'dummy4': '', 'dummy5': '',
+        'dummy6': '', 'dummy7': '', 'dummy8': '', 'dummy9': '', 'dummy10': ''
+    }
+
+
+class PlanStreamParser:
+    """Inkrementeller Plan-Parser: feed() mit Text-Stücken, close() am Ende."""
+
+    def __init__(self, user_uuid, user_name):
+        self.user_uuid = user_uuid
+        self.user_name = user_name
+        self.current_date = datetime.date.today().isoformat()
+        self.current_workout = None
+        self.rows = []
+        self.workouts = {}  # Workout -> Liste von (Übung, Sätze, Wdh, Gewicht)
+        self.warnings = []
+        self.skipped_lines = []  # Zeilen innerhalb eines Workouts, die keiner Übung entsprechen
+        self._buffer = ""
+        self._explanation_lines = []
+        self._in_explanation = False
+        self._explanation_done = False
+
+    @property
+    def explanation(self):
+        return "\n".join(self._explanation_lines).strip()
+
+    def feed(self, text):
+        """Verarbeitet alle vollständigen Zeilen in text, gibt neu erzeugte Zeilen zurück."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        new_rows = []
+        for line in lines:
+            new_rows.extend(self._parse_line(line))
+        return new_rows
+
+    def close(self):
+        """Verarbeitet den Rest im Puffer und liefert (rows, plan_explanation)."""
+        if self._buffer:
+            self._parse_line(self._buffer)
+            self._buffer = ""
+        return self.rows, self.explanation
+
+    def _parse_line(self, line):
+        line = line.strip()
+        if not line:
+            return []
+
+        # Erklärung: alles nach dem Titel
+        if not self._explanation_done:
+            if EXPLANATION_HEADER in line:
+                self._in_explanation = True
+                line = line.split(EXPLANATION_HEADER, 1)[1].strip()
+                if not line:
+                    return []
+            if self._in_explanation:
+                # Die Erklärung endet beim nächsten "**" oder einer Überschrift/Übung
+                if "**" not in line and line[0] not in "#-*" and line[-1] != ":":
+                    self._explanation_lines.append(line)
+                    return []
+                if "**" in line:
+                    self._explanation_lines.append(line.split("**", 1)[0].strip())
+                self._in_explanation = False
+                self._explanation_done = True
+
+        if "DEIN PERSÖNLICHER TRAININGSPLAN" in line:
+            return []
+
+        # Workout-Überschriften beginnen mit ** oder # oder enden mit ":"
+        first = line[0]
+        if first in "*#" or line[-1] == ":":
+            workout_match = WORKOUT_HEADER_RE.match(line)
+            if workout_match:
+                self.current_workout = next(group for group in workout_match.groups() if group).strip()
+                return []
+
+        # Wenn noch kein Workout definiert wurde, überspringe
+        if self.current_workout is None:
+            return []
+
+        exercise_match = EXERCISE_RE.match(line) if first in "-*" else None
+        if not exercise_match:
+            self.skipped_lines.append(line)
+            return []
+
+        exercise_name = exercise_match.group(1).strip()
+        sets, weight, reps, explanation = parse_exercise_details(exercise_match.group(2).strip())
+        # Sätze unterscheiden sich nur in der Satznummer
+        first_set = build_plan_row(self.user_uuid, self.user_name, self.current_date, self.current_workout,
+                                   exercise_name, 1, weight, reps, explanation)
+        new_rows = [first_set] + [dict(first_set, set=satz) for satz in range(2, sets + 1)]
+        self.rows.extend(new_rows)
+        self.workouts.setdefault(self.current_workout, []).append((exercise_name, sets, reps, weight))
+        return new_rows
+
+
+def parse_exercise_details(details):
+    """Sätze, Gewicht, Wdh und Fokus-Hinweis aus dem Teil nach "Übung:"."""
+    sets, weight, reps, explanation = 3, 0.0, "10", ""
+
+    explanation_match = FOCUS_RE.search(details)
+    if explanation_match:
+        explanation = explanation_match.group(1).strip()
+        details = details[:explanation_match.start()].strip()
+
+    sets_match = SETS_RE.search(details)
+    if sets_match:
+        sets = int(sets_match.group(1))
+
+    # Ohne kg-Angabe (z.B. Körpergewicht) bleibt das Gewicht 0
+    weight_match = WEIGHT_RE.search(details)
+    if weight_match:
+        weight = float(weight_match.group(1).replace(',', '.'))
+
+    reps_match = REPS_RE.search(details)
+    if reps_match:
+        reps = reps_match.group(1).strip()
+
+    return sets, weight, reps, explanation
+
+
+def parse_plan_text(plan_text, user_uuid, user_name):
+    """Parst einen kompletten Plan-Text; liefert (rows, plan_explanation, warnings)."""
+    parser = PlanStreamParser(user_uuid, user_name)
+    parser.feed(plan_text)
+    rows, explanation = parser.close()
+    return rows, explanation, parser.warnings
+
+
+def summarize_rows(rows):
+    """Workout -> Liste von (Übung, Sätze, Wdh, Gewicht), wie PlanStreamParser.workouts."""
+    workouts = {}
+    for row in rows:
+        exercises = workouts.setdefault(row['workout'], {})
+        if row['exercise'] in exercises:
+            name, sets, reps, weight = exercises[row['exercise']]
+            exercises[row['exercise']] = (name, sets + 1, reps, weight)
+        else:
+            exercises[row['exercise']] = (row['exercise'], 1, row['reps'], row['weight'])
+    return {workout: list(exercises.values()) for workout, exercises in workouts.items()}
+
+
+def _strip_code_fence(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = re.sub(r'^```(?:json)?\s*', '', text)
+        text = re.sub(r'\s*```$', '', text)
+    return text
+
+
+def validate_plan_json(data):
+    """Prüft und normalisiert einen JSON-Plan; liefert (workouts, explanation, warnings).
+
+    Ungültige Übungen werden mit Warnung übersprungen. Bleibt keine gültige
+    Übung übrig, wird PlanFormatError ausgelöst.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("workouts"), list):
+        raise PlanFormatError("JSON enthält keine Liste 'workouts'")
+
+    warnings = []
+    workouts = []
+    for w_index, workout in enumerate(data["workouts"], 1):
+        name = str(workout.get("name", "")).strip().rstrip(":") if isinstance(workout, dict) else ""
+        if not name:
+            warnings.append(f"Workout {w_index} ohne Namen übersprungen")
+            continue
+        exercises = []
+        for exercise in workout.get("exercises") or []:
+            try:
+                ex_name = str(exercise["name"]).strip()
+                if not ex_name:
+                    raise ValueError("leerer Übungsname")
+                sets = int(exercise.get("sets", 3))
+                if sets < 1:
+                    raise ValueError(f"ungültige Satzanzahl {sets}")
+                reps = str(exercise.get("reps", "10")).strip() or "10"
+                weight = exercise.get("weight") or 0
+                weight = float(str(weight).lower().replace("kg", "").replace(",", ".").strip() or 0)
+                focus = str(exercise.get("focus") or "").strip()
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                warnings.append(f"Übung in '{name}' übersprungen: {e}")
+                continue
+            exercises.append({"name": ex_name, "sets": sets, "reps": reps, "weight": weight, "focus": focus})
+        if exercises:
+            workouts.append({"name": name, "exercises": exercises})
+
+    if not workouts:
+        raise PlanFormatError("JSON enthält keine gültigen Übungen")
+    return workouts, str(data.get("explanation") or "").strip(), warnings
+
+
+def plan_json_to_rows(workouts, user_uuid, user_name):
+    """Baut die workouts-Zeilen aus validierten JSON-Workouts."""
+    current_date = datetime.date.today().isoformat()
+    return [
+        build_plan_row(user_uuid, user_name, current_date, workout["name"], exercise["name"],
+                       satz, exercise["weight"], exercise["reps"], exercise["focus"])
+        for workout in workouts
+        for exercise in workout["exercises"]
+        for satz in range(1, exercise["sets"] + 1)
+    ]
+
+
+def parse_plan_response(response_text, user_uuid, user_name, text_parser=None):
+    """Parst eine KI-Antwort: zuerst als JSON-Plan, sonst mit dem Text-Parser.
+
+    text_parser kann ein bereits mit dem Stream gefütterter PlanStreamParser sein,
+    dann wird der Text nicht ein zweites Mal geparst.
+    Liefert (rows, plan_explanation, warnings, mode) mit mode "json" oder "text".
+    Ergebnisse werden in PARSE_STATS gezählt.
+    """
+    fallback_warning = None
+    candidate = _strip_code_fence(response_text)
+    if candidate.startswith("{"):
+        try:
+            workouts, explanation, warnings = validate_plan_json(json.loads(candidate))
+            PARSE_STATS["json_ok"] += 1
+            return plan_json_to_rows(workouts, user_uuid, user_name), explanation, warnings, "json"
+        except (json.JSONDecodeError, PlanFormatError) as e:
+            PARSE_STATS["json_failed"] += 1
+            fallback_warning = f"JSON-Plan ungültig ({e}), verwende Text-Parser"
+
+    parser = text_parser
+    if parser is None:
+        parser = PlanStreamParser(user_uuid, user_name)
+        parser.feed(response_text)
+    rows, explanation = parser.close()
+    PARSE_STATS["text_ok" if rows else "text_empty"] += 1
+    PARSE_STATS["text_skipped_lines"] += len(parser.skipped_lines)
+    warnings = ([fallback_warning] if fallback_warning else []) + parser.warnings
+    return rows, explanation, warnings, "text"
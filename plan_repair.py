@@ -0,0 +1,121 @@
+"""Prüfung und Reparatur geparster Pläne ohne erneuten KI-Aufruf.
+
+Läuft nach dem Parser auf den workouts-Zeilen:
+- Übungsnamen auf den Katalog vereinheitlichen (exercise_catalog.py)
+- Wiederholungen normalisieren (Bereiche, "3x10", "AMRAP", "12 pro Seite", ...);
+  zeitbasierte Vorgaben ("30 Sek") sind keine Wdh und landen im Coach-Hinweis
+- fehlende Gewichte aus dem letzten Training der Übung ergänzen
+- Satzanzahl pro Übung begrenzen und Satznummern lückenlos machen
+- Anzahl der Workouts auf training_days begrenzen
+
+repair_plan() liefert die reparierten Zeilen und eine Liste lesbarer
+Hinweise, was geändert wurde.
+"""
+import re
+
+import pandas as pd
+
+from exercise_catalog import canonical_exercise_name, canonicalize_exercises
+
+MIN_REPS = 1
+MAX_REPS = 50
+DEFAULT_REPS = 10
+MAX_SETS = 6
+# Wiederholungsangaben ohne Zahl, die "so viele wie möglich" bedeuten
+OPEN_ENDED_REPS_RE = re.compile(r'amrap|max|muskelversagen|so viele', re.IGNORECASE)
+# Zeitangaben ("30 Sek", "45s", "1 Min") sind keine Wiederholungen
+TIME_BASED_RE = re.compile(r'\d+\s*(sek\w*|sec\w*|s|min\w*)\b', re.IGNORECASE)
+# "3x10" = Sätze x Wdh: die Wdh stehen hinter dem x
+SETS_X_REPS_RE = re.compile(r'\d+\s*[x×]\s*(\d+)', re.IGNORECASE)
+FIRST_NUMBER_RE = re.compile(r'\d+')
+RANGE_RE = re.compile(r'\d+\s*-\s*\d+')
+
+
+def latest_exercise_values(history_df):
+    """Kanonische Übung (kleingeschrieben) -> (Gewicht, Wdh) des letzten Trainings, höchstes Gewicht des Tages."""
+    if history_df is None or history_df.empty or "exercise" not in history_df.columns:
+        return {}
+    df = history_df[["date", "exercise", "weight", "reps"]].copy()
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df["weight"] = pd.to_numeric(df["weight"], errors="coerce").fillna(0)
+    df["reps"] = pd.to_numeric(df["reps"], errors="coerce").fillna(0)
+    df["key"] = canonicalize_exercises(df["exercise"].astype(str)).str.lower()
+    latest = df.sort_values(["key", "date", "weight"]).groupby("key").tail(1)
+    return {row.key: (float(row.weight), int(row.reps)) for row in latest.itertuples(index=False)}
+
+
+def normalize_reps(reps, fallback=DEFAULT_REPS):
+    """Wdh-Angabe als Zahl; liefert (reps, Hinweis oder None)."""
+    text = str(reps).strip()
+    if text.isdigit() and MIN_REPS <= int(text) <= MAX_REPS:
+        return int(text), None
+    if OPEN_ENDED_REPS_RE.search(text):
+        return fallback, f"'{text}' → {fallback} Wdh (bis kurz vor Muskelversagen)"
+    if TIME_BASED_RE.search(text):
+        return fallback, f"'{text}' → {fallback} Wdh (Zeitvorgabe im Coach-Hinweis)"
+    sets_x_reps = SETS_X_REPS_RE.search(text)
+    if sets_x_reps:
+        value = min(max(int(sets_x_reps.group(1)), MIN_REPS), MAX_REPS)
+        return value, f"'{text}' → {value} Wdh"
+    numbers = [int(n) for n in FIRST_NUMBER_RE.findall(text)]
+    if numbers:
+        value = min(max(numbers[0], MIN_REPS), MAX_REPS)
+        return value, None if str(value) == text else f"'{text}' → {value} Wdh"
+    return fallback, f"'{text}' → {fallback} Wdh"
+
+
+def repair_plan(rows, training_days=None, history_df=None, max_sets=MAX_SETS):
+    """Repariert geparste Plan-Zeilen; liefert (rows, fixes)."""
+    fixes = []
+    if not rows:
+        return rows, fixes
+
+    # Zu viele Trainingstage: die ersten training_days Workouts behalten
+    workout_order = list(dict.fromkeys(row["workout"] for row in rows))
+    if training_days and len(workout_order) > training_days:
+        dropped = workout_order[training_days:]
+        rows = [row for row in rows if row["workout"] not in dropped]
+        fixes.append(f"{len(workout_order)} statt {training_days} Trainingstage – entfernt: {', '.join(dropped)}")
+    elif training_days and len(workout_order) < training_days:
+        fixes.append(f"Nur {len(workout_order)} von {training_days} Trainingstagen im Plan – Workouts im Wechsel trainieren")
+
+    history = latest_exercise_values(history_df)
+    repaired = []
+    sets_per_exercise = {}
+    for row in rows:
+        canonical = canonical_exercise_name(row["exercise"])
+        if canonical != row["exercise"]:
+            fixes.append(f"'{row['exercise']}' → '{canonical}'")
+            row = dict(row, exercise=canonical)
+        key = (row["workout"], row["exercise"])
+        set_number = sets_per_exercise.get(key, 0) + 1
+        if set_number > max_sets:
+            if set_number == max_sets + 1:
+                fixes.append(f"{row['exercise']} ({row['workout']}): auf {max_sets} Sätze begrenzt")
+            sets_per_exercise[key] = set_number
+            continue
+        sets_per_exercise[key] = set_number
+        row = dict(row, set=set_number)
+
+        last_weight, last_reps = history.get(row["exercise"].lower(), (0.0, 0))
+        reps, note = normalize_reps(row["reps"], fallback=last_reps or DEFAULT_REPS)
+        if note:
+            if not RANGE_RE.fullmatch(str(row["reps"]).strip()):
+                # Ursprüngliche Vorgabe (AMRAP, Sekunden, pro Seite) im Coach-Hinweis erhalten
+                row["messageFromCoach"] = " – ".join(filter(None, [str(row["reps"]).strip(), row["messageFromCoach"]]))
+            if set_number == 1:
+                fixes.append(f"{row['exercise']}: {note}")
+        row["reps"] = reps
+
+        try:
+            weight = float(row["weight"])
+        except (TypeError, ValueError):
+            weight = 0.0
+        if weight <= 0 and last_weight > 0:
+            weight = last_weight
+            if set_number == 1:
+                fixes.append(f"{row['exercise']}: Gewicht aus dem letzten Training ergänzt ({last_weight:g} kg)")
+        row["weight"] = weight
+        repaired.append(row)
+    # Gleiche Korrektur in mehreren Workouts nur einmal melden
+    return repaired, list(dict.fromkeys(fixes))
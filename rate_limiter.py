@@ -0,0 +1,163 @@
+"""Prozessweiter Scheduler für OpenAI-Anfragen.
+
+Hält Requests-pro-Minute (RPM), Tokens-pro-Minute (TPM) und die Anzahl
+gleichzeitiger Anfragen ein. Wartende Anfragen werden pro User in eigene
+Warteschlangen gelegt und reihum freigegeben, damit ein User mit vielen
+Jobs (z.B. Varianten) andere nicht blockiert.
+
+Tokens werden vor dem Aufruf geschätzt (Prompt-Länge / 4 + max_tokens, so
+rechnet auch OpenAI das Limit an) und nach dem Aufruf mit der tatsächlichen
+Nutzung korrigiert.
+"""
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200_000
+DEFAULT_MAX_CONCURRENT = 8
+RATE_WINDOW_SECONDS = 60.0
+DEFAULT_CALL_SECONDS = 20.0  # Annahme für die Wartezeit-Schätzung, solange keine Messwerte da sind
+
+
+def estimate_request_tokens(prompt, max_tokens):
+    return len(prompt) // 4 + 1 + max_tokens
+
+
+class RateScheduler:
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_concurrent=DEFAULT_MAX_CONCURRENT,
+                 window=RATE_WINDOW_SECONDS):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrent = max_concurrent
+        self.window = window
+        self.usage = deque(maxlen=1000)  # letzte Aufrufe: User, Tokens, Dauer
+        self.totals = Counter()
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # User -> deque wartender Tickets, Reihenfolge = Round-Robin
+        self._sent = deque()  # [Zeitpunkt, Tokens] der Anfragen im aktuellen Fenster
+        self._running = 0
+        self._cooldown_until = 0.0
+        self._durations = deque(maxlen=50)
+
+    # ---- Freigabe ----
+    def acquire(self, user_uuid, tokens, ticket_id=None):
+        """Blockiert, bis die Anfrage an der Reihe ist und das Budget reicht; gibt ein Ticket zurück."""
+        ticket = {"id": ticket_id or uuid.uuid4().hex, "user": user_uuid, "tokens": tokens,
+                  "enqueued": time.time()}
+        with self._cond:
+            self._queues.setdefault(user_uuid, deque()).append(ticket)
+            self._cond.notify_all()
+            while True:
+                wait = self._budget_wait(tokens) if self._next_ticket() is ticket else None
+                if wait is not None and wait <= 0 and self._running < self.max_concurrent:
+                    break
+                self._cond.wait(timeout=wait if wait and wait > 0 else 1.0)
+
+            queue = self._queues[user_uuid]
+            queue.popleft()
+            if queue:
+                self._queues.move_to_end(user_uuid)  # nächster Job dieses Users erst nach den anderen
+            else:
+                del self._queues[user_uuid]
+            ticket["sent"] = [time.time(), tokens]
+            self._sent.append(ticket["sent"])
+            self._running += 1
+            self.totals["requests"] += 1
+            self.totals["wait_seconds"] += ticket["sent"][0] - ticket["enqueued"]
+            self._cond.notify_all()
+        return ticket
+
+    def release(self, ticket, prompt_tokens=None, completion_tokens=None):
+        """Gibt den Platz frei und verbucht die tatsächliche Token-Nutzung."""
+        with self._cond:
+            self._running -= 1
+            duration = time.time() - ticket["sent"][0]
+            self._durations.append(duration)
+            if prompt_tokens is not None and completion_tokens is not None:
+                ticket["sent"][1] = prompt_tokens + completion_tokens
+                self.totals["prompt_tokens"] += prompt_tokens
+                self.totals["completion_tokens"] += completion_tokens
+            self.usage.append({"user": ticket["user"], "prompt_tokens": prompt_tokens,
+                               "completion_tokens": completion_tokens, "seconds": round(duration, 2),
+                               "time": ticket["sent"][0]})
+            self._cond.notify_all()
+
+    def backoff(self, seconds):
+        """Pausiert alle Freigaben, z.B. nach einem 429 von OpenAI."""
+        with self._cond:
+            self._cooldown_until = max(self._cooldown_until, time.time() + seconds)
+            self.totals["rate_limited"] += 1
+            self._cond.notify_all()
+
+    # ---- Schätzung ----
+    def estimate_wait(self, ticket_id):
+        """Geschätzte Wartezeit in Sekunden für ein wartendes Ticket (None, wenn nicht wartend)."""
+        with self._cond:
+            order = self._fair_order()
+            position = next((i for i, ticket in enumerate(order) if ticket["id"] == ticket_id), None)
+            if position is None:
+                return None
+            average = sum(self._durations) / len(self._durations) if self._durations else DEFAULT_CALL_SECONDS
+            # Ohne freien Platz: warten, bis genug laufende Anfragen fertig sind (je Runde max_concurrent)
+            free_slots = self.max_concurrent - self._running
+            if position < free_slots:
+                concurrency_wait = 0
+            else:
+                concurrency_wait = ((position - free_slots) // self.max_concurrent + 1) * average
+            ahead_tokens = sum(ticket["tokens"] for ticket in order[:position + 1])
+            rate_wait = max(position + 1 - self._free_requests(), 0) * self.window / self.rpm
+            token_wait = max(ahead_tokens - self._free_tokens(), 0) * self.window / self.tpm
+            cooldown = max(self._cooldown_until - time.time(), 0)
+            return max(concurrency_wait, rate_wait, token_wait, cooldown)
+
+    def snapshot(self):
+        """Aktueller Zustand für die Anzeige."""
+        with self._cond:
+            self._prune()
+            return {"running": self._running, "waiting": sum(len(q) for q in self._queues.values()),
+                    "users_waiting": len(self._queues), "requests_last_minute": len(self._sent),
+                    "tokens_last_minute": sum(tokens for _, tokens in self._sent), **self.totals}
+
+    # ---- intern (nur mit gehaltenem Lock) ----
+    def _fair_order(self):
+        """Wartende Tickets in der Reihenfolge, in der sie freigegeben würden (reihum pro User)."""
+        queues = list(self._queues.values())
+        order = []
+        for i in range(max((len(q) for q in queues), default=0)):
+            order.extend(q[i] for q in queues if i < len(q))
+        return order
+
+    def _next_ticket(self):
+        if not self._queues:
+            return None
+        return next(iter(self._queues.values()))[0]
+
+    def _prune(self):
+        cutoff = time.time() - self.window
+        while self._sent and self._sent[0][0] < cutoff:
+            self._sent.popleft()
+
+    def _free_requests(self):
+        return self.rpm - len(self._sent)
+
+    def _free_tokens(self):
+        return self.tpm - sum(tokens for _, tokens in self._sent)
+
+    def _budget_wait(self, tokens):
+        """Sekunden, bis RPM, TPM und Cooldown eine Anfrage mit tokens erlauben (0 = sofort)."""
+        self._prune()
+        now = time.time()
+        waits = [self._cooldown_until - now]
+        if len(self._sent) >= self.rpm:
+            waits.append(self._sent[0][0] + self.window - now)
+        excess = tokens - self._free_tokens()
+        if excess > 0 and self._sent:
+            # Warten, bis genug alte Anfragen aus dem Fenster gefallen sind
+            for sent_at, sent_tokens in self._sent:
+                excess -= sent_tokens
+                if excess <= 0:
+                    waits.append(sent_at + self.window - now)
+                    break
+        return max(max(waits), 0)
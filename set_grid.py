@@ -0,0 +1,128 @@
+"""Satz-Tabellen für die Kompaktansicht und die Schnellerfassung.
+
+grid_frame() baut aus den Satz-Dicts des Render-Index (workout_index.py) die
+Tabelle für st.data_editor. diff_grid() vergleicht die bearbeitete Tabelle mit
+der geladenen und liefert nur echte Änderungen; check_conflicts() prüft sie
+gegen den aktuellen Stand in der Datenbank, bevor alles in einem Bulk-Update
+geschrieben wird.
+"""
+import datetime
+
+import pandas as pd
+
+# Spalten der Satz-Tabelle -> Spalten in workouts
+GRID_COLUMNS = {"Gewicht (kg)": "weight", "Wdh": "reps", "RIR": "rirDone", "Erledigt": "completed"}
+FIELD_LABELS = {field: column for column, field in GRID_COLUMNS.items()}
+
+
+def normalize_field(field, value):
+    """Vergleichbarer Wert eines Satz-Felds, egal ob aus der API (Strings) oder aus pandas."""
+    if field == "completed":
+        return str(value).strip().lower() == "true"
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0 if field == "weight" else 0
+    if pd.isna(number):
+        return 0.0 if field == "weight" else 0
+    return number if field == "weight" else int(number)
+
+
+def grid_frame(set_rows, with_exercise=False):
+    """Tabelle Satz, Gewicht, Wdh, RIR, Erledigt, Letztes Mal (optional mit Übung) in der Reihenfolge von set_rows."""
+    rows = []
+    for row in set_rows:
+        grid_row = {"Übung": row["exercise"]} if with_exercise else {}
+        grid_row["Satz"] = int(row["set"])
+        reps = normalize_field("reps", row["reps"])
+        grid_row.update({
+            "Gewicht (kg)": normalize_field("weight", row["weight"]),
+            "Wdh": reps if reps > 0 else 10,
+            "RIR": normalize_field("rirDone", row.get("rirDone")),
+            "Erledigt": bool(row["completed"]),
+            "Letztes Mal": row.get("last", ""),
+        })
+        rows.append(grid_row)
+    return pd.DataFrame(rows)
+
+
+def apply_grid_edits(frame, edited_rows):
+    """edited_rows aus dem Widget-State von st.data_editor auf die geladene Tabelle anwenden."""
+    edited = frame.copy()
+    for position, changes in edited_rows.items():
+        for column, value in changes.items():
+            if column in edited.columns:
+                edited.at[edited.index[int(position)], column] = value
+    return edited
+
+
+def diff_grid(set_rows, original, edited):
+    """Geänderte Sätze als [(Satz-Dict, {Feld: neuer Wert})] im Format der API."""
+    changes = []
+    for position, row in enumerate(set_rows):
+        updates = {}
+        for column, field in GRID_COLUMNS.items():
+            value = edited.iloc[position][column]
+            if pd.isna(value):
+                continue
+            value = normalize_field(field, value)
+            if value != normalize_field(field, original.iloc[position][column]):
+                updates[field] = value
+        if not updates:
+            continue
+        if "reps" in updates:
+            updates["reps"] = str(updates["reps"])
+        if updates.get("completed"):
+            updates["time"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        changes.append((row, updates))
+    return changes
+
+
+def set_label(row):
+    return f"{row['exercise']} Satz {int(row['set'])}"
+
+
+# Felder, die beim Konflikt mit einem anderen Gerät gemeldet werden
+CONFLICT_LABELS = {**FIELD_LABELS, "messageToCoach": "Nachricht an Coach", "messageFromCoach": "Coach-Hinweis"}
+
+
+def describe_conflict(row, server):
+    """Lesbare Meldung, was sich seit dem Laden von row in der Datenbank geändert hat."""
+    if server is None:
+        return f"{set_label(row)}: wurde inzwischen gelöscht"
+    details = []
+    for field, label in CONFLICT_LABELS.items():
+        if field in FIELD_LABELS:
+            before, after = normalize_field(field, row.get(field)), normalize_field(field, server.get(field))
+        else:
+            before, after = str(row.get(field) or ""), str(server.get(field) or "")
+        if before != after:
+            details.append(f"{label} {before} → {after}")
+    return f"{set_label(row)}: auf einem anderen Gerät geändert ({', '.join(details) or 'neue Version'})"
+
+
+def check_conflicts(changes, server_rows):
+    """Trennt Änderungen in schreibbare Zeilen und Konflikte.
+
+    Ein Satz ist im Konflikt, wenn er inzwischen gelöscht wurde oder ein
+    geändertes Feld in der Datenbank nicht mehr dem geladenen Wert entspricht
+    (z.B. auf einem anderen Gerät gespeichert). Schreibbare Zeilen sind die
+    vollständigen Datenbankzeilen mit den Änderungen, passend für ein Upsert.
+    """
+    server_by_id = {row["id"]: row for row in server_rows}
+    rows, conflicts = [], []
+    for row, updates in changes:
+        server = server_by_id.get(row["id"])
+        if server is None:
+            conflicts.append(f"{set_label(row)}: wurde inzwischen gelöscht")
+            continue
+        changed = [
+            field for field in updates if field in FIELD_LABELS
+            and normalize_field(field, server.get(field)) != normalize_field(field, row.get(field))
+        ]
+        if changed:
+            details = ", ".join(f"{FIELD_LABELS[field]} ist jetzt {server.get(field)}" for field in changed)
+            conflicts.append(f"{set_label(row)}: inzwischen geändert ({details}) – nicht überschrieben")
+            continue
+        rows.append(dict(server, **updates))
+    return rows, conflicts
@@ -0,0 +1,129 @@
+"""Coach-/Studio-Auswertung über alle Mitglieder.
+
+Lädt Fragebogen und Trainingshistorie seitenweise aus Supabase, verteilt die
+Mitglieder auf einen Prozess-Pool und schreibt Kennzahlen pro Mitglied und pro
+Studio als CSV.
+
+Aufruf:
+    python studio_analytics.py --weeks 8 --workers 8 --out auswertung
+"""
+import argparse
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import requests
+import streamlit as st
+
+from training_metrics import compute_member_metrics, compute_studio_metrics, fill_inactive_members
+
+# ---- Configuration ----
+SUPABASE_URL = st.secrets["supabase_url"]
+SUPABASE_KEY = st.secrets["supabase_service_role_key"]
+TABLE_ARCHIVE = "workout_history"
+TABLE_QUESTIONNAIRE = "questionaire"
+PAGE_SIZE = 1000  # Supabase liefert standardmäßig max. 1000 Zeilen pro Request (max-rows kann kleiner sein)
+
+HEADERS = {
+    "apikey": SUPABASE_KEY,
+    "Authorization": f"Bearer {SUPABASE_KEY}",
+    "Content-Type": "application/json"
+}
+
+
+def fetch_all_pages(table, select, page_size=PAGE_SIZE):
+    """Holt eine komplette Tabelle seitenweise (stabil sortiert nach id).
+
+    Liest bis zur ersten leeren Seite: Ist max-rows des Servers kleiner als
+    page_size, sind auch volle Seiten kürzer als angefragt."""
+    rows = []
+    offset = 0
+    while True:
+        response = requests.get(
+            f"{SUPABASE_URL}/rest/v1/{table}",
+            headers=HEADERS,
+            params={"select": select, "order": "id.asc", "limit": page_size, "offset": offset},
+            timeout=60
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Fehler beim Abrufen der Daten aus {table}: {response.text}")
+        page = response.json()
+        if not page:
+            return rows
+        rows.extend(page)
+        offset += len(page)
+
+
+def _analyze_shard(shard, weeks, today):
+    """Worker: Kennzahlen für eine Teilmenge der Mitglieder."""
+    return compute_member_metrics(shard, weeks=weeks, today=today)
+
+
+def run(weeks=8, workers=None, out_prefix="studio_analytics"):
+    timings = {}
+    workers = workers or os.cpu_count() or 1
+    today = pd.Timestamp(datetime.date.today())
+
+    start = time.perf_counter()
+    profiles = pd.DataFrame(fetch_all_pages(
+        TABLE_QUESTIONNAIRE, "uuid,forename,surename,studio,trainFrequency"
+    ))
+    history = pd.DataFrame(fetch_all_pages(
+        TABLE_ARCHIVE, "id,uuid,date,workout,exercise,weight,reps,rirDone"
+    ))
+    timings["laden"] = time.perf_counter() - start
+
+    if profiles.empty:
+        print("Keine Daten vorhanden.")
+        return pd.DataFrame(), pd.DataFrame()
+
+    start = time.perf_counter()
+    profiles = profiles.drop_duplicates("uuid")
+    if history.empty:
+        history = pd.DataFrame(columns=["id", "uuid", "date", "workout", "exercise", "weight", "reps", "rirDone"])
+    history = history.merge(
+        profiles[["uuid", "trainFrequency"]].rename(columns={"trainFrequency": "target_frequency"}),
+        on="uuid", how="left"
+    )
+    # Mitglieder auf Shards verteilen: mehrere Shards pro Worker gleichen ungleiche Historien aus
+    n_shards = max(1, min(workers * 4, history["uuid"].nunique()))
+    shard_ids = pd.factorize(history["uuid"])[0] % n_shards
+    shards = [shard for _, shard in history.groupby(shard_ids)]
+    timings["aufteilen"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_analyze_shard, shards, [weeks] * len(shards), [today] * len(shards)))
+    else:
+        results = [_analyze_shard(shard, weeks, today) for shard in shards]
+    results = [result for result in results if not result.empty]
+    members = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=["uuid"])
+    timings["berechnen"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Alle Mitglieder aus dem Fragebogen – wer nie trainiert hat, zählt mit 0 Einheiten und 0 % Adhärenz
+    members = fill_inactive_members(profiles[["uuid", "forename", "surename", "studio"]].merge(members, on="uuid", how="left"))
+    studios = compute_studio_metrics(members)
+    members.to_csv(f"{out_prefix}_mitglieder_{today.date()}.csv", index=False)
+    studios.to_csv(f"{out_prefix}_studios_{today.date()}.csv", index=False)
+    timings["schreiben"] = time.perf_counter() - start
+
+    print(f"{len(members)} Mitglieder, {len(history)} Sätze, {len(shards)} Shards auf {workers} Prozessen")
+    print(studios.round(2).to_string(index=False))
+    print()
+    for phase, seconds in timings.items():
+        print(f"{phase:<10} {seconds:8.2f} s")
+    print(f"{'gesamt':<10} {sum(timings.values()):8.2f} s")
+    return members, studios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Studio-Auswertung über alle Mitglieder")
+    parser.add_argument("--weeks", type=int, default=8, help="Auswertungsfenster für Adhärenz und Volumen")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--out", default="studio_analytics", help="Präfix der CSV-Dateien")
+    args = parser.parse_args()
+    run(weeks=args.weeks, workers=args.workers, out_prefix=args.out)
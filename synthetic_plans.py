@@ -0,0 +1,49 @@
+"""Synthetische KI-Antworten (seeded) für Benchmark und Mock-Server.
+
+Text-Pläne mischen die Formatvarianten, die der Parser kennt (Überschriften,
+"3 Sätze, 8 Wdh", "3x8 Wdh", ...); JSON-Pläne folgen dem Schema der
+strukturierten Ausgabe. Gleicher Zufallsgenerator, gleicher Plan.
+"""
+import json
+
+EXERCISES = [
+    "Bankdrücken", "Kniebeuge", "Kreuzheben", "Latzug", "Rudern am Kabel", "Schulterdrücken",
+    "Beinpresse", "Hip Thrust", "Face Pulls", "Bizeps Curls", "Trizepsdrücken am Kabel",
+    "Seitheben", "Ausfallschritte", "Plank", "Brustpresse (Maschine)", "Wadenheben",
+]
+WORKOUT_NAMES = ["Ganzkörper A", "Ganzkörper B", "Push", "Pull", "Beine", "Oberkörper", "Unterkörper"]
+HEADER_STYLES = ["**{}:**", "**{}**", "## {}", "{}:"]
+EXERCISE_STYLES = [
+    "- {name}: {sets} Sätze, {reps} Wdh, {weight} kg (Fokus: {focus})",
+    "- {name}: {sets} Sätze, {reps} Wdh, {weight} kg",
+    "* {name}: {sets}x{reps} Wdh, {weight}kg",
+    "- {name}: {sets} Sets, {reps} reps, {weight} kg (Erklärung: {focus})",
+]
+
+
+def synthetic_plan(rng, days):
+    lines = ["**DEIN PERSÖNLICHER TRAININGSPLAN**",
+             "Synthetischer Plan für den Benchmark mit gemischten Formatvarianten.", ""]
+    for workout in rng.sample(WORKOUT_NAMES, days):
+        lines.append(rng.choice(HEADER_STYLES).format(workout))
+        for name in rng.sample(EXERCISES, rng.randint(4, 7)):
+            lines.append(rng.choice(EXERCISE_STYLES).format(
+                name=name, sets=rng.randint(2, 5), reps=rng.choice(["5", "8", "8-10", "10-12", "15"]),
+                weight=rng.choice([0, 12.5, 20, 40, 62.5, 80, 100]), focus="Saubere Technik"
+            ))
+        if rng.random() < 0.3:
+            lines.append("Pause 90 Sekunden zwischen den Sätzen.")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def synthetic_json_plan(rng, days):
+    workouts = []
+    for workout in rng.sample(WORKOUT_NAMES, days):
+        workouts.append({"name": workout, "exercises": [
+            {"name": name, "sets": rng.randint(2, 5), "reps": rng.choice(["5", "8", "8-10", "10-12"]),
+             "weight": rng.choice([0, 12.5, 20, 40, 62.5, 80]), "focus": "Saubere Technik"}
+            for name in rng.sample(EXERCISES, rng.randint(4, 7))
+        ]})
+    return json.dumps({"explanation": "Synthetischer Plan vom Mock-Server.", "workouts": workouts},
+                      ensure_ascii=False)
@@ -0,0 +1,84 @@
+"""Offline-Tests gegen mock_llm_server: Plan-Jobs, Batch-Backend und Fehler-Injektion."""
+import threading
+from contextlib import contextmanager
+
+from openai import OpenAI
+
+from batch_llm import ConcurrentChatBackend
+from mock_llm_server import MockLLM, serve
+from plan_jobs import JOB_DONE, JOB_FAILED, PlanJobQueue, PlanJobStore
+
+
+@contextmanager
+def mock_server(**options):
+    """MockLLM auf einem freien Port; liefert einen OpenAI-Client ohne SDK-Retries."""
+    llm = MockLLM(source="generator", chunk_delay=0, **options)
+    server = serve(llm, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield OpenAI(api_key="mock", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0), llm
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def make_request(prompt="Plan für Test", seed=None):
+    return {"model": "mock", "prompt": prompt, "temperature": 0.7, "max_tokens": 500, "top_p": 1.0,
+            "seed": seed, "user_name": "Test", "params": {}}
+
+
+def run_plan_jobs(client, tmp_path, requests):
+    queue = PlanJobQueue(client, store=PlanJobStore(str(tmp_path / "jobs.sqlite3")))
+    job_ids = [queue.submit("user-1", request) for request in requests]
+    queue.executor.shutdown(wait=True)
+    return [queue.store.get(job_id) for job_id in job_ids]
+
+
+def test_plan_jobs_stream_and_parse_mock_plans(tmp_path):
+    with mock_server(seed=7) as (client, llm):
+        jobs = run_plan_jobs(client, tmp_path, [make_request(seed=1), make_request(seed=1), make_request(seed=2)])
+
+    assert [job["status"] for job in jobs] == [JOB_DONE] * 3
+    assert all(job["result"]["rows"] for job in jobs)
+    # Gleiche Anfrage, gleicher Plan; anderer seed-Parameter, anderer Plan
+    assert jobs[0]["result"]["plan_text"] == jobs[1]["result"]["plan_text"]
+    assert jobs[0]["result"]["plan_text"] != jobs[2]["result"]["plan_text"]
+    assert llm.stats["completions"] == 3
+
+
+def test_broken_stream_fails_the_plan_job(tmp_path):
+    with mock_server(stream_break_rate=1.0) as (client, llm):
+        job = run_plan_jobs(client, tmp_path, [make_request()])[0]
+
+    assert job["status"] == JOB_FAILED
+    assert "unvollständig" in job["error"]
+    assert llm.stats["stream_breaks"] == 1
+
+
+def test_fault_injection_is_reproducible_for_the_same_seed():
+    requests = [{"custom_id": f"member-{i}", "model": "mock",
+                 "messages": [{"role": "user", "content": f"Plan {i}"}]} for i in range(30)]
+    failed_runs = []
+    for _ in range(2):
+        with mock_server(seed=3, error_rate=0.5) as (client, llm):
+            results = ConcurrentChatBackend(client, max_workers=8).run(requests)
+        failed_runs.append({custom_id for custom_id, result in results.items() if result["error"]})
+        assert llm.stats["errors_500"] == len(failed_runs[-1])
+
+    assert failed_runs[0] == failed_runs[1]
+    assert 0 < len(failed_runs[0]) < len(requests)
+
+
+def test_attempt_counter_is_bounded():
+    llm = MockLLM(seed=1, max_tracked_requests=5)
+    body = {"messages": [{"role": "user", "content": "Plan"}]}
+    first, retry = llm.fault_for(body), llm.fault_for(body)
+    for i in range(20):
+        llm.fault_for({"messages": [{"role": "user", "content": f"Plan {i}"}]})
+
+    assert len(llm.attempts) == 5
+    # Retry bekommt einen neuen, aber reproduzierbaren Wert
+    fresh = MockLLM(seed=1)
+    assert (fresh.fault_for(body), fresh.fault_for(body)) == (first, retry)
+    assert first != retry
@@ -0,0 +1,81 @@
+"""Hintergrund-Jobs: Varianten dürfen nie als wiederaufzunehmender Plan gelten."""
+from types import SimpleNamespace
+
+from plan_jobs import JOB_DONE, JOB_FAILED, JOB_KIND_VARIANT, PlanJobQueue, PlanJobStore
+
+PLAN_TEXT = """**Push:**
+- Bankdrücken: 3 Sätze, 8 Wdh, 60 kg (Fokus: Schulterblätter fixieren)
+"""
+
+
+class FakeClient:
+    """Liefert PLAN_TEXT als Stream im Format des OpenAI-SDK."""
+
+    def __init__(self, finish_reason="stop"):
+        self.finish_reason = finish_reason
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        choice = lambda content, finish: SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish)
+        return iter([
+            SimpleNamespace(choices=[choice(PLAN_TEXT, None)], usage=None),
+            SimpleNamespace(choices=[choice(None, self.finish_reason)], usage=None),
+        ])
+
+
+def make_request(seed):
+    return {"model": "gpt-4", "prompt": "Plan", "temperature": 0.7, "max_tokens": 500, "top_p": 1.0,
+            "seed": seed, "user_name": "Test", "params": {}}
+
+
+def run_jobs(queue, job_ids):
+    queue.executor.shutdown(wait=True)
+    return [queue.store.get(job_id) for job_id in job_ids]
+
+
+def test_finished_variants_are_not_resumed(tmp_path):
+    queue = PlanJobQueue(FakeClient(), store=PlanJobStore(str(tmp_path / "jobs.sqlite3")))
+    variant_ids = [queue.submit("user-1", make_request(seed), JOB_KIND_VARIANT) for seed in (1, 2, 3)]
+    jobs = run_jobs(queue, variant_ids)
+    assert all(job["status"] == JOB_DONE and job["kind"] == JOB_KIND_VARIANT for job in jobs)
+
+    # Erneutes Rendern nach Abschluss aller Varianten: kein Job zum Wiederaufnehmen
+    assert queue.store.latest_unclaimed("user-1") is None
+
+
+def test_single_plan_is_resumed_even_after_newer_variants(tmp_path):
+    store = PlanJobStore(str(tmp_path / "jobs.sqlite3"))
+    queue = PlanJobQueue(FakeClient(), store=store)
+    plan_id = queue.submit("user-1", make_request(None))
+    run_jobs(queue, [plan_id])
+    queue = PlanJobQueue(FakeClient(), store=store)
+    run_jobs(queue, [queue.submit("user-1", make_request(seed), JOB_KIND_VARIANT) for seed in (1, 2)])
+
+    assert store.latest_unclaimed("user-1")["id"] == plan_id
+    store.claim(plan_id)
+    assert store.latest_unclaimed("user-1") is None
+
+
+def test_existing_job_files_get_the_kind_column(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = PlanJobStore(path)
+    with store._connect() as conn:
+        conn.execute("DROP TABLE jobs")
+        conn.execute(
+            "CREATE TABLE jobs (id TEXT PRIMARY KEY, user_uuid TEXT NOT NULL, status TEXT NOT NULL, "
+            "request TEXT NOT NULL, partial_text TEXT NOT NULL DEFAULT '', result TEXT, error TEXT, "
+            "claimed INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO jobs (id, user_uuid, status, request, created_at, updated_at) "
+                     "VALUES ('alt', 'user-1', 'done', '{}', 1, 1)")
+
+    assert PlanJobStore(path).latest_unclaimed("user-1")["id"] == "alt"
+
+
+def test_truncated_answer_fails_the_job(tmp_path):
+    queue = PlanJobQueue(FakeClient(finish_reason="length"), store=PlanJobStore(str(tmp_path / "jobs.sqlite3")))
+    job = run_jobs(queue, [queue.submit("user-1", make_request(None))])[0]
+
+    assert job["status"] == JOB_FAILED
+    assert "max_tokens" in job["error"]
+    assert job["result"] is None
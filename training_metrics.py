@@ -0,0 +1,369 @@
+"""Belastungskennzahlen aus der Trainingshistorie (workout_history).
+
+Alle Berechnungen laufen vektorisiert über pandas/NumPy, damit sie sowohl im
+Stats-Tab als auch als kompakter KI-Kontext günstig bleiben.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Schlüsselwörter (kleingeschrieben) für die Zuordnung Übung -> Muskelgruppe.
+# Reihenfolge ist wichtig: der erste Treffer gewinnt.
+MUSCLE_GROUP_KEYWORDS = [
+    ("Beine", ["kniebeuge", "squat", "beinpresse", "leg press", "ausfallschritt", "lunge",
+               "beinstrecker", "beinbeuger", "leg curl", "leg extension", "wade", "calf",
+               "hip thrust", "glute", "gesäß", "split squat", "step up", "adduktor", "abduktor"]),
+    ("Rücken", ["kreuzheben", "deadlift", "rudern", "row", "latzug", "lat ", "klimmzug",
+                "pull up", "pull-up", "chin", "pullover", "hyperextension", "rückenstrecker",
+                "face pull", "shrug"]),
+    ("Brust", ["bankdrücken", "bench", "brustpresse", "fliegende", "butterfly", "fly",
+               "liegestütz", "push up", "push-up", "dips", "chest", "cable cross"]),
+    ("Schultern", ["schulter", "shoulder", "overhead", "military", "seitheben",
+                   "frontheben", "lateral raise", "arnold", "reverse fly"]),
+    ("Arme", ["bizeps", "biceps", "curl", "trizeps", "triceps", "french press",
+              "skull", "pushdown", "hammer"]),
+    ("Rumpf", ["bauch", "crunch", "plank", "unterarmstütz", "sit up", "sit-up", "core",
+               "russian twist", "pallof", "ab wheel", "rumpf"]),
+    ("Ganzkörper", ["airbike", "schlitten", "sled", "kettlebell", "swing", "burpee",
+                    "clean", "snatch", "thruster", "farmer"]),
+]
+DEFAULT_MUSCLE_GROUP = "Sonstiges"
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+
+def assign_muscle_groups(exercises):
+    """Ordnet einer Serie von Übungsnamen Muskelgruppen zu (vektorisiert)."""
+    names = exercises.fillna("").astype(str).str.lower()
+    conditions = [
+        names.str.contains("|".join(map(re.escape, keywords)), regex=True)
+        for _, keywords in MUSCLE_GROUP_KEYWORDS
+    ]
+    groups = [group for group, _ in MUSCLE_GROUP_KEYWORDS]
+    return pd.Series(
+        np.select(conditions, groups, default=DEFAULT_MUSCLE_GROUP),
+        index=exercises.index
+    )
+
+
+def prepare_history(df):
+    """Normalisiert Datentypen und ergänzt Volumen, Woche und Muskelgruppe."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["date", "week", "workout", "exercise", "muscle_group",
+                                     "weight", "reps", "rirDone", "volume"])
+    df = df.copy()
+    for col in ["weight", "reps", "rirDone"]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+        else:
+            df[col] = 0.0
+    if "workout" not in df.columns:
+        df["workout"] = ""
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df = df.dropna(subset=["date"])
+    df["date"] = df["date"].dt.normalize()
+    df["volume"] = df["weight"] * df["reps"]
+    # Woche beginnt am Montag
+    df["week"] = df["date"] - pd.to_timedelta(df["date"].dt.weekday, unit="D")
+    df["muscle_group"] = assign_muscle_groups(df["exercise"])
+    return df
+
+
+def compute_training_load(df, today=None):
+    """Berechnet Wochen-Tonnage, Acute:Chronic Workload Ratio und RIR-Trend.
+
+    Wochen- und Tagesreihen reichen bis today (Standard: heute), damit die
+    letzte Zeile immer die aktuelle Woche bzw. der heutige Tag ist – nach einer
+    Trainingspause mit Tonnage 0 statt der Werte der letzten Trainingswoche.
+
+    Gibt ein Dict mit DataFrames zurück:
+    - weekly_muscle: Tonnage pro Woche (Index) und Muskelgruppe (Spalten)
+    - weekly_workout: Tonnage pro Woche (Index) und Workout (Spalten)
+    - weekly: pro Woche Tonnage, Sätze, Trainingstage, ACWR und RIR (Ø und Trend)
+    - daily: tägliche Tonnage mit akuter/chronischer Last und ACWR
+    """
+    df = prepare_history(df)
+    if df.empty:
+        return {
+            "weekly_muscle": pd.DataFrame(),
+            "weekly_workout": pd.DataFrame(),
+            "weekly": pd.DataFrame(),
+            "daily": pd.DataFrame(),
+        }
+
+    weekly_muscle = df.pivot_table(
+        index="week", columns="muscle_group", values="volume", aggfunc="sum", fill_value=0
+    )
+    weekly_workout = df.pivot_table(
+        index="week", columns="workout", values="volume", aggfunc="sum", fill_value=0
+    )
+
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    last_day = max(df["date"].max(), today)
+    last_week = last_day - pd.Timedelta(days=last_day.weekday())
+
+    # RIR nur aus Sätzen mit eingetragener RIR: 0 ist der Standardwert neuer Sätze
+    # (Eingabefeld, Archivierung) und bedeutet "nicht eingetragen"
+    df["rir_logged"] = df["rirDone"].where(df["rirDone"] > 0)
+    weekly = df.groupby("week").agg(
+        tonnage=("volume", "sum"),
+        sets=("volume", "size"),
+        sessions=("date", "nunique"),
+        rir=("rir_logged", "mean"),
+    )
+    full_weeks = pd.date_range(weekly.index.min(), last_week, freq="7D")
+    weekly = weekly.reindex(full_weeks).fillna({"tonnage": 0, "sets": 0, "sessions": 0})
+    weekly_muscle = weekly_muscle.reindex(full_weeks, fill_value=0)
+    weekly_workout = weekly_workout.reindex(full_weeks, fill_value=0)
+    weekly.index.name = weekly_muscle.index.name = weekly_workout.index.name = "week"
+
+    # Akute (7 Tage) vs. chronische Last (Ø Woche über 28 Tage) auf Tagesbasis
+    daily = df.groupby("date")["volume"].sum()
+    daily = daily.reindex(
+        pd.date_range(daily.index.min(), last_day, freq="D"), fill_value=0
+    ).to_frame("tonnage")
+    daily["acute"] = daily["tonnage"].rolling(ACUTE_DAYS, min_periods=1).sum()
+    daily["chronic"] = daily["tonnage"].rolling(CHRONIC_DAYS, min_periods=1).sum() / (CHRONIC_DAYS / ACUTE_DAYS)
+    # ACWR erst aussagekräftig, wenn volle 28 Tage Historie vorliegen
+    enough_history = np.arange(len(daily)) >= CHRONIC_DAYS - 1
+    daily["acwr"] = np.where(
+        enough_history & (daily["chronic"] > 0), daily["acute"] / daily["chronic"].replace(0, np.nan), np.nan
+    )
+    daily.index.name = "date"
+
+    # ACWR am Wochenende (Sonntag) bzw. letzten verfügbaren Tag der Woche
+    week_end = weekly.index + pd.Timedelta(days=6)
+    weekly["acwr"] = daily["acwr"].reindex(week_end.where(week_end <= daily.index.max(), daily.index.max())).to_numpy()
+
+    weekly["rir_trend"] = weekly["rir"].rolling(3, min_periods=1).mean()
+
+    return {
+        "weekly_muscle": weekly_muscle,
+        "weekly_workout": weekly_workout,
+        "weekly": weekly,
+        "daily": daily,
+    }
+
+
+def acwr_zone(acwr):
+    """Einordnung der Acute:Chronic Workload Ratio."""
+    if acwr is None or pd.isna(acwr):
+        return "zu wenig Daten"
+    if acwr < 0.8:
+        return "Unterbelastung"
+    if acwr <= 1.3:
+        return "optimaler Bereich"
+    if acwr <= 1.5:
+        return "erhöht"
+    return "hohes Überlastungsrisiko"
+
+
+def rir_slope(weekly, weeks=6):
+    """Steigung der Wochen-RIR (RIR pro Woche) über die letzten Wochen."""
+    if weekly.empty:
+        return None
+    rir = weekly["rir"].tail(weeks).dropna()
+    if len(rir) < 2:
+        return None
+    x = (rir.index - rir.index[0]).days.to_numpy() / 7
+    return float(np.polyfit(x, rir.to_numpy(), 1)[0])
+
+
+def format_load_context(load, weeks=4):
+    """Kompakte Textzusammenfassung der Belastung für den KI-Prompt."""
+    weekly = load.get("weekly", pd.DataFrame())
+    if weekly.empty:
+        return ""
+
+    lines = ["BELASTUNGSSTEUERUNG:"]
+    recent = weekly.tail(weeks)
+    tonnage = ", ".join(
+        f"{week.strftime('%d.%m.')}: {row['tonnage']:.0f} kg" for week, row in recent.iterrows()
+    )
+    lines.append(f"- Wochen-Tonnage (letzte {len(recent)} Wochen): {tonnage}")
+
+    current_acwr = load["daily"]["acwr"].iloc[-1] if not load["daily"].empty else None
+    if current_acwr is not None and not pd.isna(current_acwr):
+        lines.append(f"- Acute:Chronic Ratio aktuell: {current_acwr:.2f} ({acwr_zone(current_acwr)})")
+    else:
+        lines.append(f"- Acute:Chronic Ratio: {acwr_zone(None)}")
+
+    muscle = load["weekly_muscle"].tail(weeks).sum()
+    muscle = muscle[muscle > 0].sort_values(ascending=False)
+    if not muscle.empty:
+        share = (muscle / muscle.sum() * 100).round().astype(int)
+        lines.append("- Volumenverteilung: " + ", ".join(f"{group} {pct}%" for group, pct in share.items()))
+
+    slope = rir_slope(weekly)
+    if slope is not None:
+        if slope < -0.2:
+            direction = "sinkend (Intensität steigt)"
+        elif slope > 0.2:
+            direction = "steigend (Intensität sinkt)"
+        else:
+            direction = "stabil"
+        lines.append(f"- RIR-Trend: {direction}, {slope:+.2f} RIR/Woche")
+
+    return "\n".join(lines)
+
+
+# ---- Chart-Daten pro Übung ----
+CHART_MAX_POINTS = 200
+ROLLUP_FREQUENCIES = {"Tag": None, "Woche": "W-MON", "Monat": "MS"}
+
+
+def _rollups_from_sets(ex):
+    """Tages-, Wochen- und Monatswerte aus den (vorbereiteten) Sätzen einer Übung."""
+    daily = ex.groupby("date").agg(weight=("weight", "max"), reps=("reps", "mean"), volume=("volume", "sum"))
+    rollups = {"Tag": daily}
+    for name, freq in ROLLUP_FREQUENCIES.items():
+        if freq is None:
+            continue
+        # Leere Perioden (kein Training) nicht als 0 darstellen
+        rollups[name] = daily.resample(freq, label="left", closed="left").agg(
+            {"weight": "max", "reps": "mean", "volume": "sum"}
+        ).loc[lambda frame: frame["weight"].notna()]
+    return rollups
+
+
+def exercise_stats(df, max_points=CHART_MAX_POINTS):
+    """Kennzahlen und Chart-Serien aller Übungen in einem Durchlauf über die Historie.
+
+    Ergebnis pro Übung:
+        {"metrics": {"max_weight", "avg_reps", "sessions", "progress"},
+         "series": {Auflösung: {"weight", "volume"}}}
+    progress ist die Differenz des Max-Gewichts zwischen letztem und erstem
+    Trainingstag (None bei nur einem Tag). Die Serien sind bereits auf
+    max_points Punkte reduziert, der Stats-Tab wählt nur noch per Schlüssel aus.
+    """
+    df = prepare_history(df)
+    stats = {}
+    for exercise, ex in df.groupby("exercise", sort=True):
+        rollups = _rollups_from_sets(ex)
+        daily = rollups["Tag"]
+        stats[exercise] = {
+            "metrics": {
+                "max_weight": float(ex["weight"].max()),
+                "avg_reps": float(ex["reps"].mean()),
+                "sessions": len(daily),
+                "progress": float(daily["weight"].iloc[-1] - daily["weight"].iloc[0]) if len(daily) > 1 else None,
+            },
+            "series": {
+                name: {
+                    "weight": lttb_downsample(rollup["weight"], max_points),
+                    "volume": lttb_downsample(rollup["volume"], max_points),
+                }
+                for name, rollup in rollups.items()
+            },
+        }
+    return stats
+
+
+def lttb_downsample(series, max_points=CHART_MAX_POINTS):
+    """Largest-Triangle-Three-Buckets: reduziert eine Zeitreihe auf max_points Punkte.
+
+    Spitzen und Täler bleiben erhalten, weil pro Bucket der Punkt mit der größten
+    Dreiecksfläche zum vorherigen Punkt und zum Mittel des nächsten Buckets gewählt wird.
+    """
+    n = len(series)
+    if max_points >= n or max_points < 3:
+        return series
+
+    x = series.index.to_numpy().astype("datetime64[ns]").astype(np.int64).astype(float)
+    y = series.to_numpy(dtype=float)
+    # Bucket-Grenzen für alle Punkte außer dem ersten und letzten
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return series.iloc[selected]
+
+
+
+# ---- Studio-Auswertung (alle Mitglieder) ----
+DEFAULT_TARGET_FREQUENCY = 3
+
+
+def compute_member_metrics(history, weeks=8, today=None):
+    """Adhärenz, Volumen und Progression pro Mitglied (uuid) in einem Durchgang.
+
+    history braucht die Spalten uuid, date, exercise, weight, reps und optional
+    target_frequency (geplante Trainings pro Woche aus dem Fragebogen).
+    """
+    df = prepare_history(history)
+    if df.empty:
+        return pd.DataFrame()
+
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    window_start = today - pd.Timedelta(weeks=weeks)
+    df["in_window"] = df["date"] >= window_start
+    if "target_frequency" not in df.columns:
+        df["target_frequency"] = DEFAULT_TARGET_FREQUENCY
+
+    members = df.groupby("uuid").agg(
+        sessions_total=("date", "nunique"),
+        first_session=("date", "min"),
+        last_session=("date", "max"),
+        volume_total=("volume", "sum"),
+        target_frequency=("target_frequency", "first"),
+    )
+    window = df[df["in_window"]]
+    members["sessions_window"] = window.groupby("uuid")["date"].nunique()
+    members["volume_window"] = window.groupby("uuid")["volume"].sum()
+    members[["sessions_window", "volume_window"]] = members[["sessions_window", "volume_window"]].fillna(0)
+
+    target = pd.to_numeric(members["target_frequency"], errors="coerce").fillna(DEFAULT_TARGET_FREQUENCY)
+    target = target.clip(lower=1)
+    members["adherence"] = (members["sessions_window"] / (target * weeks)).clip(upper=1.0)
+
+    # Progression: Max-Gewicht der ersten vs. letzten Einheit pro Übung
+    top_sets = df.groupby(["uuid", "exercise", "date"])["weight"].max().reset_index()
+    per_exercise = top_sets.groupby(["uuid", "exercise"])["weight"].agg(["first", "last", "size"])
+    per_exercise = per_exercise[(per_exercise["size"] > 1) & (per_exercise["first"] > 0)]
+    progression = ((per_exercise["last"] - per_exercise["first"]) / per_exercise["first"]).groupby("uuid").mean()
+    members["progression_pct"] = (progression * 100).reindex(members.index)
+    members["days_since_last"] = (today - members["last_session"]).dt.days
+
+    return members.drop(columns=["target_frequency"]).reset_index()
+
+
+def fill_inactive_members(members):
+    """Mitglieder ohne Historie (nach Left-Join vom Fragebogen): Einheiten, Volumen und Adhärenz 0."""
+    zero_columns = ["sessions_total", "sessions_window", "volume_total", "volume_window", "adherence"]
+    members = members.copy()
+    for column in zero_columns:
+        members[column] = pd.to_numeric(members[column], errors="coerce").fillna(0) if column in members else 0.0
+    for column in ["first_session", "last_session", "progression_pct", "days_since_last"]:
+        if column not in members:
+            members[column] = np.nan
+    return members
+
+
+def compute_studio_metrics(members):
+    """Verdichtet Mitglieder-Kennzahlen pro Studio."""
+    if members.empty:
+        return pd.DataFrame()
+    members = members.assign(
+        studio=members["studio"].fillna("ohne Studio").replace("", "ohne Studio"),
+        active=members["sessions_window"] > 0,
+    )
+    return members.groupby("studio").agg(
+        members=("uuid", "size"),
+        active_members=("active", "sum"),
+        adherence_mean=("adherence", "mean"),
+        volume_window=("volume_window", "sum"),
+        progression_median_pct=("progression_pct", "median"),
+    ).reset_index()
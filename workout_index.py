@@ -0,0 +1,40 @@
+"""Vorgruppierter Render-Index für den Training-Tab.
+
+Statt bei jedem Rerun nach Workout und Übung zu filtern und zu gruppieren,
+wird der Plan einmal beim Laden in eine verschachtelte Struktur überführt:
+
+    {"workouts": [{"name", "exercises": [{"name", "sets": [Satz-Dict, ...],
+                                          "coach_message", "athlete_message"}]}]}
+
+Reihenfolge von Workouts und Übungen = erste Zeile (kleinste id), Sätze nach
+Satznummer. Jeder Satz bekommt unter "last" den Anzeigetext seiner letzten
+Leistung (last_performance.py, sonst "").
+"""
+
+
+def build_workout_index(df, last_performance=None):
+    """Ein Durchlauf über die nach id sortierten Zeilen; last_performance: {(Übung, Satz): Text}."""
+    last_performance = last_performance or {}
+    workouts = {}
+    records = df.sort_values("id").to_dict("records") if not df.empty else []
+    for record in records:
+        exercises = workouts.setdefault(record["workout"], {})
+        exercise = exercises.get(record["exercise"])
+        if exercise is None:
+            exercise = exercises[record["exercise"]] = {
+                "name": record["exercise"],
+                "workout": record["workout"],
+                "sets": [],
+                "coach_message": str(record.get("messageFromCoach") or ""),
+                "athlete_message": str(record.get("messageToCoach") or ""),
+            }
+        exercise["sets"].append(record)
+
+    for exercises in workouts.values():
+        for exercise in exercises.values():
+            exercise["sets"].sort(key=lambda record: record["set"])
+            for record in exercise["sets"]:
+                record["last"] = last_performance.get((record["exercise"], int(record["set"])), "")
+    return {
+        "workouts": [{"name": name, "exercises": list(exercises.values())} for name, exercises in workouts.items()],
+    }